@@ -3,6 +3,7 @@ import openai
 import pymongo
 from bson import ObjectId
 from dotenv import load_dotenv
+from app.answer_metadata import generate_answer_metadata
 
 # Load environment variables from .env file
 load_dotenv()
@@ -19,53 +20,6 @@ client = pymongo.MongoClient(MONGODB_URI)
 db = client[MONGODB_DB]
 documents_collection = db['documents']
 
-# Function to generate a summary using OpenAI's GPT-3.5
-def generate_summary(answer):
-    context = "Context: MongoDB Developer Days, MongoDB Atlas, MongoDB Aggregation Pipelines, and MongoDB Atlas Search"
-    prompt = f"{context}\n\nPlease summarize the following text:\n\n{answer}"
-    
-    response = openai.ChatCompletion.create(
-        model="gpt-3.5-turbo",
-        messages=[
-            {"role": "system", "content": "You are an assistant that provides summaries."},
-            {"role": "user", "content": prompt}
-        ]
-    )
-    summary = response['choices'][0]['message']['content'].strip()
-    return summary
-
-# Function to generate references using OpenAI's GPT-3.5
-def generate_references(answer):
-    context = "Context: MongoDB Developer Days, MongoDB Atlas, MongoDB Aggregation Pipelines, and MongoDB Atlas Search"
-    prompt = f"{context}\n\nPlease provide a relevant reference for the following text from the MongoDB documentation:\n\n{answer}"
-    
-    response = openai.ChatCompletion.create(
-        model="gpt-3.5-turbo",
-        messages=[
-            {"role": "system", "content": "You are an assistant that provides relevant references."},
-            {"role": "user", "content": prompt}
-        ]
-    )
-    references = response['choices'][0]['message']['content'].strip()
-    if not references:
-        references = "No specific references provided. Please refer to the MongoDB Documentation at https://www.mongodb.com/docs/"
-    return references
-
-# Function to generate a title using OpenAI's GPT-3.5
-def generate_title(answer):
-    context = "Context: MongoDB Developer Days, MongoDB Atlas, MongoDB Aggregation Pipelines, and MongoDB Atlas Search"
-    prompt = f"{context}\n\nPlease provide a concise and descriptive title for the following answer:\n\n{answer}"
-    
-    response = openai.ChatCompletion.create(
-        model="gpt-3.5-turbo",
-        messages=[
-            {"role": "system", "content": "You are an assistant that provides concise and descriptive titles."},
-            {"role": "user", "content": prompt}
-        ]
-    )
-    title = response['choices'][0]['message']['content'].strip()
-    return title
-
 # Function to generate an answer using OpenAI's GPT-3.5
 def generate_answer(title, summary):
     context = "Context: MongoDB Developer Days, MongoDB Atlas, MongoDB Aggregation Pipelines, and MongoDB Atlas Search"
@@ -98,16 +52,18 @@ def update_documents():
     for doc in documents:
         title = doc.get('title')
         summary = doc.get('summary')
+        references = doc.get('references')
         answer = doc.get('answer')
         
-        if not title:
-            title = generate_title(answer if answer else "")
-        
-        if not summary or summary == "Summary not provided":
-            summary = generate_summary(answer if answer else "")
+        if summary == "Summary not provided":
+            summary = None
         
-        if not references:
-            references = generate_references(answer if answer else "")
+        # One call covers every missing metadata field
+        if not title or not summary or not references:
+            metadata = generate_answer_metadata(answer if answer else "")
+            title = title or metadata['title']
+            summary = summary or metadata['summary']
+            references = references or metadata['references']
         
         if not answer or answer == "No main answer provided":
             answer = generate_answer(title, summary)
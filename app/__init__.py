@@ -3,13 +3,16 @@ from flask_login import login_required, current_user, user_logged_in
 from flask_cors import CORS
 from flask_wtf.csrf import CSRFProtect
 from .config import Config
-from .auth import auth, oauth, login_manager, init_oauth
-from .utils import init_db, update_user_login_info
 
 import os
 import logging
 
 def create_app(config_class=Config):
+    # Imported here so that importing a standalone module such as app.nlp or
+    # app.answer_metadata does not connect to MongoDB or start worker threads
+    from .auth import auth, oauth, login_manager, init_oauth
+    from .utils import init_db, update_user_login_info
+
     print("Starting create_app function")
     app = Flask(__name__,
                 template_folder=os.path.abspath(os.path.join(os.path.dirname(__file__), '../templates')),
@@ -49,7 +52,7 @@ def create_app(config_class=Config):
 
     @user_logged_in.connect_via(app)
     def _track_logins(sender, user, **extra):
-        update_user_login_info(str(user.id))
+        update_user_login_info(str(user.id), force=True)
 
     csrf.init_app(app)
     
@@ -0,0 +1,165 @@
+# answer_cache.py
+
+import copy
+import logging
+import re
+import threading
+import time
+from collections import OrderedDict
+
+from pymongo import ReturnDocument
+
+logger = logging.getLogger(__name__)
+
+PUNCTUATION_PATTERN = re.compile(r'[^\w\s]+')
+
+
+def normalize_question(text):
+    """Lowercases and collapses whitespace and punctuation, so "How do I X?" == "how do i x"."""
+    return ' '.join(PUNCTUATION_PATTERN.sub(' ', text.lower()).split())
+
+
+def normalize_module(module):
+    module = ' '.join((module or '').lower().split())
+    return '' if module == 'select a module' else module
+
+
+class AnswerCache:
+    """
+    Exact-match cache of final chat responses, keyed by normalized question and module.
+
+    Lets a repeated question skip embedding, retrieval, reranking and generation
+    entirely. Entries expire after `ttl_seconds` and the cache is bounded to
+    `max_entries` with LRU eviction. Admins can invalidate one question or clear
+    everything, and edits to the knowledge base or the events clear it as well.
+
+    Each worker holds its own entries. With `generations_getter`, every clear or
+    invalidation also bumps a generation counter in MongoDB, and each worker
+    re-reads it at most every `generation_check_seconds` on lookup, dropping all
+    of its entries when it has moved. Without it, other workers keep serving
+    their entries until the TTL expires.
+    """
+
+    GENERATION_ID = 'answer_cache'
+
+    def __init__(self, ttl_seconds=600, max_entries=5000, generations_getter=None,
+                 generation_check_seconds=1.0):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.generations_getter = generations_getter
+        self.generation_check_seconds = generation_check_seconds
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._generation = None
+        self._generation_checked_at = None
+        self.hits = 0
+        self.misses = 0
+
+    def cache_key(self, question, module):
+        return f"{normalize_module(module)}\n{normalize_question(question)}"
+
+    def get(self, question, module):
+        key = self.cache_key(question, module)
+        self._sync_generation()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] <= time.monotonic():
+                if entry is not None:
+                    del self._entries[key]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return copy.deepcopy(entry[1])
+
+    def put(self, question, module, response_data):
+        key = self.cache_key(question, module)
+        if not key.strip():
+            return
+        value = {k: v for k, v in response_data.items() if k not in ('conversation_id', 'debug_info')}
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl_seconds, copy.deepcopy(value))
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, question, module=None):
+        """
+        Drops the entry for `question` in `module`, or in every module when module is None.
+        Returns the number of entries removed from this worker; other workers cannot
+        drop a single question, so they clear everything on their next lookup.
+        """
+        question_key = normalize_question(question)
+        with self._lock:
+            if module is not None:
+                removed = 1 if self._entries.pop(self.cache_key(question, module), None) else 0
+            else:
+                keys = [key for key in self._entries if key.split('\n', 1)[1] == question_key]
+                for key in keys:
+                    del self._entries[key]
+                removed = len(keys)
+        self._bump_generation()
+        return removed
+
+    def clear(self):
+        with self._lock:
+            removed = len(self._entries)
+            self._entries.clear()
+        self._bump_generation()
+        logger.info(f"Answer cache cleared ({removed} entries)")
+        return removed
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': round(self.hits / lookups, 4) if lookups else 0.0,
+                'entries': len(self._entries),
+                'generation': self._generation
+            }
+
+    def _sync_generation(self):
+        if self.generations_getter is None:
+            return
+        now = time.monotonic()
+        with self._lock:
+            if (self._generation_checked_at is not None
+                    and now - self._generation_checked_at < self.generation_check_seconds):
+                return
+            self._generation_checked_at = now
+        try:
+            collection = self.generations_getter()
+            if collection is None:
+                return
+            document = collection.find_one({'_id': self.GENERATION_ID})
+        except Exception as e:
+            # The TTL still bounds staleness when the counter cannot be read
+            logger.error(f"Error reading answer cache generation: {str(e)}")
+            return
+        self._apply_generation(document.get('generation', 0) if document else 0)
+
+    def _bump_generation(self):
+        if self.generations_getter is None:
+            return
+        try:
+            collection = self.generations_getter()
+            if collection is None:
+                return
+            document = collection.find_one_and_update(
+                {'_id': self.GENERATION_ID},
+                {'$inc': {'generation': 1}},
+                upsert=True,
+                return_document=ReturnDocument.AFTER
+            )
+        except Exception as e:
+            logger.error(f"Error bumping answer cache generation: {str(e)}")
+            return
+        self._apply_generation(document['generation'])
+
+    def _apply_generation(self, generation):
+        with self._lock:
+            if self._generation is not None and generation != self._generation:
+                self._entries.clear()
+            self._generation = generation
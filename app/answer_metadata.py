@@ -0,0 +1,101 @@
+# answer_metadata.py
+
+import json
+import logging
+import re
+
+import openai
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_REFERENCES = "No specific references provided. Please refer to the MongoDB Documentation at https://www.mongodb.com/docs/"
+
+
+def generate_answer_metadata(answer):
+    """
+    Generates the title, summary and references for an answer in a single LLM call.
+
+    The model is asked for a JSON object. Any field that is missing, empty or
+    unparseable falls back to a value derived locally from the answer, so the
+    result always has all three keys.
+    """
+    context = "Context: MongoDB Developer Days, MongoDB Atlas, MongoDB Aggregation Pipelines, and MongoDB Atlas Search"
+    prompt = f"""{context}
+
+Read the following answer and respond with a JSON object containing exactly these keys:
+- "title": a concise and descriptive title for the answer
+- "summary": a short summary of the answer
+- "references": a relevant reference from the MongoDB documentation
+
+Answer:
+{answer}"""
+
+    metadata = {}
+    try:
+        response = openai.ChatCompletion.create(
+            model="gpt-3.5-turbo",
+            messages=[
+                {"role": "system", "content": "You are an assistant that provides titles, summaries and references for answers. Only respond with valid JSON."},
+                {"role": "user", "content": prompt}
+            ],
+            temperature=0
+        )
+        metadata = parse_answer_metadata(response['choices'][0]['message']['content'])
+    except Exception as e:
+        logger.error(f"Error generating answer metadata: {str(e)}")
+
+    return fill_answer_metadata(answer, metadata)
+
+
+def parse_answer_metadata(content):
+    content = content.strip()
+    try:
+        parsed = json.loads(content)
+    except json.JSONDecodeError:
+        # The model sometimes wraps the object in prose or a code fence
+        json_like_content = re.search(r'\{.*\}', content, re.DOTALL)
+        if not json_like_content:
+            logger.warning("Could not extract JSON from the metadata response")
+            return {}
+        try:
+            parsed = json.loads(json_like_content.group())
+        except json.JSONDecodeError:
+            logger.warning("Metadata response is not valid JSON")
+            return {}
+
+    if not isinstance(parsed, dict):
+        return {}
+
+    metadata = {}
+    for key in ('title', 'summary', 'references'):
+        value = parsed.get(key)
+        if isinstance(value, list):
+            value = '\n'.join(str(item) for item in value)
+        if isinstance(value, str) and value.strip():
+            metadata[key] = value.strip()
+    return metadata
+
+
+def fill_answer_metadata(answer, metadata):
+    """
+    Completes `metadata` with locally derived values for any missing field.
+    """
+    title = metadata.get('title')
+    if not title:
+        title = ' '.join(answer.split()[:8])
+        title = title if len(title) < 60 else title[:57] + '...'
+    return {
+        'title': title,
+        'summary': metadata.get('summary') or generate_context_summary(answer),
+        'references': metadata.get('references') or DEFAULT_REFERENCES
+    }
+
+
+def generate_context_summary(context_text, max_length=200):
+    # This is a very basic summary generation.
+    # For better results, consider using an AI model or a more sophisticated summarization algorithm.
+    sentences = re.split(r'(?<=[.!?])\s+', context_text)
+    summary = ' '.join(sentences[:3])  # Take first 3 sentences
+    if len(summary) > max_length:
+        summary = summary[:max_length] + '...'
+    return summary
@@ -6,7 +6,8 @@ from bson import ObjectId
 import time
 from datetime import datetime
 import logging
-from app.utils import with_db_connection
+from app import utils
+from app.utils import with_db_connection, load_user_data
 
 auth = Blueprint('auth', __name__)
 oauth = OAuth()
@@ -55,9 +56,8 @@ class User(UserMixin):
         return None
 
 @login_manager.user_loader
-@with_db_connection
-def load_user(db, user_id):
-    user_data = db.users.find_one({"_id": ObjectId(user_id)})
+def load_user(user_id):
+    user_data = load_user_data(user_id)
     if not user_data:
         return None
     
@@ -115,6 +115,7 @@ def authorized(db):
                 'last_login': current_time
             }
             result = db.users.insert_one(user_data)
+            utils.stats_rollups.increment(users=1)
             user_data['_id'] = result.inserted_id
             current_app.logger.debug(f"New user created: {user_data}")
         else:
@@ -128,6 +129,7 @@ def authorized(db):
                 }}
             )
             user_data['last_login'] = current_time
+            utils.user_cache.invalidate(user_data['_id'])
 
         user = User(str(user_data['_id']), email, name, picture, user_data.get('isAdmin', False), current_time)
         login_user(user)
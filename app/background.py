@@ -0,0 +1,115 @@
+# background.py
+
+import logging
+import queue
+import threading
+import time
+import zlib
+
+logger = logging.getLogger(__name__)
+
+
+class BackgroundPipeline:
+    """
+    Bounded worker pool for work that can happen after the response is sent.
+
+    Tasks are sharded by `key` onto single-threaded workers, so tasks for one key
+    (e.g. a conversation) run in submission order. A task submitted with
+    `coalesce=True` is skipped while an identical (function, key) task is still
+    waiting, because the queued one will see the latest state anyway. Each shard
+    holds at most `max_depth // workers` tasks; `submit` returns False when the
+    shard is full so the caller can decide to run the work inline or drop it.
+    Before `start()` tasks run inline, which keeps scripts and tests synchronous.
+    """
+
+    def __init__(self, workers=4, max_depth=1000):
+        self.workers = workers
+        self.max_depth = max_depth
+        self._queues = [queue.Queue(maxsize=max(1, max_depth // workers)) for _ in range(workers)]
+        self._pending = set()
+        self._lock = threading.Lock()
+        self._app = None
+        self._threads = []
+        self.submitted = 0
+        self.completed = 0
+        self.failed = 0
+        self.dropped = 0
+        self.coalesced = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+
+    def start(self, app):
+        if self._threads:
+            return
+        self._app = app
+        for index, shard in enumerate(self._queues):
+            thread = threading.Thread(target=self._run, args=(shard,), name=f'background-{index}', daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def submit(self, fn, *args, key=None, coalesce=False, **kwargs):
+        if not self._threads:
+            with self._lock:
+                self.submitted += 1
+            self._execute(fn, args, kwargs)
+            return True
+
+        pending_key = (fn.__qualname__, key) if coalesce else None
+        with self._lock:
+            if pending_key is not None:
+                if pending_key in self._pending:
+                    self.coalesced += 1
+                    return True
+                self._pending.add(pending_key)
+            self.submitted += 1
+
+        shard = self._queues[zlib.crc32(str(key).encode('utf-8')) % self.workers]
+        try:
+            shard.put_nowait((fn, args, kwargs, pending_key, time.monotonic()))
+        except queue.Full:
+            with self._lock:
+                self._pending.discard(pending_key)
+                self.dropped += 1
+            logger.warning(f"Background queue full, not queueing {fn.__qualname__}")
+            return False
+        return True
+
+    def stats(self):
+        with self._lock:
+            started = self.completed + self.failed
+            return {
+                'workers': self.workers,
+                'depth': sum(shard.qsize() for shard in self._queues),
+                'max_depth': self.max_depth,
+                'submitted': self.submitted,
+                'completed': self.completed,
+                'failed': self.failed,
+                'dropped': self.dropped,
+                'coalesced': self.coalesced,
+                'avg_wait_ms': round(1000 * self.total_wait / started, 2) if started else 0.0,
+                'max_wait_ms': round(1000 * self.max_wait, 2)
+            }
+
+    def _run(self, shard):
+        while True:
+            fn, args, kwargs, pending_key, enqueued_at = shard.get()
+            wait = time.monotonic() - enqueued_at
+            if pending_key is not None:
+                # Released before running so changes made from now on queue a fresh task
+                with self._lock:
+                    self._pending.discard(pending_key)
+            with self._lock:
+                self.total_wait += wait
+                self.max_wait = max(self.max_wait, wait)
+            with self._app.app_context():
+                self._execute(fn, args, kwargs)
+
+    def _execute(self, fn, args, kwargs):
+        try:
+            fn(*args, **kwargs)
+            with self._lock:
+                self.completed += 1
+        except Exception as e:
+            with self._lock:
+                self.failed += 1
+            logger.error(f"Background task {fn.__qualname__} failed: {str(e)}")
@@ -0,0 +1,113 @@
+# conversation_vector.py
+
+import logging
+import sys
+from array import array
+
+from bson import Binary
+
+logger = logging.getLogger(__name__)
+
+
+def encode_vector(vector):
+    """Packs a vector as little-endian float32 bytes, about a third the size of a BSON array of doubles."""
+    packed = array('f', vector)
+    if sys.byteorder != 'little':
+        packed.byteswap()
+    return Binary(packed.tobytes())
+
+
+def decode_vector(value):
+    """
+    Unpacks a stored conversation vector. Older documents hold a list of floats, or
+    the `[embedding, debug_info]` pair generate_embedding returns; both are accepted.
+    """
+    if value is None:
+        return None
+    if isinstance(value, (bytes, bytearray)):
+        vector = array('f')
+        vector.frombytes(bytes(value))
+        if sys.byteorder != 'little':
+            vector.byteswap()
+        return vector
+    if isinstance(value, (list, tuple)) and value and isinstance(value[0], (list, tuple)):
+        value = value[0]
+    if isinstance(value, (list, tuple)) and value:
+        return array('f', value)
+    return None
+
+
+class ConversationVector:
+    """
+    Maintains a conversation's embedding as a decayed running mean of its message
+    embeddings:
+
+        weight' = decay * weight + 1
+        mean'   = (decay * weight * mean + embedding) / weight'
+
+    Folding in a message is O(d). With `embed_many`, the unseen messages are
+    embedded in one batch, which embeds the assistant answers and serves the
+    questions from the cache the request already filled. Without it, or when the
+    batch fails, only embeddings already in the cache are used (`embedding_lookup`
+    returns None for a miss, and those messages are skipped), so in practice the
+    vector then follows the user's questions alone. The header stores the vector
+    (`embedding`, packed float32), its `embedding_weight`, and `embedding_seq`,
+    the number of messages folded in so far.
+    """
+
+    def __init__(self, embedding_lookup, decay=0.8, embed_many=None):
+        self.embedding_lookup = embedding_lookup
+        self.embed_many = embed_many
+        self.decay = decay
+        self.folded = 0
+        self.missed = 0
+
+    def fold(self, vector, weight, embedding):
+        embedding = array('f', embedding)
+        if vector is None or len(vector) != len(embedding) or weight <= 0:
+            return embedding, 1.0
+        carried = self.decay * weight
+        new_weight = carried + 1.0
+        scale = carried / new_weight
+        step = 1.0 / new_weight
+        for index, value in enumerate(embedding):
+            vector[index] = vector[index] * scale + value * step
+        return vector, new_weight
+
+    def update(self, header, messages, total):
+        """
+        Folds the messages the header has not seen yet into its vector. `messages`
+        are the conversation's last messages, ending at message number `total`.
+        Returns the header fields to `$set`, or None if nothing changed.
+        """
+        seen = header.get('embedding_seq', 0)
+        first = total - len(messages)
+        unseen = messages[max(0, seen - first):]
+        if not unseen:
+            return None
+
+        vector = decode_vector(header.get('embedding'))
+        weight = header.get('embedding_weight', 1.0 if vector is not None else 0.0)
+        contents = [message['content'] if isinstance(message, dict) else str(message) for message in unseen]
+        for embedding in self.embeddings(contents):
+            if embedding is None:
+                self.missed += 1
+                continue
+            vector, weight = self.fold(vector, weight, embedding)
+            self.folded += 1
+
+        fields = {'embedding_seq': total}
+        if vector is not None:
+            fields.update({'embedding': encode_vector(vector), 'embedding_weight': weight})
+        return fields
+
+    def embeddings(self, contents):
+        """Embeddings for `contents` in order, None for blank texts and cache misses."""
+        if self.embed_many is not None:
+            texts = list(dict.fromkeys(content for content in contents if content.strip()))
+            try:
+                embedded = dict(zip(texts, self.embed_many(texts))) if texts else {}
+                return [embedded.get(content) for content in contents]
+            except Exception as e:
+                logger.error(f"Error embedding conversation messages, using cached embeddings only: {str(e)}")
+        return [self.embedding_lookup(content) if content.strip() else None for content in contents]
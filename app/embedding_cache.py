@@ -0,0 +1,257 @@
+# embedding_cache.py
+
+import hashlib
+import logging
+import threading
+import unicodedata
+from array import array
+from collections import OrderedDict
+from datetime import datetime, timezone
+
+from pymongo import UpdateOne
+
+logger = logging.getLogger(__name__)
+
+EMBEDDING_MODEL = "text-embedding-ada-002"
+
+# Rough per-entry cost beyond the vector itself: the hex key, the array header
+# and the OrderedDict slot.
+ENTRY_OVERHEAD_BYTES = 250
+
+
+def normalize_text(text):
+    """
+    Normalizes text before embedding so trivially different inputs share a cache entry.
+    """
+    return ' '.join(unicodedata.normalize('NFC', text).split())
+
+
+def as_float32(embedding):
+    """
+    Rounds an embedding to float32 precision. Every value the cache returns goes
+    through this, so the same text gets bit-identical vectors whichever tier
+    answered (or whether it was just generated).
+    """
+    return array('f', embedding).tolist()
+
+
+def entry_size(vector):
+    return vector.itemsize * len(vector) + ENTRY_OVERHEAD_BYTES
+
+
+class EmbeddingCache:
+    """
+    Two-tier embedding cache.
+
+    The first tier is an in-process LRU that stores vectors as contiguous float32
+    arrays and evicts by total bytes rather than entry count; the second is a MongoDB collection shared
+    by every worker and instance, keyed by a hash of the model and normalized text
+    and expired through a TTL index on `created_at`. Failures in the persistent
+    tier are logged and never block embedding generation. Returned vectors are
+    always float32-rounded (see `as_float32`), so both tiers agree exactly.
+    """
+
+    def __init__(self, collection_getter, max_bytes=32 * 1024 * 1024, ttl_days=30, model=EMBEDDING_MODEL):
+        self.collection_getter = collection_getter
+        self.max_bytes = max_bytes
+        self.ttl_seconds = int(ttl_days * 24 * 60 * 60)
+        self.model = model
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.memory_hits = 0
+        self.persistent_hits = 0
+        self.misses = 0
+
+    def cache_key(self, text):
+        return hashlib.sha256(f"{self.model}\n{normalize_text(text)}".encode('utf-8')).hexdigest()
+
+    def get_or_create(self, text, embed_fn):
+        """
+        Returns the embedding for `text`, calling `embed_fn(normalized_text)` only
+        when neither tier has it.
+        """
+        key = self.cache_key(text)
+
+        embedding = self._memory_get(key)
+        if embedding is not None:
+            with self._lock:
+                self.memory_hits += 1
+            return embedding
+
+        embedding = self._persistent_get(key)
+        if embedding is not None:
+            with self._lock:
+                self.persistent_hits += 1
+            self._memory_put(key, embedding)
+            return embedding
+
+        with self._lock:
+            self.misses += 1
+        embedding = as_float32(embed_fn(normalize_text(text)))
+        self._memory_put(key, embedding)
+        self._persistent_put(key, embedding)
+        return embedding
+
+    def lookup(self, text):
+        """
+        Returns the cached embedding for `text` from either tier, or None. Never
+        calls the embedding API.
+        """
+        key = self.cache_key(text)
+        embedding = self._memory_get(key)
+        if embedding is not None:
+            with self._lock:
+                self.memory_hits += 1
+            return embedding
+
+        embedding = self._persistent_get(key)
+        with self._lock:
+            if embedding is not None:
+                self.persistent_hits += 1
+            else:
+                self.misses += 1
+        if embedding is not None:
+            self._memory_put(key, embedding)
+        return embedding
+
+    def get_or_create_many(self, texts, embed_many_fn):
+        """
+        Batch form of `get_or_create`. Returns embeddings in the order of `texts`;
+        the persistent tier is read with a single query and all remaining misses
+        are passed to `embed_many_fn(normalized_texts)` in one call.
+        """
+        keys = [self.cache_key(text) for text in texts]
+        found = {}
+
+        for key in set(keys):
+            embedding = self._memory_get(key)
+            if embedding is not None:
+                found[key] = embedding
+        memory_hits = len(found)
+
+        missing = [key for key in dict.fromkeys(keys) if key not in found]
+        persistent = self._persistent_get_many(missing) if missing else {}
+        for key, embedding in persistent.items():
+            self._memory_put(key, embedding)
+        found.update(persistent)
+
+        to_embed = {}
+        for key, text in zip(keys, texts):
+            if key not in found and key not in to_embed:
+                to_embed[key] = normalize_text(text)
+
+        with self._lock:
+            self.memory_hits += memory_hits
+            self.persistent_hits += len(persistent)
+            self.misses += len(to_embed)
+
+        if to_embed:
+            embeddings = embed_many_fn(list(to_embed.values()))
+            for key, embedding in zip(to_embed.keys(), embeddings):
+                embedding = as_float32(embedding)
+                found[key] = embedding
+                self._memory_put(key, embedding)
+            self._persistent_put_many([(key, found[key]) for key in to_embed])
+
+        return [found[key] for key in keys]
+
+    def stats(self):
+        with self._lock:
+            lookups = self.memory_hits + self.persistent_hits + self.misses
+            hits = self.memory_hits + self.persistent_hits
+            return {
+                'memory_hits': self.memory_hits,
+                'persistent_hits': self.persistent_hits,
+                'misses': self.misses,
+                'hit_rate': round(hits / lookups, 4) if lookups else 0.0,
+                'memory_entries': len(self._entries),
+                'memory_bytes': self._bytes
+            }
+
+    def ensure_indexes(self, collection):
+        collection.create_index('created_at', expireAfterSeconds=self.ttl_seconds)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def _memory_get(self, key):
+        with self._lock:
+            vector = self._entries.get(key)
+            if vector is None:
+                return None
+            self._entries.move_to_end(key)
+        return vector.tolist()
+
+    def _memory_put(self, key, embedding):
+        vector = array('f', embedding)
+        size = entry_size(vector)
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._bytes -= entry_size(previous)
+            self._entries[key] = vector
+            self._bytes += size
+            while self._bytes > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self._bytes -= entry_size(evicted)
+
+    def _persistent_get(self, key):
+        try:
+            collection = self.collection_getter()
+            if collection is None:
+                return None
+            document = collection.find_one({'_id': key}, {'embedding': 1})
+            return as_float32(document['embedding']) if document else None
+        except Exception as e:
+            logger.error(f"Error reading embedding cache: {str(e)}")
+            return None
+
+    def _persistent_get_many(self, keys):
+        try:
+            collection = self.collection_getter()
+            if collection is None:
+                return {}
+            documents = collection.find({'_id': {'$in': keys}}, {'embedding': 1})
+            return {document['_id']: as_float32(document['embedding']) for document in documents}
+        except Exception as e:
+            logger.error(f"Error reading embedding cache: {str(e)}")
+            return {}
+
+    def _persistent_put_many(self, items):
+        try:
+            collection = self.collection_getter()
+            if collection is None:
+                return
+            now = datetime.now(timezone.utc)
+            collection.bulk_write([
+                UpdateOne(
+                    {'_id': key},
+                    {'$set': {'model': self.model, 'embedding': embedding, 'created_at': now}},
+                    upsert=True
+                )
+                for key, embedding in items
+            ], ordered=False)
+        except Exception as e:
+            logger.error(f"Error writing embedding cache: {str(e)}")
+
+    def _persistent_put(self, key, embedding):
+        try:
+            collection = self.collection_getter()
+            if collection is None:
+                return
+            collection.update_one(
+                {'_id': key},
+                {'$set': {
+                    'model': self.model,
+                    'embedding': embedding,
+                    'created_at': datetime.now(timezone.utc)
+                }},
+                upsert=True
+            )
+        except Exception as e:
+            logger.error(f"Error writing embedding cache: {str(e)}")
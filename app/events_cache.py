@@ -0,0 +1,55 @@
+# events_cache.py
+
+import logging
+import threading
+import time
+from datetime import datetime, timezone
+
+logger = logging.getLogger(__name__)
+
+
+class EventsAnswerCache:
+    """
+    Holds the rendered upcoming-events answer so event questions are served from memory.
+
+    An entry lives for at most `ttl_seconds`, and never past the start of the
+    earliest listed event, after which that event is no longer upcoming. The
+    events routes call `invalidate()` whenever they change the collection; the
+    TTL bounds staleness for the other worker processes.
+    """
+
+    def __init__(self, ttl_seconds=300):
+        self.ttl_seconds = ttl_seconds
+        self._answer = None
+        self._expires_at = 0.0
+        self._generation = 0
+        self._lock = threading.Lock()
+
+    def get_or_render(self, render_fn):
+        """
+        Returns a copy of the cached answer, calling `render_fn()` on a miss. `render_fn`
+        returns (answer, first_event_at), where first_event_at is an aware datetime or None.
+        """
+        with self._lock:
+            if self._answer is not None and time.monotonic() < self._expires_at:
+                return dict(self._answer)
+            generation = self._generation
+
+        answer, first_event_at = render_fn()
+        expires_at = time.monotonic() + self.ttl_seconds
+        if first_event_at is not None:
+            seconds_until_start = (first_event_at - datetime.now(timezone.utc)).total_seconds()
+            expires_at = min(expires_at, time.monotonic() + max(0.0, seconds_until_start))
+
+        with self._lock:
+            # Drop the render if the collection changed while it was running
+            if generation == self._generation:
+                self._answer = answer
+                self._expires_at = expires_at
+        return dict(answer)
+
+    def invalidate(self):
+        with self._lock:
+            self._answer = None
+            self._generation += 1
+        logger.debug("Events answer cache invalidated")
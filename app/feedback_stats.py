@@ -0,0 +1,97 @@
+# feedback_stats.py
+
+import logging
+from datetime import datetime
+
+from bson import ObjectId
+from pymongo import ASCENDING, DESCENDING
+
+logger = logging.getLogger(__name__)
+
+SORT_ORDER = [('effectiveness', ASCENDING), ('total_feedback', DESCENDING), ('_id', ASCENDING)]
+
+
+class FeedbackStats:
+    """
+    Per-question answer feedback counters in the `answer_feedback_stats` sidecar collection.
+
+    One document per matched question (keyed by the documents `_id`) or, for
+    feedback on answers that did not come from the knowledge base, per original
+    question text. Each feedback submission updates its document atomically, so
+    the admin table is an indexed, sorted, paginated read instead of a `$group`
+    over all feedback plus a `$lookup` per group.
+    scripts/backfill_answer_feedback_stats.py rebuilds the collection from `answer_feedback`.
+    """
+
+    def __init__(self, stats_getter, documents_getter):
+        self.stats_getter = stats_getter
+        self.documents_getter = documents_getter
+
+    def record(self, question_id, original_question, is_positive):
+        """
+        Counts one feedback submission. Only `is_positive is True` counts as positive,
+        the same rule as the answer_feedback_positive rollup counter.
+        """
+        try:
+            self._record(question_id, original_question, is_positive is True)
+        except Exception as e:
+            # Never fail the feedback write that triggered it; the backfill script recounts
+            logger.error(f"Failed to update answer feedback stats for {question_id or original_question!r}: {str(e)}")
+
+    def _record(self, question_id, original_question, is_positive):
+        matched_question = None
+        if question_id:
+            document = self.documents_getter().find_one({'_id': ObjectId(question_id)}, {'question': 1})
+            matched_question = document.get('question') if document else None
+
+        # A pipeline update, so effectiveness is recomputed from the new counts in the same write
+        self.stats_getter().update_one(
+            {'_id': ObjectId(question_id) if question_id else original_question},
+            [
+                {'$set': {
+                    'total_feedback': {'$add': [{'$ifNull': ['$total_feedback', 0]}, 1]},
+                    'positive_feedback': {'$add': [{'$ifNull': ['$positive_feedback', 0]}, 1 if is_positive else 0]},
+                    'original_questions': {'$setUnion': [
+                        {'$ifNull': ['$original_questions', []]},
+                        [{'$literal': original_question}]
+                    ]},
+                    'matched_question': {'$ifNull': [
+                        {'$literal': matched_question},
+                        {'$ifNull': ['$matched_question', {'$literal': original_question}]}
+                    ]},
+                    'is_matched': bool(question_id),
+                    'updated_at': datetime.now()
+                }},
+                {'$set': {
+                    'effectiveness': {'$multiply': [{'$divide': ['$positive_feedback', '$total_feedback']}, 100]}
+                }}
+            ],
+            upsert=True
+        )
+
+    def rename_question(self, question_id, question):
+        """Keeps the displayed question text in step with edits to the matched document."""
+        try:
+            self.stats_getter().update_one({'_id': ObjectId(question_id)}, {'$set': {'matched_question': question}})
+        except Exception as e:
+            logger.error(f"Failed to rename answer feedback stats for {question_id}: {str(e)}")
+
+    def remove_question(self, question_id):
+        """Drops the counters of a deleted document; its raw feedback stays in `answer_feedback`."""
+        try:
+            self.stats_getter().delete_one({'_id': ObjectId(question_id)})
+        except Exception as e:
+            logger.error(f"Failed to remove answer feedback stats for {question_id}: {str(e)}")
+
+    def page(self, page=1, per_page=50):
+        """Returns (stats, total), least effective answers first."""
+        collection = self.stats_getter()
+        total = collection.estimated_document_count()
+        stats = list(collection.find({}, {'updated_at': 0})
+                     .sort(SORT_ORDER)
+                     .skip((page - 1) * per_page)
+                     .limit(per_page))
+        return stats, total
+
+    def ensure_indexes(self, collection):
+        collection.create_index(SORT_ORDER)
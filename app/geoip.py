@@ -0,0 +1,120 @@
+# geoip.py
+
+import ipaddress
+import logging
+import threading
+from collections import OrderedDict
+
+try:
+    import maxminddb
+except ImportError:  # maxminddb is optional; logins are recorded without a location without it
+    maxminddb = None
+
+logger = logging.getLogger(__name__)
+
+_MISSING = object()
+
+
+def client_ip(forwarded_for, remote_addr):
+    """The originating client address: the first X-Forwarded-For hop, else the socket peer."""
+    if forwarded_for:
+        return forwarded_for.split(',')[0].strip()
+    return remote_addr
+
+
+def location_from_record(record):
+    """Maps a GeoLite2/GeoIP2 City record to the `last_location` fields stored on users."""
+    if not record:
+        return None
+    subdivisions = record.get('subdivisions') or [{}]
+    location = record.get('location', {})
+    return {
+        'country': record.get('country', {}).get('names', {}).get('en'),
+        'region': subdivisions[0].get('names', {}).get('en'),
+        'city': record.get('city', {}).get('names', {}).get('en'),
+        'lat': location.get('latitude'),
+        'lon': location.get('longitude')
+    }
+
+
+class GeoIPResolver:
+    """
+    Resolves IP addresses to locations from a local MaxMind (.mmdb) database.
+
+    The database is opened once, read-only and memory-mapped, so lookups are
+    in-process and never touch the network. Recent results, including misses, are
+    kept in an LRU of `cache_size` addresses. Without a database file (or without
+    the maxminddb package) every lookup returns None.
+    """
+
+    def __init__(self, database_path, cache_size=4096):
+        self.database_path = database_path
+        self.cache_size = cache_size
+        self._reader = None
+        self._opened = False
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def reader(self):
+        with self._lock:
+            if not self._opened:
+                self._opened = True
+                self._reader = self._open()
+            return self._reader
+
+    def _open(self):
+        if not self.database_path:
+            return None
+        if maxminddb is None:
+            logger.warning("maxminddb is not installed, login locations will not be recorded")
+            return None
+        try:
+            return maxminddb.open_database(self.database_path, maxminddb.MODE_MMAP)
+        except Exception as e:
+            logger.error(f"Failed to open GeoIP database {self.database_path}: {str(e)}")
+            return None
+
+    def lookup(self, ip):
+        with self._lock:
+            location = self._cache.get(ip, _MISSING)
+            if location is not _MISSING:
+                self._cache.move_to_end(ip)
+                self.hits += 1
+                return location
+            self.misses += 1
+
+        location = self._resolve(ip)
+        with self._lock:
+            self._cache[ip] = location
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+        return location
+
+    def _resolve(self, ip):
+        reader = self.reader()
+        if reader is None or not ip:
+            return None
+        try:
+            address = ipaddress.ip_address(ip)
+        except ValueError:
+            logger.debug(f"Not an IP address: {ip}")
+            return None
+        if not address.is_global:
+            return None
+        try:
+            return location_from_record(reader.get(str(address)))
+        except Exception as e:
+            logger.error(f"GeoIP lookup failed for {ip}: {str(e)}")
+            return None
+
+    def stats(self):
+        with self._lock:
+            return {
+                'database': self.database_path or None,
+                'loaded': self._reader is not None,
+                'hits': self.hits,
+                'misses': self.misses,
+                'entries': len(self._cache)
+            }
@@ -0,0 +1,166 @@
+# intent_classifier.py
+
+import logging
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+from .embedding_cache import normalize_text
+
+logger = logging.getLogger(__name__)
+
+EVENT_KEYWORDS = ['event', 'developer day', 'conference', 'workshop', 'upcoming', 'schedule', 'calendar']
+
+# Keywords trusted to settle an ambiguous score on their own. 'workshop', 'upcoming'
+# and 'schedule' also turn up in technical questions ("schedule a backup", "the
+# workshop's aggregation lab"), so they only nudge the exemplar score.
+AMBIGUOUS_EVENT_KEYWORDS = ['event', 'developer day', 'conference', 'calendar']
+
+EVENT_EXEMPLARS = [
+    "When is the next MongoDB Developer Day?",
+    "Are there any upcoming MongoDB events near me?",
+    "What events are scheduled for next month?",
+    "Where is the next developer day being held?",
+    "How do I register for a MongoDB workshop?",
+    "What is the agenda for the upcoming conference?",
+    "List the MongoDB events happening this quarter",
+    "Is there a Developer Day in my city soon?",
+    "What time does the event start?",
+    "Can you show me the event calendar?",
+    "Who is speaking at the next MongoDB event?",
+    "Which workshops are coming up?",
+]
+
+# Score boost when the question also contains an event keyword
+KEYWORD_BOOST = 0.03
+
+# Calibration: scores are the best ada-002 cosine against EVENT_EXEMPLARS. With
+# that model, rewordings of an exemplar land well above 0.87 and MongoDB how-to
+# questions below 0.82, while short questions that share only vocabulary with the
+# exemplars ("what is on the schedule for the aggregation lab?") fall in between.
+# The defaults (EVENT_INTENT_ACCEPT_THRESHOLD / EVENT_INTENT_REJECT_THRESHOLD) are
+# starting points, not fitted values: after changing the embedding model or the
+# exemplars, log `classify()` scores for a sample of real questions and move the
+# thresholds to the edges of the overlap. tests/test_intent_classifier.py pins the
+# routing around the thresholds.
+
+
+class EventIntentClassifier:
+    """
+    Decides whether a question is asking about events.
+
+    The question embedding is compared with a small set of event exemplars and
+    the best cosine, nudged up when an event keyword is present, is checked
+    against two thresholds. Anything in between is ambiguous: it is settled by
+    the optional `llm_judge` tiebreaker, or by AMBIGUOUS_EVENT_KEYWORDS when there
+    is none.
+    Verdicts are cached per normalized question.
+    """
+
+    def __init__(self, embed_fn, embed_many_fn, llm_judge=None, accept_threshold=0.87,
+                 reject_threshold=0.82, exemplars=EVENT_EXEMPLARS, keywords=EVENT_KEYWORDS,
+                 ambiguous_keywords=AMBIGUOUS_EVENT_KEYWORDS, max_entries=10000):
+        self.embed_fn = embed_fn
+        self.embed_many_fn = embed_many_fn
+        self.llm_judge = llm_judge
+        self.accept_threshold = accept_threshold
+        self.reject_threshold = reject_threshold
+        self.exemplars = list(exemplars)
+        self.keywords = list(keywords)
+        self.ambiguous_keywords = list(ambiguous_keywords)
+        self.max_entries = max_entries
+        self._exemplar_matrix = None
+        self._verdicts = OrderedDict()
+        self._lock = threading.Lock()
+
+    def classify(self, question):
+        """
+        Returns a verdict dict with `event` (True, False, or None when ambiguous and
+        left for `tiebreak`), the exemplar `score` and the deciding `source`.
+        """
+        key = self.cache_key(question)
+        cached = self._cache_get(key)
+        if cached is not None:
+            return dict(cached, source='cache')
+
+        has_keyword = self.has_keyword(question)
+        try:
+            score = self.exemplar_score(question) + (KEYWORD_BOOST if has_keyword else 0.0)
+        except Exception as e:
+            logger.error(f"Error scoring event intent: {str(e)}")
+            score = None
+
+        if score is None:
+            verdict = {'event': has_keyword, 'score': None, 'source': 'keywords'}
+        elif score >= self.accept_threshold:
+            verdict = {'event': True, 'score': round(score, 4), 'source': 'exemplars'}
+        elif score <= self.reject_threshold:
+            verdict = {'event': False, 'score': round(score, 4), 'source': 'exemplars'}
+        elif self.llm_judge is not None:
+            # Not cached: the tiebreak result is what gets remembered
+            return {'event': None, 'score': round(score, 4), 'source': 'ambiguous'}
+        else:
+            verdict = {'event': self.has_keyword(question, self.ambiguous_keywords),
+                       'score': round(score, 4), 'source': 'keywords'}
+
+        self._cache_put(key, verdict)
+        return verdict
+
+    def tiebreak(self, question, score=None):
+        """Settles an ambiguous question with the LLM judge and caches the result."""
+        try:
+            is_event = bool(self.llm_judge(question))
+            source = 'llm'
+        except Exception as e:
+            logger.error(f"Error in event intent tiebreak: {str(e)}")
+            is_event = self.has_keyword(question, self.ambiguous_keywords)
+            source = 'keywords'
+        verdict = {'event': is_event, 'score': score, 'source': source}
+        self._cache_put(self.cache_key(question), verdict)
+        return is_event
+
+    def is_event_related(self, question):
+        verdict = self.classify(question)
+        if verdict['event'] is None:
+            return self.tiebreak(question, verdict['score'])
+        return verdict['event']
+
+    def exemplar_score(self, question):
+        matrix = self._exemplars()
+        query = np.asarray(self.embed_fn(question), dtype=np.float32)
+        norm = np.linalg.norm(query)
+        if norm == 0:
+            return 0.0
+        return float(np.max(matrix @ (query / norm)))
+
+    def has_keyword(self, question, keywords=None):
+        question = question.lower()
+        return any(keyword in question for keyword in (keywords or self.keywords))
+
+    def cache_key(self, question):
+        return normalize_text(question).lower()
+
+    def _exemplars(self):
+        with self._lock:
+            if self._exemplar_matrix is not None:
+                return self._exemplar_matrix
+        matrix = np.asarray(self.embed_many_fn(self.exemplars), dtype=np.float32)
+        matrix /= np.linalg.norm(matrix, axis=1, keepdims=True)
+        with self._lock:
+            self._exemplar_matrix = matrix
+        return matrix
+
+    def _cache_get(self, key):
+        with self._lock:
+            verdict = self._verdicts.get(key)
+            if verdict is not None:
+                self._verdicts.move_to_end(key)
+            return verdict
+
+    def _cache_put(self, key, verdict):
+        with self._lock:
+            self._verdicts[key] = verdict
+            self._verdicts.move_to_end(key)
+            while len(self._verdicts) > self.max_entries:
+                self._verdicts.popitem(last=False)
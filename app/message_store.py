@@ -0,0 +1,123 @@
+# message_store.py
+
+import logging
+from itertools import groupby
+
+from pymongo import ASCENDING, ReturnDocument, UpdateOne
+
+logger = logging.getLogger(__name__)
+
+PREVIEW_SIZE = 2
+
+
+class MessageStore:
+    """
+    Bucket-pattern storage for conversation messages.
+
+    Messages live in `conversation_messages` buckets of exactly `bucket_size`
+    messages, keyed by (conversation_id, bucket). The conversation document stays
+    small and fixed-size: it is a header with `message_count`, the first
+    PREVIEW_SIZE messages (`preview_messages`) and the last `recent_size` messages
+    (`recent_messages`), which is all that listing, context building and the
+    chat path read. Each message gets a sequence number from the header's
+    counter, which decides its bucket and its order on read.
+
+    Conversations still in the old layout keep their embedded `messages` array,
+    which is read ahead of any bucketed messages until
+    scripts/migrate_conversation_messages.py moves it into buckets.
+    """
+
+    def __init__(self, conversations_getter, buckets_getter, bucket_size=50, recent_size=10):
+        self.conversations_getter = conversations_getter
+        self.buckets_getter = buckets_getter
+        self.bucket_size = bucket_size
+        self.recent_size = recent_size
+
+    def append(self, conversation_id, messages, header_set=None, header_inc=None):
+        """
+        Appends `messages` to the conversation. `header_set`/`header_inc` are applied to
+        the header in the same write. Returns the header's new message count, or None
+        if the conversation does not exist.
+        """
+        update = {
+            '$inc': dict(header_inc or {}, message_count=len(messages)),
+            '$push': {
+                'recent_messages': {'$each': messages, '$slice': -self.recent_size},
+                'preview_messages': {'$each': messages, '$slice': PREVIEW_SIZE}
+            }
+        }
+        if header_set:
+            update['$set'] = header_set
+        header = self.conversations_getter().find_one_and_update(
+            {'_id': conversation_id},
+            update,
+            projection={'message_count': 1},
+            return_document=ReturnDocument.AFTER
+        )
+        if header is None:
+            return None
+
+        first_seq = header['message_count'] - len(messages)
+        entries = [dict(message, seq=first_seq + offset) for offset, message in enumerate(messages)]
+        self.write_buckets(conversation_id, entries)
+        return header['message_count']
+
+    def write_buckets(self, conversation_id, entries):
+        operations = []
+        for bucket, bucket_entries in groupby(entries, key=lambda entry: entry['seq'] // self.bucket_size):
+            bucket_entries = list(bucket_entries)
+            operations.append(UpdateOne(
+                {'conversation_id': conversation_id, 'bucket': bucket},
+                {
+                    '$push': {'messages': {'$each': bucket_entries}},
+                    '$inc': {'count': len(bucket_entries)},
+                    '$min': {'first_timestamp': bucket_entries[0]['timestamp']},
+                    '$max': {'last_timestamp': bucket_entries[-1]['timestamp']}
+                },
+                upsert=True
+            ))
+        if operations:
+            self.buckets_getter().bulk_write(operations, ordered=False)
+
+    def recent(self, conversation_id, limit=5):
+        """Returns the last `limit` messages (at most `recent_size`) from the header alone."""
+        header = self.conversations_getter().find_one(
+            {'_id': conversation_id},
+            {'message_count': 1, 'recent_messages': {'$slice': -limit}, 'messages': {'$slice': -limit}}
+        )
+        if header is None:
+            return None
+        return recent_messages(header, limit)
+
+    def all(self, conversation_id):
+        """Returns every message of the conversation in order."""
+        header = self.conversations_getter().find_one({'_id': conversation_id}, {'messages': 1})
+        if header is None:
+            return None
+        buckets = self.buckets_getter().find(
+            {'conversation_id': conversation_id},
+            {'messages': 1}
+        ).sort('bucket', ASCENDING)
+        messages = sorted((message for bucket in buckets for message in bucket['messages']),
+                          key=lambda message: message['seq'])
+        return header.get('messages', []) + messages
+
+    def ensure_indexes(self, collection):
+        collection.create_index([('conversation_id', ASCENDING), ('bucket', ASCENDING)], unique=True)
+
+
+# The helpers below read headers in either layout; an unmigrated conversation keeps
+# its old `messages` array, and anything appended since goes to the new fields.
+
+def recent_messages(header, limit=5):
+    """Last `limit` messages of a conversation header."""
+    return (header.get('messages', []) + header.get('recent_messages', []))[-limit:]
+
+
+def preview_messages(header):
+    """First PREVIEW_SIZE messages of a conversation header."""
+    return (header.get('messages', [])[:PREVIEW_SIZE] + header.get('preview_messages', []))[:PREVIEW_SIZE]
+
+
+def message_count(header):
+    return header.get('message_count', 0) + len(header.get('messages', []))
@@ -0,0 +1,52 @@
+# mongo_heartbeat.py
+
+import logging
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+
+class MongoHeartbeat:
+    """
+    Pings MongoDB from a daemon thread so request handlers can check liveness
+    without a round trip of their own. Only state changes are logged.
+    """
+
+    def __init__(self, client, interval_seconds=10):
+        self.client = client
+        self.interval_seconds = interval_seconds
+        self.healthy = True
+        self.last_error = None
+        self.last_checked = None
+        self._thread = None
+
+    def check(self):
+        try:
+            self.client.admin.command('ping')
+            if not self.healthy:
+                logger.info("MongoDB heartbeat recovered")
+            self.healthy = True
+            self.last_error = None
+        except Exception as e:
+            if self.healthy:
+                logger.error(f"MongoDB heartbeat failed: {str(e)}")
+            self.healthy = False
+            self.last_error = str(e)
+        self.last_checked = time.time()
+        return self.healthy
+
+    def start(self):
+        if self._thread is not None:
+            return
+
+        def run():
+            while True:
+                time.sleep(self.interval_seconds)
+                self.check()
+
+        self._thread = threading.Thread(target=run, name='mongo-heartbeat', daemon=True)
+        self._thread.start()
+
+    def status(self):
+        return {'healthy': self.healthy, 'last_error': self.last_error, 'last_checked': self.last_checked}
@@ -0,0 +1,103 @@
+# nlp.py
+
+import logging
+import random
+import re
+from collections import Counter
+from functools import lru_cache
+
+logger = logging.getLogger(__name__)
+
+# Letters only, like word_tokenize followed by the isalpha() filter topics used
+TOPIC_TOKEN_PATTERN = re.compile(r'[^\W\d_]+')
+
+# Used only when the NLTK stopwords corpus cannot be loaded
+FALLBACK_STOPWORDS = frozenset("""
+a about above after again against all am an and any are as at be because been before being below
+between both but by can could did do does doing down during each few for from further had has have
+having he her here hers herself him himself his how i if in into is it its itself just me more most
+my myself no nor not now of off on once only or other our ours ourselves out over own same she should
+so some such than that the their theirs them themselves then there these they this those through to
+too under until up very was we were what when where which while who whom why will with you your yours
+yourself yourselves
+""".split())
+
+
+@lru_cache(maxsize=1)
+def get_stopwords():
+    """English stopwords, loaded from NLTK once per process."""
+    try:
+        from nltk.corpus import stopwords
+        return frozenset(stopwords.words('english'))
+    except Exception as e:
+        logger.warning(f"NLTK stopwords unavailable, using built-in list: {str(e)}")
+        return FALLBACK_STOPWORDS
+
+
+def topic_tokens(text):
+    stop_words = get_stopwords()
+    return [token for token in TOPIC_TOKEN_PATTERN.findall(text.lower()) if token not in stop_words]
+
+
+def topic_counts(text):
+    """Per-message topic counts, to be folded into a running total."""
+    return Counter(topic_tokens(text))
+
+
+def fold_topic_counts(counts, texts, max_topics=200):
+    """
+    Adds the topic counts of `texts` to `counts` and keeps only the `max_topics`
+    most frequent words, so a long conversation's counts stay a fixed size. A word
+    pruned from the tail starts again from zero if it comes back, which can only
+    matter for words far below the top few that are reported.
+    """
+    folded = Counter(counts or {})
+    for text in texts:
+        folded.update(topic_counts(text))
+    return dict(folded.most_common(max_topics))
+
+
+def top_topics(counts, top_n=5):
+    return [word for word, _ in Counter(counts).most_common(top_n)]
+
+
+def extract_topics(text, top_n=5):
+    return top_topics(topic_counts(text), top_n)
+
+
+def extract_entities(text):
+    """Named entities as (type, value) pairs, using NLTK's pos_tag and ne_chunk."""
+    import nltk
+
+    tokens = nltk.word_tokenize(text)
+    tagged = nltk.pos_tag(tokens)
+    entities = nltk.chunk.ne_chunk(tagged)
+
+    named_entities = []
+    for subtree in entities:
+        if isinstance(subtree, nltk.Tree):
+            entity_type = subtree.label()
+            entity_value = ' '.join([leaf[0] for leaf in subtree.leaves()])
+            named_entities.append((entity_type, entity_value))
+    return named_entities
+
+
+class EntityExtractor:
+    """
+    Samples entity extraction: the MaxEnt chunker runs for only a `sample_rate`
+    fraction of calls, and `extract` returns None for the rest, meaning "keep the
+    previous entities". Callers run it from the background pipeline, so it is
+    already off the response path; sampling bounds how much CPU it takes there.
+    """
+
+    def __init__(self, sample_rate=1.0):
+        self.sample_rate = sample_rate
+        self.runs = 0
+        self.skips = 0
+
+    def extract(self, text):
+        if random.random() >= self.sample_rate:
+            self.skips += 1
+            return None
+        self.runs += 1
+        return extract_entities(text)
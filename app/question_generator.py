@@ -1,10 +1,9 @@
 from app.utils import (
-    generate_embedding,
+    get_cached_embedding,
+    generate_embeddings,
     search_similar_questions,
     add_question_answer,
-    generate_title,
-    generate_summary,
-    generate_references,
+    generate_answer_metadata,
     get_db_connection
 )
 from flask import Blueprint, request, jsonify, render_template, current_app, session, send_from_directory
@@ -78,10 +77,12 @@ def save_to_mongodb(question, answer, similarity_threshold):
     try:
         current_app.logger.debug(f"Saving question to MongoDB: {question[:50]}...")
         
-        question_embedding, _ = generate_embedding(question)
+        question_embedding = get_cached_embedding(question)
         current_app.logger.debug(f"Generated question embedding, length: {len(question_embedding)}")
         
-        similar_question = search_similar_questions(question_embedding, question, similarity_threshold=similarity_threshold)
+        # Generated pairs have no module, so look for duplicates across all of them
+        similar_question = search_similar_questions(question_embedding, question, None,
+                                                    similarity_threshold=similarity_threshold)
         
         if similar_question is None:
             current_app.logger.warning("Failed to search for similar questions. Proceeding with insertion.")
@@ -89,16 +90,13 @@ def save_to_mongodb(question, answer, similarity_threshold):
             current_app.logger.debug(f"Similar question found. Skipping insertion.")
             return False
         
-        title = generate_title(answer)
-        summary = generate_summary(answer)
-        references = generate_references(answer)
+        metadata = generate_answer_metadata(answer)
+        title = metadata['title']
+        summary = metadata['summary']
+        references = metadata['references']
         
-        db = get_db_connection()
-        if db is None:
-            current_app.logger.error("Failed to get database connection")
-            return False
-
-        result = add_question_answer(db, question, answer, title, summary, references)
+        # add_question_answer receives its db handle from @with_db_connection
+        result = add_question_answer(question, answer, title, summary, references)
         current_app.logger.debug(f"Question saved to MongoDB with ID: {result}")
         return True
     except Exception as e:
@@ -106,6 +104,27 @@ def save_to_mongodb(question, answer, similarity_threshold):
         current_app.logger.error(traceback.format_exc())
         return False
 
+def save_qa_pairs(qa_pairs, similarity_threshold):
+    """
+    Saves generated question/answer pairs and returns how many were added.
+
+    Every question and answer is embedded up front in batched requests, so the
+    per-pair saves below are served from the embedding cache.
+    """
+    if not qa_pairs:
+        return 0
+
+    try:
+        generate_embeddings([text for pair in qa_pairs for text in pair])
+    except Exception as e:
+        current_app.logger.error(f"Error batch embedding QA pairs: {str(e)}")
+
+    questions_added = 0
+    for question, answer in qa_pairs:
+        if save_to_mongodb(question, answer, similarity_threshold):
+            questions_added += 1
+    return questions_added
+
 # You can keep these functions if they're specific to question generation and not present in utils.py
 def extract_text_from_file(file_path):
     current_app.logger.debug(f"Extracting text from TXT: {file_path}")
@@ -0,0 +1,255 @@
+# reranker.py
+
+import hashlib
+import logging
+import math
+import re
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timezone
+
+import numpy as np
+
+from .embedding_cache import normalize_text
+
+logger = logging.getLogger(__name__)
+
+TOKEN_PATTERN = re.compile(r'[a-z0-9]+')
+
+# Short function words carry no intent; dropping them keeps lexical overlap
+# focused on the terms that distinguish one question from another.
+OVERLAP_STOPWORDS = frozenset("""
+a an and are as at be can do does for from how i in is it my of on or the to
+what when where which who why with you your
+""".split())
+
+# Logistic calibration over (question cosine, answer cosine, lexical overlap).
+# Centred on ada-002 cosines, where paraphrases sit around 0.95 and merely
+# related questions around 0.88. `LocalReranker.calibrate` refits these from
+# the LLM verdicts collected in the ambiguous band.
+DEFAULT_WEIGHTS = (-37.7, 30.0, 10.0, 4.0)
+
+
+def content_tokens(text):
+    return {token for token in TOKEN_PATTERN.findall(text.lower()) if token not in OVERLAP_STOPWORDS}
+
+
+def lexical_overlap(query, candidate):
+    query_tokens = content_tokens(query)
+    candidate_tokens = content_tokens(candidate)
+    if not query_tokens or not candidate_tokens:
+        return 0.0
+    return len(query_tokens & candidate_tokens) / len(query_tokens | candidate_tokens)
+
+
+def cosine(a, b):
+    if a is None or b is None:
+        return None
+    a = np.asarray(a, dtype=np.float32)
+    b = np.asarray(b, dtype=np.float32)
+    denominator = np.linalg.norm(a) * np.linalg.norm(b)
+    return float(a @ b / denominator) if denominator else 0.0
+
+
+class LocalReranker:
+    """
+    Decides whether a retrieved question answers the user's question.
+
+    Each candidate is scored locally from the cosine of the query embedding with the
+    stored question and answer embeddings plus lexical overlap, squashed through a
+    logistic calibration into a probability. Confident accepts and rejects are
+    decided locally; only the ambiguous band in between goes to `llm_judge`.
+    Verdicts are cached in memory and in MongoDB keyed by (query hash, candidate id),
+    so a repeated question costs one dictionary lookup. The memory tier is an LRU of
+    at most `max_entries` verdicts that each expire after `memory_ttl_seconds`, which
+    bounds how long another worker's invalidation can go unnoticed here. A verdict
+    whose LLM tiebreak failed is returned but never cached.
+    """
+
+    def __init__(self, verdicts_getter, documents_getter, llm_judge=None, accept_threshold=0.8,
+                 reject_threshold=0.35, llm_threshold=0.8, ttl_days=30, max_entries=10000,
+                 memory_ttl_seconds=3600, weights=DEFAULT_WEIGHTS):
+        self.verdicts_getter = verdicts_getter
+        self.documents_getter = documents_getter
+        self.llm_judge = llm_judge
+        self.accept_threshold = accept_threshold
+        self.reject_threshold = reject_threshold
+        self.llm_threshold = llm_threshold
+        self.ttl_seconds = int(ttl_days * 24 * 60 * 60)
+        self.max_entries = max_entries
+        self.memory_ttl_seconds = memory_ttl_seconds
+        self.weights = tuple(weights)
+        self._verdicts = OrderedDict()
+        self._lock = threading.Lock()
+        self.counts = {'cache': 0, 'local': 0, 'llm': 0}
+
+    def verdict_key(self, query, candidate_id):
+        query_hash = hashlib.sha256(normalize_text(query).lower().encode('utf-8')).hexdigest()
+        return f"{query_hash}:{candidate_id}"
+
+    def verify(self, query, query_embedding, candidate):
+        """
+        Returns a verdict dict with `relevant`, the calibrated `score`, the LLM's
+        `llm_score` when it was consulted and `source` ('cache', 'local' or 'llm').
+        """
+        key = self.verdict_key(query, candidate['_id'])
+        cached = self._memory_get(key)
+        if cached is None:
+            cached = self._persistent_get(key)
+            if cached is not None:
+                self._memory_put(key, cached)
+        if cached is not None:
+            self._count('cache')
+            return dict(cached, source='cache')
+
+        features = self.features(query, query_embedding, candidate)
+        probability = self.calibrated_score(features)
+        verdict = {'relevant': probability >= self.accept_threshold, 'score': round(probability, 4),
+                   'features': features, 'decided_by': 'local'}
+
+        cacheable = True
+        if self.reject_threshold < probability < self.accept_threshold and self.llm_judge is not None:
+            try:
+                llm_score = self.llm_judge(query, candidate['question'])
+                verdict.update(relevant=llm_score >= self.llm_threshold, llm_score=llm_score, decided_by='llm')
+            except Exception as e:
+                # Without the tiebreaker an ambiguous match is not trusted, but only for
+                # this request: the next one asks the LLM again
+                logger.error(f"Error in LLM similarity check: {str(e)}")
+                cacheable = False
+
+        self._count(verdict['decided_by'])
+        if cacheable:
+            self._memory_put(key, verdict)
+            self._persistent_put(key, candidate['_id'], verdict)
+        return dict(verdict, source=verdict['decided_by'])
+
+    def features(self, query, query_embedding, candidate):
+        embeddings = self._candidate_embeddings(candidate)
+        question_cosine = cosine(query_embedding, embeddings.get('question_embedding'))
+        answer_cosine = cosine(query_embedding, embeddings.get('answer_embedding'))
+        return {
+            'question_cosine': round(question_cosine, 4) if question_cosine is not None else 0.0,
+            # Fall back to the question cosine so a missing answer embedding is neutral
+            'answer_cosine': round(answer_cosine if answer_cosine is not None else (question_cosine or 0.0), 4),
+            'lexical_overlap': round(lexical_overlap(query, candidate.get('question', '')), 4)
+        }
+
+    def calibrated_score(self, features):
+        bias, question_weight, answer_weight, lexical_weight = self.weights
+        logit = (bias + question_weight * features['question_cosine']
+                 + answer_weight * features['answer_cosine']
+                 + lexical_weight * features['lexical_overlap'])
+        return 1 / (1 + math.exp(-max(min(logit, 50), -50)))
+
+    def calibrate(self, min_examples=50, iterations=2000, learning_rate=0.5):
+        """
+        Refits the logistic weights on cached LLM verdicts. Returns the new weights,
+        or None when there are too few labelled examples to fit.
+        """
+        collection = self.verdicts_getter()
+        if collection is None:
+            return None
+        examples = list(collection.find({'decided_by': 'llm'}, {'features': 1, 'relevant': 1}))
+        labels = [bool(example['relevant']) for example in examples]
+        if len(examples) < min_examples or all(labels) or not any(labels):
+            return None
+
+        x = np.array([[1.0, example['features']['question_cosine'], example['features']['answer_cosine'],
+                       example['features']['lexical_overlap']] for example in examples])
+        y = np.array(labels, dtype=np.float64)
+        w = np.array(self.weights, dtype=np.float64)
+        for _ in range(iterations):
+            predictions = 1 / (1 + np.exp(-np.clip(x @ w, -50, 50)))
+            w -= learning_rate * x.T @ (predictions - y) / len(y)
+
+        self.weights = tuple(float(weight) for weight in w)
+        logger.info(f"Reranker recalibrated on {len(examples)} verdicts: {self.weights}")
+        return self.weights
+
+    def stats(self):
+        with self._lock:
+            return dict(self.counts, memory_entries=len(self._verdicts), weights=list(self.weights))
+
+    def ensure_indexes(self, collection):
+        collection.create_index('created_at', expireAfterSeconds=self.ttl_seconds)
+        collection.create_index('candidate_id')
+
+    def invalidate_candidate(self, candidate_id):
+        """
+        Drops cached verdicts for a document whose question or answer changed.
+
+        The MongoDB tier is shared, but only this process' memory tier is cleared;
+        other workers keep serving their copies for up to `memory_ttl_seconds`.
+        """
+        suffix = f":{candidate_id}"
+        with self._lock:
+            for key in [key for key in self._verdicts if key.endswith(suffix)]:
+                del self._verdicts[key]
+        try:
+            collection = self.verdicts_getter()
+            if collection is not None:
+                collection.delete_many({'candidate_id': candidate_id})
+        except Exception as e:
+            logger.error(f"Error invalidating reranker verdicts: {str(e)}")
+
+    def _candidate_embeddings(self, candidate):
+        if 'question_embedding' in candidate and 'answer_embedding' in candidate:
+            return candidate
+        try:
+            collection = self.documents_getter()
+            document = collection.find_one(
+                {'_id': candidate['_id']},
+                {'question_embedding': 1, 'answer_embedding': 1}
+            ) if collection is not None else None
+            return document or {}
+        except Exception as e:
+            logger.error(f"Error loading candidate embeddings: {str(e)}")
+            return {}
+
+    def _count(self, source):
+        with self._lock:
+            self.counts[source] += 1
+
+    def _memory_get(self, key):
+        with self._lock:
+            entry = self._verdicts.get(key)
+            if entry is None:
+                return None
+            expires_at, verdict = entry
+            if time.monotonic() >= expires_at:
+                del self._verdicts[key]
+                return None
+            self._verdicts.move_to_end(key)
+            return verdict
+
+    def _memory_put(self, key, verdict):
+        with self._lock:
+            self._verdicts[key] = (time.monotonic() + self.memory_ttl_seconds, verdict)
+            self._verdicts.move_to_end(key)
+            while len(self._verdicts) > self.max_entries:
+                self._verdicts.popitem(last=False)
+
+    def _persistent_get(self, key):
+        try:
+            collection = self.verdicts_getter()
+            if collection is None:
+                return None
+            return collection.find_one({'_id': key}, {'_id': 0, 'candidate_id': 0, 'created_at': 0})
+        except Exception as e:
+            logger.error(f"Error reading reranker verdicts: {str(e)}")
+            return None
+
+    def _persistent_put(self, key, candidate_id, verdict):
+        try:
+            collection = self.verdicts_getter()
+            if collection is None:
+                return
+            collection.update_one(
+                {'_id': key},
+                {'$set': dict(verdict, candidate_id=candidate_id, created_at=datetime.now(timezone.utc))},
+                upsert=True
+            )
+        except Exception as e:
+            logger.error(f"Error writing reranker verdicts: {str(e)}")
@@ -0,0 +1,502 @@
+# retrieval.py
+
+import difflib
+import logging
+import math
+import re
+import threading
+import time
+from collections import Counter, defaultdict
+
+from pymongo.errors import ExecutionTimeout, OperationFailure
+
+from .vector_index import DOCUMENT_FIELDS, LocalVectorIndex, matches_module
+
+logger = logging.getLogger(__name__)
+
+DOCUMENT_PROJECTION = {
+    'question': 1,
+    'answer': 1,
+    'title': 1,
+    'summary': 1,
+    'references': 1,
+    'module': 1,
+}
+TEXT_SEARCH_FIELDS = ('question', 'answer', 'title')
+TOKEN_PATTERN = re.compile(r'[a-z0-9]+')
+# How mongot rejects a filter on a path the index does not declare, e.g.
+# "Path 'module' needs to be indexed as token"
+UNINDEXED_FILTER_PATTERN = re.compile(r"path '?module'?.*indexed", re.IGNORECASE | re.DOTALL)
+
+
+def tokenize(text):
+    return TOKEN_PATTERN.findall(text.lower()) if text else []
+
+
+def rank_branch_stages(score_field, rrf_k):
+    """
+    Stages that turn a search branch into (_id, question, score, rrf) rows, where
+    rrf = 1 / (k + rank) and rank is the 1-based position in the branch.
+    """
+    return [
+        {'$group': {'_id': None, 'docs': {'$push': '$$ROOT'}}},
+        {'$unwind': {'path': '$docs', 'includeArrayIndex': 'rank'}},
+        {
+            '$project': {
+                '_id': '$docs._id',
+                'question': '$docs.question',
+                score_field: f'$docs.{score_field}',
+                'rrf': {'$divide': [1, {'$add': ['$rank', rrf_k + 1]}]}
+            }
+        }
+    ]
+
+
+def fuse_reciprocal_rank(vector_results, text_results, rrf_k):
+    """
+    Python counterpart of the server-side RRF pipeline. Returns one row per
+    document with `vector_score`, `text_score`, `rrf_score` and a normalised
+    `combined_score` in [0, 1].
+
+    `combined_score` only orders the rows. It is relative to the other candidates
+    (the top row scores about 1.0 whenever both branches agree, and a row found
+    by one branch scores at most 0.5), so relevance is gated on the raw
+    `vector_score` instead; see `passes_similarity_threshold`.
+    """
+    fused = {}
+    for score_field, results in (('vector_score', vector_results), ('text_score', text_results)):
+        for rank, result in enumerate(results):
+            row = fused.setdefault(result['_id'], {
+                '_id': result['_id'],
+                'question': result.get('question'),
+                'vector_score': None,
+                'text_score': None,
+                'rrf_score': 0.0
+            })
+            row[score_field] = result.get(score_field)
+            row['rrf_score'] += 1.0 / (rrf_k + rank + 1)
+    for row in fused.values():
+        row['combined_score'] = row['rrf_score'] / (2.0 / (rrf_k + 1))
+    return sorted(fused.values(), key=lambda row: row['combined_score'], reverse=True)
+
+
+def is_unindexed_filter_error(error):
+    return bool(UNINDEXED_FILTER_PATTERN.search(str(error)))
+
+
+def passes_similarity_threshold(row, similarity_threshold):
+    """A fused row is a match only if its own vector score clears the cosine threshold."""
+    return row.get('vector_score') is not None and row['vector_score'] >= similarity_threshold
+
+
+class RetrievalBackend:
+    """
+    Interface for the retrieval primitives used by chat search, admin search and
+    autocomplete. `collection` is the documents collection resolved by the caller;
+    backends that keep their own index may ignore it.
+    """
+
+    def vector_search(self, collection, query_vector, limit=10, module=None, max_time_ms=None):
+        raise NotImplementedError
+
+    def text_search(self, collection, query, limit=None, module=None, fuzzy=True, max_time_ms=None):
+        raise NotImplementedError
+
+    def hybrid_search(self, collection, query_vector, query, module=None, similarity_threshold=0.0,
+                      limit=5, rrf_k=60, max_time_ms=None):
+        raise NotImplementedError
+
+    def autocomplete(self, collection, prefix, limit=5):
+        raise NotImplementedError
+
+    def remove(self, doc_id):
+        """Hook for backends that need to drop a deleted document from their own index."""
+
+    def start(self, app):
+        """Hook for backends that need to load or refresh state in the background."""
+
+
+class AtlasRetrievalBackend(RetrievalBackend):
+    """
+    Retrieval through Atlas Vector Search and Atlas Search aggregation stages.
+
+    A selected module is applied as a pre-filter inside both search stages, which
+    needs the index definitions from scripts/manage_search_indexes.py. If a search
+    is rejected because `module` is not indexed as a filter field, the module is
+    matched after the search stage instead, as before the indexes declared it, and
+    the pre-filter is retried every `prefilter_retry_seconds`. Any other failure
+    is raised.
+    """
+
+    def __init__(self, vector_index='question_index', text_index='default', autocomplete_index='autocomplete',
+                 prefilter_retry_seconds=300):
+        self.vector_index = vector_index
+        self.text_index = text_index
+        self.autocomplete_index = autocomplete_index
+        self.prefilter_retry_seconds = prefilter_retry_seconds
+        self._prefilter_failed_at = None
+
+    def vector_search(self, collection, query_vector, limit=10, module=None, max_time_ms=None):
+        return self._aggregate(collection, lambda prefilter: self.vector_branch(query_vector, limit, module, prefilter) + [
+            {'$project': dict(DOCUMENT_PROJECTION, vector_score={'$meta': 'vectorSearchScore'})}
+        ], module, max_time_ms)
+
+    def text_search(self, collection, query, limit=None, module=None, fuzzy=True, max_time_ms=None):
+        return self._aggregate(collection, lambda prefilter: self.text_branch(query, limit, module, fuzzy, prefilter) + [
+            {'$project': dict(DOCUMENT_PROJECTION, text_score={'$meta': 'searchScore'})}
+        ], module, max_time_ms)
+
+    def hybrid_search(self, collection, query_vector, query, module=None, similarity_threshold=0.0,
+                      limit=5, rrf_k=60, max_time_ms=None):
+        return self._aggregate(
+            collection,
+            lambda prefilter: self.hybrid_pipeline(collection, query_vector, query, module, similarity_threshold,
+                                                   limit, rrf_k, prefilter),
+            module, max_time_ms
+        )
+
+    def hybrid_pipeline(self, collection, query_vector, query, module, similarity_threshold, limit, rrf_k,
+                        prefilter=True):
+        vector_branch = self.vector_branch(query_vector, 10, module, prefilter) + [
+            {'$project': {'question': 1, 'vector_score': {'$meta': 'vectorSearchScore'}}}
+        ]
+        text_branch = self.text_branch(query, 10, module, True, prefilter) + [
+            {'$project': {'question': 1, 'text_score': {'$meta': 'searchScore'}}}
+        ]
+        return vector_branch + rank_branch_stages('vector_score', rrf_k) + [
+            {
+                '$unionWith': {
+                    'coll': collection.name,
+                    'pipeline': text_branch + rank_branch_stages('text_score', rrf_k)
+                }
+            },
+            {
+                '$group': {
+                    '_id': '$_id',
+                    'question': {'$first': '$question'},
+                    'vector_score': {'$max': '$vector_score'},
+                    'text_score': {'$max': '$text_score'},
+                    'rrf_score': {'$sum': '$rrf'}
+                }
+            },
+            {
+                '$addFields': {
+                    'combined_score': {'$divide': ['$rrf_score', 2.0 / (rrf_k + 1)]}
+                }
+            },
+            # Same rule as passes_similarity_threshold; RRF only decides the order
+            {'$match': {'vector_score': {'$gte': similarity_threshold}}},
+            {'$sort': {'combined_score': -1}},
+            {'$limit': limit}
+        ]
+
+    def autocomplete(self, collection, prefix, limit=5):
+        pipeline = [
+            {
+                "$search": {
+                    "index": self.autocomplete_index,
+                    "autocomplete": {
+                        "query": prefix,
+                        "path": "question",
+                        "tokenOrder": "sequential"
+                    }
+                }
+            },
+            {
+                "$project": {
+                    "_id": 0,
+                    "question": 1,
+                    "score": {"$meta": "searchScore"}
+                }
+            },
+            {"$limit": limit}
+        ]
+        return list(collection.aggregate(pipeline))
+
+    def vector_branch(self, query_vector, limit, module, prefilter=True):
+        vector_search = {
+            'index': self.vector_index,
+            'path': 'question_embedding',
+            'queryVector': query_vector,
+            'numCandidates': 100,
+            'limit': limit
+        }
+        if module and prefilter:
+            # Pre-filter so all candidates come from the module; needs `module`
+            # declared as a filter field (scripts/manage_search_indexes.py)
+            vector_search['filter'] = {'module': module}
+        stages = [{'$vectorSearch': vector_search}]
+        if module and not prefilter:
+            stages.append({'$match': {'module': module}})
+        return stages
+
+    def text_branch(self, query, limit, module, fuzzy, prefilter=True):
+        text = {'query': query, 'path': list(TEXT_SEARCH_FIELDS)}
+        if fuzzy:
+            text['fuzzy'] = {'maxEdits': 2}
+        if module and prefilter:
+            # `module` is indexed as a token field, so equals filters inside the search
+            search = {'index': self.text_index, 'compound': {
+                'must': [{'text': text}],
+                'filter': [{'equals': {'path': 'module', 'value': module}}]
+            }}
+        else:
+            search = {'index': self.text_index, 'text': text}
+        stages = [{'$search': search}]
+        if module and not prefilter:
+            stages.append({'$match': {'module': module}})
+        if limit:
+            stages.append({'$limit': limit})
+        return stages
+
+    def _aggregate(self, collection, build_pipeline, module, max_time_ms):
+        prefilter = bool(module) and (
+            self._prefilter_failed_at is None
+            or time.monotonic() - self._prefilter_failed_at >= self.prefilter_retry_seconds
+        )
+        try:
+            results = list(collection.aggregate(build_pipeline(prefilter), maxTimeMS=max_time_ms))
+        except ExecutionTimeout:
+            raise
+        except OperationFailure as e:
+            if not prefilter or not is_unindexed_filter_error(e):
+                raise
+            results = list(collection.aggregate(build_pipeline(False), maxTimeMS=max_time_ms))
+            logger.warning(f"Module pre-filter rejected, matching the module after search until "
+                           f"scripts/manage_search_indexes.py has been run: {str(e)}")
+            self._prefilter_failed_at = time.monotonic()
+            return results
+        if prefilter and self._prefilter_failed_at is not None:
+            logger.info("Module pre-filter accepted again")
+            self._prefilter_failed_at = None
+        return results
+
+
+class BM25Index:
+    """
+    Okapi BM25 over the question, answer and title of each document. Each field
+    is scored separately and the field scores are summed, which is close to what
+    Atlas Search does for a multi-path text query.
+    """
+
+    def __init__(self, k1=1.2, b=0.75):
+        self.k1 = k1
+        self.b = b
+        self.documents = []
+        self.postings = {}
+        self.field_lengths = {}
+        self.average_lengths = {}
+        self.vocabulary = []
+
+    def build(self, documents):
+        postings = {field: defaultdict(list) for field in TEXT_SEARCH_FIELDS}
+        field_lengths = {field: [] for field in TEXT_SEARCH_FIELDS}
+        for position, document in enumerate(documents):
+            for field in TEXT_SEARCH_FIELDS:
+                value = document.get(field)
+                tokens = tokenize(value if isinstance(value, str) else '')
+                field_lengths[field].append(len(tokens))
+                for term, frequency in Counter(tokens).items():
+                    postings[field][term].append((position, frequency))
+
+        self.documents = documents
+        self.postings = {field: dict(terms) for field, terms in postings.items()}
+        self.field_lengths = field_lengths
+        self.average_lengths = {
+            field: (sum(lengths) / len(lengths) if lengths else 0.0)
+            for field, lengths in field_lengths.items()
+        }
+        self.vocabulary = sorted({term for terms in self.postings.values() for term in terms})
+
+    def search(self, query, limit=None, module=None, fuzzy=True):
+        terms = self.expand_terms(tokenize(query), fuzzy)
+        if not terms or not self.documents:
+            return []
+
+        total = len(self.documents)
+        scores = defaultdict(float)
+        for field in TEXT_SEARCH_FIELDS:
+            field_postings = self.postings.get(field, {})
+            lengths = self.field_lengths[field]
+            average_length = self.average_lengths[field] or 1.0
+            for term in terms:
+                postings = field_postings.get(term)
+                if not postings:
+                    continue
+                idf = math.log(1 + (total - len(postings) + 0.5) / (len(postings) + 0.5))
+                for position, frequency in postings:
+                    norm = self.k1 * (1 - self.b + self.b * lengths[position] / average_length)
+                    scores[position] += idf * frequency * (self.k1 + 1) / (frequency + norm)
+
+        ranked = sorted(scores.items(), key=lambda item: item[1], reverse=True)
+        results = []
+        for position, score in ranked:
+            document = self.documents[position]
+            if module and not matches_module(document, module):
+                continue
+            result = dict(document)
+            result['text_score'] = score
+            results.append(result)
+            if limit and len(results) == limit:
+                break
+        return results
+
+    def expand_terms(self, terms, fuzzy):
+        if not fuzzy:
+            return terms
+        # Stand-in for Atlas' maxEdits fuzzy matching on terms we have never seen
+        expanded = []
+        for term in terms:
+            if any(term in field_postings for field_postings in self.postings.values()):
+                expanded.append(term)
+            else:
+                expanded.extend(difflib.get_close_matches(term, self.vocabulary, n=3, cutoff=0.8))
+        return expanded
+
+
+class LocalRetrievalBackend(RetrievalBackend):
+    """
+    Retrieval without Atlas Search: exact cosine search through LocalVectorIndex
+    and BM25 over an in-memory inverted index. Works against any mongod, which
+    makes the full chat path runnable and measurable on a single machine.
+
+    Requests only read the current indexes. A background thread applies changes,
+    reloads everything every `rebuild_seconds` so that deletions made by other
+    workers are picked up, and builds a fresh BM25 index next to the live one
+    before swapping it in. BM25 covers every document, including those without a
+    question embedding.
+    """
+
+    def __init__(self, collection_getter, refresh_seconds=30, rebuild_seconds=900):
+        self.collection_getter = collection_getter
+        self.index = LocalVectorIndex(
+            collection_getter,
+            refresh_seconds=refresh_seconds,
+            max_staleness_seconds=float('inf'),
+            rebuild_seconds=rebuild_seconds,
+            hnsw_threshold=float('inf')
+        )
+        self.bm25 = BM25Index()
+        self.refresh_seconds = refresh_seconds
+        self.rebuild_seconds = rebuild_seconds
+        self._indexed_version = None
+        self._removed = set()
+        self._last_rebuild = None
+        self._app = None
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def vector_search(self, collection, query_vector, limit=10, module=None, max_time_ms=None):
+        self.ensure_loaded()
+        return self.index.search(query_vector, limit=limit, module=module)
+
+    def text_search(self, collection, query, limit=None, module=None, fuzzy=True, max_time_ms=None):
+        self.ensure_loaded()
+        removed = self._removed
+        results = self.bm25.search(query, limit=(limit + len(removed)) if limit else None,
+                                   module=module, fuzzy=fuzzy)
+        if removed:
+            results = [result for result in results if result['_id'] not in removed]
+        return results[:limit] if limit else results
+
+    def hybrid_search(self, collection, query_vector, query, module=None, similarity_threshold=0.0,
+                      limit=5, rrf_k=60, max_time_ms=None):
+        vector_results = self.vector_search(collection, query_vector, limit=10, module=module)
+        text_results = self.text_search(collection, query, limit=10, module=module)
+        fused = fuse_reciprocal_rank(vector_results, text_results, rrf_k)
+        return [row for row in fused if passes_similarity_threshold(row, similarity_threshold)][:limit]
+
+    def autocomplete(self, collection, prefix, limit=5):
+        self.ensure_loaded()
+        prefix = ' '.join(tokenize(prefix))
+        if not prefix:
+            return []
+        pattern = re.compile(r'\b' + re.escape(prefix))
+        matches = []
+        for document in self.bm25.documents:
+            if document['_id'] in self._removed:
+                continue
+            question = document.get('question') or ''
+            match = pattern.search(' '.join(tokenize(question)))
+            if match:
+                # Earlier matches rank higher, like a sequential autocomplete token match
+                matches.append({'question': question, 'score': 1.0 / (1 + match.start())})
+        matches.sort(key=lambda match: match['score'], reverse=True)
+        return matches[:limit]
+
+    def remove(self, doc_id):
+        self.index.remove(doc_id)
+        # Hidden from text results until the next BM25 build drops the document
+        self._removed = self._removed | {doc_id}
+
+    def ensure_loaded(self):
+        """Loads both indexes on first use; later changes come from the background thread."""
+        if self._indexed_version is not None:
+            return
+        with self._lock:
+            if self._indexed_version is not None:
+                return
+            if self._app is not None:
+                # Search threads have no app context, which get_collection needs
+                with self._app.app_context():
+                    self._load()
+            else:
+                self._load()
+
+    def start(self, app):
+        if self._thread is not None:
+            return
+        self._app = app
+        with app.app_context():
+            self.ensure_loaded()
+
+        def run():
+            while True:
+                time.sleep(self.refresh_seconds)
+                try:
+                    with app.app_context():
+                        self.sync()
+                except Exception as e:
+                    logger.error(f"Error refreshing local retrieval backend: {str(e)}")
+
+        self._thread = threading.Thread(target=run, name='local-retrieval', daemon=True)
+        self._thread.start()
+
+    def sync(self):
+        """Brings both indexes up to date; runs on the background thread."""
+        with self._lock:
+            if self._last_rebuild is None or time.monotonic() - self._last_rebuild >= self.rebuild_seconds:
+                self._load()
+                return
+            self.index.refresh()
+            version, _ = self.index.snapshot()
+            if version != self._indexed_version:
+                self._rebuild_bm25(version)
+
+    def _load(self):
+        self.index.load()
+        version, _ = self.index.snapshot()
+        self._rebuild_bm25(version)
+        self._last_rebuild = time.monotonic()
+
+    def _rebuild_bm25(self, version):
+        collection = self.collection_getter()
+        if collection is None:
+            raise RuntimeError("Documents collection is not available")
+        removed = self._removed
+        projection = {field: 1 for field in DOCUMENT_FIELDS}
+        bm25 = BM25Index(self.bm25.k1, self.bm25.b)
+        bm25.build(list(collection.find({}, projection)))
+        # Plain attribute assignment, so searches see either the old or the new index
+        self.bm25 = bm25
+        self._removed = self._removed - removed
+        self._indexed_version = version
+
+
+def create_retrieval_backend(name, collection_getter, refresh_seconds=30, rebuild_seconds=900):
+    if name == 'atlas':
+        return AtlasRetrievalBackend()
+    if name == 'local':
+        return LocalRetrievalBackend(collection_getter, refresh_seconds=refresh_seconds,
+                                     rebuild_seconds=rebuild_seconds)
+    raise ValueError(f"Unknown retrieval backend: {name}")
@@ -2,15 +2,15 @@ import os
 import json 
 import traceback 
 import logging
-from flask import Blueprint, flash, redirect, request, jsonify, render_template, current_app, session, send_from_directory, url_for
+from flask import Blueprint, Response, flash, redirect, request, jsonify, render_template, current_app, session, send_from_directory, url_for, stream_with_context
 from flask_login import login_required, current_user
 from bson import ObjectId
-from pymongo import MongoClient
+from pymongo import MongoClient, ReturnDocument
 from config import Config
 from datetime import datetime, timezone
 import markdown2
 from bs4 import BeautifulSoup
-from .question_generator import process_content, save_to_mongodb, fetch_content_from_url, extract_text_from_file
+from .question_generator import process_content, save_to_mongodb, save_qa_pairs, fetch_content_from_url, extract_text_from_file
 import requests
 from werkzeug.utils import secure_filename
 import pytz
@@ -24,23 +24,34 @@ import io
 from dotenv import load_dotenv
 from requests.exceptions import RequestException, Timeout, ConnectionError
 from .data_utils import connect_to_mongodb, import_collection
+from . import utils
+from .answer_cache import normalize_question, normalize_module
+from .embedding_cache import normalize_text
+from .single_flight import coalescing_key
+from .message_store import preview_messages
+from .stats_rollups import numeric_rating, overall_statistics
 
 from app.utils import (
     generate_embedding,
+    get_cached_embedding,
+    generate_embeddings,
+    record_turn,
     search_similar_questions,
+    load_matched_answer,
+    match_similarity,
+    verify_match,
     add_question_answer,
     check_database_connection,
     get_collection_stats,
     json_serialize,
     store_message,
-    generate_title,
-    generate_references,
-    generate_summary,
     get_user_conversations,
     get_conversation_messages,
     get_conversation_context,
     generate_potential_answer_v2,
+    stream_potential_answer,
     get_active_conversation,
+    resolve_active_conversation,
     start_new_conversation,  # Ensure this is imported
     add_unanswered_question,  # Ensure this is imported
     is_event_related_question,
@@ -212,6 +223,8 @@ def get_user_profile():
 def chat_api():
     debug_info = {}
     db = get_db_connection()
+    conversation_id = None
+    turn_recorded = False
 
     try:
         debug_info['request'] = {
@@ -223,75 +236,39 @@ def chat_api():
             raise ValueError("Missing 'question' in request payload")
 
         user_question = request.json['question']
+        asked_at = datetime.utcnow()
         selected_module = request.json.get('module', '')
         force_new_conversation = request.json.get('force_new_conversation', False)
-        
-        logging.info(f"Searching for similar questions to: {user_question}")
+
         user_id = current_user.get_id()
         user_name = current_user.name
 
         if user_question.lower() == '/check connection':
             return handle_connection_check(user_id)
         
-        # Check for active conversation or create a new one
-        active_conversation = get_active_conversation(user_id)
-        
-        if force_new_conversation or not active_conversation:
-            conversation_id = create_new_conversation(user_id)
-            logging.info(f"Created new conversation: {conversation_id}")
-        else:
-            conversation_id = str(active_conversation['_id'])
-            logging.info(f"Using existing conversation: {conversation_id}")
-
-        store_message(user_id, user_question, 'User', conversation_id)
+        conversation_id = resolve_conversation(user_id, force_new_conversation)
 
-        # Generate the question embedding
-        question_embedding, embed_debug = generate_embedding(user_question)
-        debug_info['embedding'] = embed_debug
-
-        # Search for similar questions with module consideration
-        search_result = search_similar_questions(question_embedding, user_question, selected_module)
-        if isinstance(search_result, tuple) and len(search_result) == 2:
-            similar_questions, search_debug_info = search_result
+        response_data = utils.answer_cache.get(user_question, selected_module)
+        if response_data:
+            debug_info['answer_cache'] = 'hit'
+            response_message = response_data['answer']
+            if response_data['source'] == 'LLM':
+                add_unanswered_question(user_id, user_name, user_question, response_data, selected_module)
         else:
-            # If not, assume it's just the similar questions
-            similar_questions = search_result
-            search_debug_info = {}
-        
-        debug_info['search'] = search_debug_info
-
-        logging.info(f"Found {len(similar_questions)} similar questions")
-
-        if similar_questions:
-            best_match = similar_questions[0]
-            logging.info(f"Best match: '{best_match['question']}' with score {best_match['combined_score']}")
-
-            # Check if the best match is actually relevant
-            if best_match['combined_score'] > SIMILARITY_THRESHOLD and verify_question_similarity(user_question, best_match['question']) >= 0.8:
-                response_message = best_match['answer']
-                
-                response_data = {
-                    'question': best_match['question'],
-                    'answer': response_message,
-                    'score': best_match['combined_score'],
-                    'title': best_match.get('title', ''),
-                    'summary': best_match.get('summary', ''),
-                    'references': best_match.get('references', ''),
-                    'source': 'database',
-                    'match_score': round(best_match['combined_score'], 4),
-                }
+            response_data = find_database_answer(user_question, selected_module, debug_info)
+            if response_data:
+                response_message = response_data['answer']
             else:
-                logging.info("Best match didn't pass relevance check. Generating new answer.")
-                response_message = generate_potential_answer_v2(user_question)
+                response_message = utils.request_coalescer.do(
+                    coalescing_key('answer', normalize_question(user_question)),
+                    lambda: generate_potential_answer_v2(user_question)
+                )
                 response_data = create_response_data(user_question, response_message, 'LLM')
                 add_unanswered_question(user_id, user_name, user_question, response_data, selected_module)
-        else:
-            logging.info("No similar questions found. Generating new answer.")
-            response_message = generate_potential_answer_v2(user_question)
-            response_data = create_response_data(user_question, response_message, 'LLM')
-            add_unanswered_question(user_id, user_name, user_question, response_data, selected_module)
+            utils.answer_cache.put(user_question, selected_module, response_data)
 
-        store_message(user_id, response_message, 'Assistant', conversation_id)
+        record_turn(user_id, user_name, conversation_id, user_question, response_data['answer'], asked_at)
+        turn_recorded = True
         
         response_data['conversation_id'] = conversation_id
         response_data['debug_info'] = debug_info
@@ -299,8 +276,156 @@ def chat_api():
     except Exception as e:
         current_app.logger.error(f"Error in chat_api: {str(e)}")
         current_app.logger.error(traceback.format_exc())
+        if conversation_id and not turn_recorded:
+            record_unanswered_turn(user_id, user_name, conversation_id, user_question, asked_at)
         return jsonify({"error": "An internal server error occurred"}), 500
 
+@main.route('/api/chat/stream', methods=['POST'])
+@login_required
+def chat_stream_api():
+    """
+    Streaming variant of /api/chat.
+
+    Answers are sent as Server-Sent Events: `token` events carry answer text as
+    soon as it is available, followed by one `metadata` event with the title,
+    summary, references, source and conversation_id, and a final `done` event.
+    """
+    payload = request.get_json(silent=True) or {}
+    user_question = payload.get('question')
+    if not user_question:
+        return jsonify({"error": "Missing 'question' in request payload"}), 400
+
+    selected_module = payload.get('module', '')
+    force_new_conversation = payload.get('force_new_conversation', False)
+    user_id = current_user.get_id()
+    user_name = current_user.name
+    asked_at = datetime.utcnow()
+
+    def generate():
+        debug_info = {}
+        conversation_id = None
+        turn_recorded = False
+        try:
+            conversation_id = resolve_conversation(user_id, force_new_conversation)
+
+            response_data = utils.answer_cache.get(user_question, selected_module)
+            if response_data:
+                debug_info['answer_cache'] = 'hit'
+                yield sse_event('token', {'text': response_data['answer']})
+                if response_data['source'] == 'LLM':
+                    add_unanswered_question(user_id, user_name, user_question, response_data, selected_module)
+            else:
+                response_data = find_database_answer(user_question, selected_module, debug_info)
+                if response_data:
+                    yield sse_event('token', {'text': response_data['answer']})
+                else:
+                    potential_answer = {}
+                    for event, value in stream_potential_answer(user_question):
+                        if event == 'token':
+                            yield sse_event('token', {'text': value})
+                        else:
+                            potential_answer = value
+                    response_data = create_response_data(user_question, potential_answer, 'LLM')
+                    add_unanswered_question(user_id, user_name, user_question, response_data, selected_module)
+                utils.answer_cache.put(user_question, selected_module, response_data)
+
+            record_turn(user_id, user_name, conversation_id, user_question, response_data['answer'], asked_at)
+            turn_recorded = True
+
+            metadata = {key: value for key, value in response_data.items() if key != 'answer'}
+            metadata['conversation_id'] = conversation_id
+            metadata['debug_info'] = debug_info
+            yield sse_event('metadata', metadata)
+            yield sse_event('done', {})
+        except Exception as e:
+            current_app.logger.error(f"Error in chat_stream_api: {str(e)}")
+            current_app.logger.error(traceback.format_exc())
+            if conversation_id and not turn_recorded:
+                record_unanswered_turn(user_id, user_name, conversation_id, user_question, asked_at)
+            yield sse_event('error', {'error': 'An internal server error occurred'})
+
+    headers = {'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    return Response(stream_with_context(generate()), mimetype='text/event-stream', headers=headers)
+
+def sse_event(event, data):
+    return f"event: {event}\ndata: {json.dumps(data, default=json_serialize)}\n\n"
+
+def record_unanswered_turn(user_id, user_name, conversation_id, user_question, asked_at):
+    # The answer failed, but the question still belongs in the conversation history
+    try:
+        record_turn(user_id, user_name, conversation_id, user_question, None, asked_at)
+    except Exception as e:
+        current_app.logger.error(f"Error storing unanswered question: {str(e)}")
+
+def resolve_conversation(user_id, force_new_conversation=False):
+    # One atomic get-or-create; a forced new conversation closes the active one first
+    conversation_id = resolve_active_conversation(user_id, force_new=force_new_conversation)
+    logging.info(f"Using conversation: {conversation_id}")
+    return conversation_id
+
+def find_database_answer(user_question, selected_module, debug_info):
+    """
+    Looks for a stored answer to the question.
+
+    Returns response data for the best match if it passes the relevance check,
+    otherwise None so the caller falls back to the LLM.
+    """
+    logging.info(f"Searching for similar questions to: {user_question}")
+
+    # Generate the question embedding
+    question_embedding = get_cached_embedding(user_question)
+    debug_info['embedding'] = {
+        'embedding_length': len(question_embedding),
+        'cache': utils.embedding_cache.stats()
+    }
+
+    # Search for similar questions with module consideration. Keyed on the exact
+    # embedding input, so only callers with the same query vector share results
+    search_result = utils.request_coalescer.do(
+        coalescing_key('search', normalize_text(user_question), normalize_module(selected_module)),
+        lambda: search_similar_questions(question_embedding, user_question, selected_module)
+    )
+    if isinstance(search_result, tuple) and len(search_result) == 2:
+        similar_questions, search_debug_info = search_result
+    else:
+        # If not, assume it's just the similar questions
+        similar_questions = search_result
+        search_debug_info = {}
+
+    debug_info['search'] = search_debug_info
+
+    logging.info(f"Found {len(similar_questions)} similar questions")
+
+    if not similar_questions:
+        logging.info("No similar questions found. Generating new answer.")
+        return None
+
+    best_match = similar_questions[0]
+    logging.info(f"Best match: '{best_match['question']}' with score {best_match['combined_score']}")
+
+    # Check if the best match is actually relevant
+    if match_similarity(best_match) <= SIMILARITY_THRESHOLD:
+        logging.info("Best match is below the similarity threshold. Generating new answer.")
+        return None
+
+    verdict = verify_match(user_question, question_embedding, best_match)
+    debug_info['rerank'] = {key: verdict.get(key) for key in ('relevant', 'score', 'source', 'features')}
+    if verdict['relevant']:
+        best_match = load_matched_answer(best_match)
+        return {
+            'question': best_match['question'],
+            'answer': best_match['answer'],
+            'score': best_match['combined_score'],
+            'title': best_match.get('title', ''),
+            'summary': best_match.get('summary', ''),
+            'references': best_match.get('references', ''),
+            'source': 'database',
+            'match_score': round(best_match['combined_score'], 4),
+        }
+
+    logging.info("Best match didn't pass relevance check. Generating new answer.")
+    return None
+
 def create_response_data(user_question, response_message, source):
     return {
         'question': user_question,
@@ -406,12 +531,12 @@ def add_question():
         references = data.get('references', '')
 
         # Generate embeddings and add the question to the database
-        question_id, debug_info = add_question_answer(question, answer, title, summary, references)
+        question_id = add_question_answer(question, answer, title, summary, references)
+        utils.answer_cache.clear()
 
         return jsonify({
             'message': 'Question added successfully',
-            'question_id': str(question_id),
-            'debug_info': debug_info
+            'question_id': question_id
         }), 201
     except Exception as e:
         current_app.logger.error(f"Error adding question: {str(e)}\n{traceback.format_exc()}")
@@ -473,21 +598,16 @@ def update_question(question_id):
     try:
         # Check if the question_id exists in the unanswered_collection
 
-        unanswered_question = unanswered_collection.find_one({'_id': ObjectId(question_id)})
+        # Mark it answered and read the previous state in one step, so the
+        # unanswered_answered delta is right even when two admins answer at once
+        unanswered_question = unanswered_collection.find_one_and_update(
+            {'_id': ObjectId(question_id)},
+            {'$set': {'answered': True, 'answer': answer, 'answered_at': datetime.now()}},
+            return_document=ReturnDocument.BEFORE
+        )
         if unanswered_question:
-            # Update the unanswered question with the answered flag
-            result = unanswered_collection.update_one(
-                {'_id': ObjectId(question_id)},
-                {'$set': {'answered': True, 'answer': answer, 'answered_at': datetime.now()}}
-            )
-
-            if result.matched_count == 0:
-                current_app.logger.error("Unanswered question not found")
-                return jsonify({'error': 'Unanswered question not found'}), 404
-
             # Generate embeddings for the question and the answer
-            question_embedding, question_debug = generate_embedding(question)
-            answer_embedding, answer_debug = generate_embedding(answer)
+            question_embedding, answer_embedding = generate_embeddings([question, answer])
 
             # Add the answered question to the documents collection
             new_document = {
@@ -498,10 +618,12 @@ def update_question(question_id):
                 'summary': summary,
                 'references': references,
                 'answer_embedding': answer_embedding,
-                'created_at': unanswered_question.get('created_at', datetime.now()),
-                'updated_at': datetime.now()
+                'created_at': unanswered_question.get('created_at', datetime.utcnow()),
+                'updated_at': datetime.utcnow()
             }
             insert_result = get_documents_collection().insert_one(new_document)
+            utils.stats_rollups.increment(documents=1, unanswered_answered=0 if unanswered_question.get('answered') else 1)
+            utils.answer_cache.clear()
             
             current_app.logger.info("Question updated in unanswered_questions and moved to documents collection with embeddings")
             return jsonify({'message': 'Question updated successfully', 'new_id': str(insert_result.inserted_id)}), 200
@@ -513,12 +635,11 @@ def update_question(question_id):
             'title': title,
             'summary': summary,
             'references': references,
-            'updated_at': datetime.now()
+            'updated_at': datetime.utcnow()
         }
         
         # Generate new embeddings
-        question_embedding, _ = generate_embedding(question)
-        answer_embedding, _ = generate_embedding(answer)
+        question_embedding, answer_embedding = generate_embeddings([question, answer])
         update_data['question_embedding'] = question_embedding
         update_data['answer_embedding'] = answer_embedding
 
@@ -531,6 +652,9 @@ def update_question(question_id):
             current_app.logger.error("Question not found in documents collection")
             return jsonify({'error': 'Question not found in documents collection'}), 404
 
+        utils.question_reranker.invalidate_candidate(ObjectId(question_id))
+        utils.answer_cache.clear()
+        utils.feedback_stats.rename_question(question_id, question)
         current_app.logger.info("Question updated in documents collection")
         return jsonify({'message': 'Question updated successfully'}), 200
 
@@ -545,6 +669,13 @@ def delete_question(question_id):
     try:
         result = documents_collection.delete_one({'_id': ObjectId(question_id)})
         if result.deleted_count == 1:
+            if utils.local_vector_index is not None:
+                utils.local_vector_index.remove(ObjectId(question_id))
+            utils.retrieval_backend.remove(ObjectId(question_id))
+            utils.question_reranker.invalidate_candidate(ObjectId(question_id))
+            utils.answer_cache.clear()
+            utils.stats_rollups.increment(documents=-1)
+            utils.feedback_stats.remove_question(question_id)
             return jsonify({'message': 'Question deleted successfully'}), 200
         else:
             return jsonify({'error': 'Question not found'}), 404
@@ -576,8 +707,9 @@ def get_unanswered_questions():
 @main.route('/api/unanswered_questions/<id>', methods=['DELETE'])
 def delete_unanswered_question(id):
     try:
-        result = get_unanswered_collection().delete_one({'_id': ObjectId(id)})
-        if result.deleted_count == 1:
+        deleted = get_unanswered_collection().find_one_and_delete({'_id': ObjectId(id)}, projection={'answered': 1})
+        if deleted:
+            utils.stats_rollups.increment(unanswered_total=-1, unanswered_answered=-1 if deleted.get('answered') else 0)
             return jsonify({'message': 'Unanswered question deleted successfully'}), 200
         else:
             return jsonify({'message': 'Unanswered question not found'}), 404
@@ -592,9 +724,9 @@ def admin():
         return redirect(url_for('main.index'))
     
     # Fetch any necessary data for the admin dashboard
-    # For example:
-    total_users = get_users_collection().count_documents({})
-    total_questions = get_documents_collection().count_documents({})
+    rollup = utils.stats_rollups.read()
+    total_users = rollup.get('users', 0)
+    total_questions = rollup.get('documents', 0)
     
     return render_template('admin.html', 
                            google_maps_api_key=Config.GOOGLE_MAPS_API_KEY,
@@ -616,6 +748,7 @@ def get_users():
 def update_user(id):
     data = request.json
     get_users_collection().update_one({'_id': ObjectId(id)}, {'$set': data})
+    utils.user_cache.invalidate(id)
     return '', 204
 
 @main.route('/api/users/<user_id>', methods=['DELETE'])
@@ -638,8 +771,10 @@ def delete_user(user_id):
         
         result = users_collection.delete_one({'_id': ObjectId(user_id)})
         current_app.logger.info(f"Delete result: {result.raw_result}")
+        utils.user_cache.invalidate(user_id)
         
         if result.deleted_count == 1:
+            utils.stats_rollups.increment(users=-1)
             return jsonify({'message': 'User deleted successfully'}), 200
         else:
             current_app.logger.error(f"Unexpected result when deleting user: {user_id}")
@@ -667,6 +802,9 @@ def receive_app_feedback():
             'timestamp': datetime.now()
         }
         get_feedback_collection().insert_one(feedback)
+        value = numeric_rating(rating)
+        if value is not None:
+            utils.stats_rollups.increment(feedback_rating_count=1, feedback_rating_sum=value)
         return jsonify({"message": "Application feedback received"}), 200
     else:
         return jsonify({"error": "Invalid feedback"}), 400
@@ -756,6 +894,7 @@ def profile():
                 'database_password': current_user.database_password
             }}
         )
+        utils.user_cache.invalidate(current_user.id)
 
         flash('Your profile has been updated!', 'success')
         return redirect(url_for('main.profile'))
@@ -865,6 +1004,8 @@ def submit_answer_feedback():
             feedback_entry['matched_question_id'] = ObjectId(question_id)
 
         get_answer_feedback_collection().insert_one(feedback_entry)
+        utils.stats_rollups.increment(answer_feedback_total=1, answer_feedback_positive=1 if is_positive is True else 0)
+        utils.feedback_stats.record(question_id, original_question, is_positive)
         
         logger.info(f"Feedback submitted successfully: {feedback_entry}")  # Add this line for debugging
         return jsonify({'message': 'Answer feedback submitted successfully'}), 200
@@ -879,69 +1020,20 @@ def get_answer_feedback_stats():
         return jsonify({"error": "Unauthorized access"}), 403
 
     try:
-        pipeline = [
-            {
-                '$group': {
-                    '_id': {
-                        '$ifNull': ['$matched_question_id', '$original_question']
-                    },
-                    'total_feedback': {'$sum': 1},
-                    'positive_feedback': {
-                        '$sum': {'$cond': ['$is_positive', 1, 0]}
-                    },
-                    'original_questions': {'$addToSet': '$original_question'},
-                    'is_matched': {'$max': {'$cond': [{'$ifNull': ['$matched_question_id', False]}, True, False]}}
-                }
-            },
-            {
-                '$lookup': {
-                    'from': 'documents',
-                    'localField': '_id',
-                    'foreignField': '_id',
-                    'as': 'question_data'
-                }
-            },
-            {
-                '$project': {
-                    'matched_question': {
-                        '$cond': [
-                            {'$eq': ['$question_data', []]},
-                            {'$ifNull': [{'$arrayElemAt': ['$original_questions', 0]}, 'Unknown']},
-                            {'$ifNull': [{'$arrayElemAt': ['$question_data.question', 0]}, 'Unknown']}
-                        ]
-                    },
-                    'original_questions': 1,
-                    'total_feedback': 1,
-                    'positive_feedback': 1,
-                    'effectiveness': {
-                        '$cond': [
-                            {'$eq': ['$total_feedback', 0]},
-                            0,
-                            {
-                                '$multiply': [
-                                    {'$divide': ['$positive_feedback', '$total_feedback']},
-                                    100
-                                ]
-                            }
-                        ]
-                    },
-                    'is_matched': 1
-                }
-            }
-        ]
-        
-        stats = list(get_answer_feedback_collection().aggregate(pipeline))
+        page = int(request.args.get('page', 1))
+        per_page = int(request.args.get('per_page', 50))
+    except ValueError:
+        return jsonify({'error': 'page and per_page must be integers'}), 400
+    if page < 1 or per_page < 1:
+        return jsonify({'error': 'page and per_page must be positive'}), 400
+
+    try:
+        # Kept current by submit_answer_feedback; least effective answers first
+        stats, total = utils.feedback_stats.page(page, per_page)
         
-        # Convert ObjectId to string, handle None values, and join original questions
         for stat in stats:
-            if stat['_id'] is None:
-                stat['_id'] = 'Unknown'
-            elif isinstance(stat['_id'], ObjectId):
-                stat['_id'] = str(stat['_id'])
-            else:
-                stat['_id'] = str(stat['_id'])  # Convert any other type to string
-            
-            stat['original_questions'] = '; '.join(set(filter(None, stat.get('original_questions', []))))
+            stat['_id'] = str(stat['_id'])
+            stat['original_questions'] = '; '.join(sorted(filter(None, stat.get('original_questions', []))))
             
             # Ensure all fields are present
             stat.setdefault('matched_question', 'Unknown')
@@ -950,7 +1042,13 @@ def get_answer_feedback_stats():
             stat.setdefault('effectiveness', 0)
             stat.setdefault('is_matched', False)
 
-        return jsonify(stats), 200
+        return jsonify({
+            'stats': stats,
+            'total': total,
+            'page': page,
+            'per_page': per_page,
+            'total_pages': (total + per_page - 1) // per_page
+        }), 200
     except Exception as e:
         current_app.logger.error(f"Error fetching answer feedback stats: {str(e)}")
         return jsonify({'error': 'An error occurred while fetching answer feedback stats'}), 500
@@ -960,105 +1058,8 @@ def get_answer_feedback_stats():
 @login_required
 def get_overall_statistics():
     try:
-        users_collection = get_collection('users')
-        questions_collection = get_collection('documents')
-        unanswered_collection = get_collection('unanswered_questions')
-        feedback_collection = get_collection('feedback')
-        answer_feedback_collection = get_collection('answer_feedback')
-
-        if any(coll is None for coll in [users_collection, questions_collection, unanswered_collection, feedback_collection, answer_feedback_collection]):
-            current_app.logger.error("Failed to get one or more collections")
-            return jsonify({"error": "Database connection error"}), 500
-        
-
-        # Calculate statistics
-        total_users = users_collection.count_documents({})
-        total_questions = get_documents_collection().count_documents({})
-        
-        # Count answered questions from unanswered_collection
-        answered_questions = unanswered_collection.count_documents({"answered": True})
-        
-        # Count total questions in unanswered_collection
-        total_unanswered = unanswered_collection.count_documents({})
-        
-        # Calculate unanswered questions
-        unanswered_questions = total_unanswered - answered_questions
-
-        # Calculate average feedback rating
-        feedback_pipeline = [
-            {
-                "$match": {
-                    "rating": {"$exists": True, "$ne": None}
-                }
-            },
-            {
-                "$addFields": {
-                    "numericRating": {
-                        "$cond": {
-                            "if": {"$eq": [{"$type": "$rating"}, "string"]},
-                            "then": {"$toDouble": "$rating"},
-                            "else": "$rating"
-                        }
-                    }
-                }
-            },
-            {
-                "$group": {
-                    "_id": None,
-                    "avg_rating": {"$avg": "$numericRating"},
-                    "count": {"$sum": 1}
-                }
-            }
-        ]
-        feedback_result = list(get_feedback_collection().aggregate(feedback_pipeline))
-        
-        if feedback_result:
-            avg_rating = round(feedback_result[0]['avg_rating'], 2)
-            rating_count = feedback_result[0]['count']
-        else:
-            avg_rating = "N/A"
-            rating_count = 0
-
-        # Calculate percentage of positive answer feedback
-        answer_feedback_pipeline = [
-            {
-                "$group": {
-                    "_id": None,
-                    "total_count": {"$sum": 1},
-                    "positive_count": {
-                        "$sum": {"$cond": [{"$eq": ["$is_positive", True]}, 1, 0]}
-                    }
-                }
-            },
-            {
-                "$project": {
-                    "positive_percentage": {
-                        "$multiply": [
-                            {"$divide": ["$positive_count", "$total_count"]},
-                            100
-                        ]
-                    }
-                }
-            }
-        ]
-        answer_feedback_result = list(get_answer_feedback_collection().aggregate(answer_feedback_pipeline))
-        
-        if answer_feedback_result:
-            positive_feedback_percentage = round(answer_feedback_result[0]['positive_percentage'], 2)
-        else:
-            positive_feedback_percentage = "N/A"
-
-        # Prepare statistics object
-        statistics = {
-            "total_users": total_users,
-            "total_questions": total_questions + total_unanswered,  # Include both collections
-            "answered_questions": answered_questions + total_questions,  # Include answered from both collections
-            "unanswered_questions": unanswered_questions,
-            "average_rating": avg_rating,
-            "rating_count": rating_count,
-            "positive_feedback_percentage": positive_feedback_percentage
-        }
-
+        # Maintained incrementally by the write paths; see app/stats_rollups.py
+        statistics = overall_statistics(utils.stats_rollups.read())
         return jsonify(statistics), 200
     except Exception as e:
         current_app.logger.error(f"Error fetching overall statistics: {str(e)}")
@@ -1066,33 +1067,17 @@ def get_overall_statistics():
         
 @main.route('/statistics')
 def statistics():
-    # Get total users
-    total_users = get_users_collection().count_documents({})
-
-    # Get total questions
-    total_questions = get_documents_collection().count_documents({})
-
-    # Get answered questions
-    answered_questions = get_documents_collection().count_documents({"status": "answered"})
-
-    # Get unanswered questions
-    unanswered_questions = get_documents_collection().count_documents({"status": "unanswered"})
-
-    # Get top 5 categories
-    pipeline = [
-        {"$group": {"_id": "$category", "count": {"$sum": 1}}},
-        {"$sort": {"count": -1}},
-        {"$limit": 5}
-    ]
-    top_categories = list(get_documents_collection().aggregate(pipeline))
+    rollup = utils.stats_rollups.read()
 
     # Prepare data for the template
     stats = {
-        "total_users": total_users,
-        "total_questions": total_questions,
-        "answered_questions": answered_questions,
-        "unanswered_questions": unanswered_questions,
-        "top_categories": top_categories
+        "total_users": rollup.get('users', 0),
+        "total_questions": rollup.get('documents', 0),
+        "answered_questions": rollup.get('documents_answered', 0),
+        "unanswered_questions": rollup.get('documents_unanswered', 0),
+        "top_categories": rollup.get('top_categories', []),
+        # No write path tracks document status or category, so those come from the last reconcile
+        "reconciled_at": rollup['reconciled_at'].strftime('%Y-%m-%d %H:%M UTC') if rollup.get('reconciled_at') else None
     }
 
     return render_template('statistics.html', stats=stats)
@@ -1105,7 +1090,9 @@ def get_conversations():
     
     total = get_conversation_collection().count_documents({})
     
-    conversations = list(get_conversation_collection().find()
+    # Only the header fields the list needs; legacy conversations still carry `messages`
+    projection = {'user_name': 1, 'last_updated': 1, 'preview_messages': 1, 'messages': {'$slice': 2}}
+    conversations = list(get_conversation_collection().find({}, projection)
                          .sort('last_updated', -1)
                          .skip((page - 1) * per_page)
                          .limit(per_page))
@@ -1116,7 +1103,7 @@ def get_conversations():
             '_id': str(conv['_id']),
             'user_name': conv.get('user_name', 'Unknown User'),  # Assuming user_name is stored in the conversation document
             'last_updated': conv.get('last_updated', 'Unknown').isoformat() if isinstance(conv.get('last_updated'), datetime) else 'Unknown',
-            'preview': [msg.get('content', '')[:50] + '...' for msg in conv.get('messages', [])[:2]]
+            'preview': [msg.get('content', '')[:50] + '...' for msg in preview_messages(conv)]
         }
         serialized_conversations.append(serialized_conv)
     
@@ -1131,8 +1118,12 @@ def get_conversations():
 @main.route('/api/conversations/<conversation_id>', methods=['GET'])
 @login_required
 def get_conversation(conversation_id):
-    conversation = get_conversation_collection().find_one({'_id': ObjectId(conversation_id)})
+    conversation = get_conversation_collection().find_one(
+        {'_id': ObjectId(conversation_id)},
+        {'user_name': 1, 'last_updated': 1}
+    )
     if conversation:
+        messages = utils.message_store.all(conversation['_id']) or []
         serialized_conv = {
             '_id': str(conversation['_id']),
             'user_name': conversation.get('user_name', 'Unknown User'),
@@ -1143,7 +1134,7 @@ def get_conversation(conversation_id):
                     'content': msg.get('content'),
                     'timestamp': msg.get('timestamp').isoformat() if isinstance(msg.get('timestamp'), datetime) else 'Unknown'
                 }
-                for msg in conversation.get('messages', [])
+                for msg in messages
             ]
         }
         return jsonify(serialized_conv)
@@ -1313,8 +1304,8 @@ def add_event():
             date_time = datetime.fromisoformat(date_time_str.replace('Z', '+00:00'))
             # Ensure it's in UTC
             date_time = date_time.astimezone(pytz.utc)
-            # Store it as an ISO format string
-            event_data['date_time'] = date_time.isoformat()
+            # Store it as a BSON date so upcoming-event queries can use the index
+            event_data['date_time'] = date_time
         except ValueError:
             # If parsing fails, store the original string
             event_data['date_time'] = date_time_str
@@ -1327,7 +1318,11 @@ def add_event():
     event_data['feedback_url'] = event_data.get('feedback_url', '')
 
     result = get_events_collection().insert_one(event_data)
+    utils.events_answer_cache.invalidate()
+    utils.answer_cache.clear()
     event_data['_id'] = str(result.inserted_id)
+    if isinstance(event_data['date_time'], datetime):
+        event_data['date_time'] = event_data['date_time'].isoformat()
     
     return jsonify({'message': 'Event added successfully', 'event': event_data}), 201
 
@@ -1364,8 +1359,8 @@ def update_event(event_id):
             date_time = datetime.fromisoformat(date_time_str.replace('Z', '+00:00'))
             # Ensure it's in UTC
             date_time = date_time.astimezone(pytz.utc)
-            # Store it as an ISO format string
-            event_data['date_time'] = date_time.isoformat()
+            # Store it as a BSON date so upcoming-event queries can use the index
+            event_data['date_time'] = date_time
         except ValueError:
             # If parsing fails, store the original string
             event_data['date_time'] = date_time_str
@@ -1378,9 +1373,13 @@ def update_event(event_id):
     result = get_events_collection().update_one({'_id': ObjectId(event_id)}, {'$set': event_data})
     
     if result.modified_count:
+        utils.events_answer_cache.invalidate()
+        utils.answer_cache.clear()
         updated_event = get_events_collection().find_one({'_id': ObjectId(event_id)})
         if updated_event:
             updated_event['_id'] = str(updated_event['_id'])
+            if isinstance(updated_event.get('date_time'), datetime):
+                updated_event['date_time'] = pytz.utc.localize(updated_event['date_time']).isoformat()
             return jsonify({'message': 'Event updated successfully', 'event': updated_event})
     
     return jsonify({'error': 'Event not found or no changes made'}), 404
@@ -1390,6 +1389,8 @@ def update_event(event_id):
 def delete_event(event_id):
     result = get_events_collection().delete_one({'_id': ObjectId(event_id)})
     if result.deleted_count:
+        utils.events_answer_cache.invalidate()
+        utils.answer_cache.clear()
         return jsonify({'message': 'Event deleted successfully'})
     return jsonify({'error': 'Event not found'}), 404
 
@@ -1433,9 +1434,7 @@ def process_files():
             content = extract_text_from_file(file_path)
             qa_pairs = process_content(content)
             
-            for question, answer in qa_pairs:
-                if save_to_mongodb(question, answer, similarity_threshold):
-                    questions_added += 1
+            questions_added += save_qa_pairs(qa_pairs, similarity_threshold)
             
             os.remove(file_path)  # Remove the file after processing
     
@@ -1453,10 +1452,7 @@ def process_url():
     content = fetch_content_from_url(url)
     qa_pairs = process_content(content)
     
-    questions_added = 0
-    for question, answer in qa_pairs:
-        if save_to_mongodb(question, answer, similarity_threshold):
-            questions_added += 1
+    questions_added = save_qa_pairs(qa_pairs, similarity_threshold)
     
     return jsonify({'questionsAdded': questions_added})
 
@@ -1480,31 +1476,17 @@ def search_questions():
         return jsonify({"error": "No search query provided"}), 400
 
     try:
-        result = get_documents_collection().aggregate([
-            {
-                "$search": {
-                    "index": "default",  # Make sure this matches your Atlas Search index name
-                    "text": {
-                        "query": query,
-                        "path": ["question", "answer", "title"]  # Adjust based on your document structure
-                    }
-                }
-            },
-            {
-                "$project": {
-                    "_id": {"$toString": "$_id"},
-                    "question": 1,
-                    "answer": 1,
-                    "title": 1,
-                    "score": {"$meta": "searchScore"}
-                }
-            },
+        results = utils.retrieval_backend.text_search(get_documents_collection(), query, limit=10, fuzzy=False)
+        questions = [
             {
-                "$limit": 10  # Adjust as needed
+                "_id": str(result["_id"]),
+                "question": result.get("question"),
+                "answer": result.get("answer"),
+                "title": result.get("title"),
+                "score": result.get("text_score")
             }
-        ])
-
-        questions = list(result)
+            for result in results
+        ]
         current_app.logger.info(f"Search results: {questions}")
         return jsonify(questions), 200
 
@@ -1512,6 +1494,50 @@ def search_questions():
         current_app.logger.error(f"Error searching questions: {str(e)}")
         return jsonify({"error": "An error occurred while searching questions"}), 500
     
+@main.route('/api/admin/embedding_cache_stats', methods=['GET'])
+@login_required
+def embedding_cache_stats():
+    if not current_user.is_admin:
+        return jsonify({"error": "Unauthorized access"}), 403
+    return jsonify(utils.embedding_cache.stats()), 200
+
+@main.route('/api/admin/answer_cache', methods=['GET'])
+@login_required
+def answer_cache_stats():
+    if not current_user.is_admin:
+        return jsonify({"error": "Unauthorized access"}), 403
+    return jsonify(utils.answer_cache.stats()), 200
+
+@main.route('/api/admin/answer_cache/invalidate', methods=['POST'])
+@login_required
+def invalidate_answer_cache():
+    """Clears one question's cached answer when `question` is given, otherwise the whole cache."""
+    if not current_user.is_admin:
+        return jsonify({"error": "Unauthorized access"}), 403
+    data = request.get_json(silent=True) or {}
+    question = data.get('question')
+    if question:
+        removed = utils.answer_cache.invalidate(question, data.get('module'))
+    else:
+        removed = utils.answer_cache.clear()
+    return jsonify({'message': 'Answer cache invalidated', 'removed': removed}), 200
+
+@main.route('/api/admin/background_stats', methods=['GET'])
+@login_required
+def background_stats():
+    if not current_user.is_admin:
+        return jsonify({"error": "Unauthorized access"}), 403
+    return jsonify(utils.background_pipeline.stats()), 200
+
+@main.route('/api/admin/stats/reconcile', methods=['POST'])
+@login_required
+def reconcile_stats():
+    """Recounts the dashboard statistics from the source collections."""
+    if not current_user.is_admin:
+        return jsonify({"error": "Unauthorized access"}), 403
+    rollup = utils.stats_rollups.reconcile()
+    return jsonify({'message': 'Statistics reconciled', 'statistics': overall_statistics(rollup)}), 200
+
 @main.route('/api/autocomplete', methods=['GET'])
 def autocomplete():
     prefix = request.args.get('prefix', '')
@@ -1528,29 +1554,8 @@ def autocomplete():
         return jsonify({"error": "Internal Server Error: collection not found"}), 500
 
     try:
-        pipeline = [
-            {
-                "$search": {
-                    "index": "autocomplete",
-                    "autocomplete": {
-                        "query": prefix,
-                        "path": "question",
-                        "tokenOrder": "sequential"
-                    }
-                }
-            },
-            {
-                "$project": {
-                    "_id": 0,
-                    "question": 1,
-                    "score": {"$meta": "searchScore"}
-                }
-            },
-            {"$limit": 5}
-        ]
-        
-        current_app.logger.info(f"Executing aggregation pipeline with prefix: {prefix}")
-        results = list(collection.aggregate(pipeline))
+        current_app.logger.info(f"Running autocomplete with prefix: {prefix}")
+        results = utils.retrieval_backend.autocomplete(collection, prefix, limit=5)
         current_app.logger.info(f"Aggregation results: {results}")
         
         suggestions = [result['question'] for result in results]
@@ -2034,10 +2039,6 @@ LIMIT = 2000
 
 source_client = MongoClient(SOURCE_URI, appName=APP_NAME_DEV_DAY)
 cache = {}
-doc_counts = {}
-
-for collection in SOURCE_COLLECTIONS:
-    doc_counts[collection] = source_client[SOURCE_DATABASE][collection].count_documents({})
 
 def get_documents(collection, last_id=None):
     if not last_id:
@@ -0,0 +1,201 @@
+# single_flight.py
+
+import copy
+import hashlib
+import logging
+import os
+import socket
+import threading
+import time
+from datetime import datetime, timezone, timedelta
+
+from pymongo.errors import DuplicateKeyError
+
+try:
+    import gevent
+except ImportError:  # gevent is only needed when serving from run.py's WSGIServer
+    gevent = None
+
+logger = logging.getLogger(__name__)
+
+# How often a waiter inside a greenlet checks whether its leader has finished
+GREENLET_POLL_SECONDS = 0.01
+
+
+def coalescing_key(stage, *parts):
+    digest = hashlib.sha256('\x1f'.join(str(part) for part in parts).encode('utf-8')).hexdigest()
+    return f"{stage}:{digest}"
+
+
+def in_greenlet():
+    """
+    True when running in a gevent greenlet rather than a plain thread. run.py does
+    not monkey-patch, so a blocking wait there would stall every request on the hub,
+    the leader's included.
+    """
+    return gevent is not None and gevent.getcurrent().parent is not None
+
+
+def sleep(seconds):
+    if in_greenlet():
+        gevent.sleep(seconds)
+    else:
+        time.sleep(seconds)
+
+
+def wait(event, timeout):
+    """Waits up to `timeout` seconds for a threading.Event without blocking the gevent hub."""
+    if not in_greenlet():
+        return event.wait(timeout)
+    deadline = time.monotonic() + timeout
+    while not event.is_set():
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            return False
+        gevent.sleep(min(GREENLET_POLL_SECONDS, remaining))
+    return True
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """
+    Collapses concurrent calls with the same key into one computation.
+
+    Within a process the first caller runs `fn` and the others wait for its
+    result. With `lease_getter` set, the leader also takes a lease document in
+    MongoDB so leaders in other processes wait too; the result is written back
+    to the lease for up to `result_seconds` so they can pick it up. Only callers
+    that saw the lease running take that result. A caller that arrives after the
+    leader finished takes over the lease and computes afresh, so a finished result
+    is never served to a later request. A waiter whose leader fails or whose
+    lease expires runs `fn` itself, so coalescing can delay a request by at most
+    `lease_seconds` but never fail it.
+
+    Waiting yields to the gevent hub when called from a greenlet and blocks the
+    thread otherwise.
+    """
+
+    def __init__(self, lease_getter=None, lease_seconds=30, result_seconds=5, poll_interval=0.1):
+        self.lease_getter = lease_getter
+        self.lease_seconds = lease_seconds
+        self.result_seconds = result_seconds
+        self.poll_interval = poll_interval
+        self.owner = f"{socket.gethostname()}:{os.getpid()}"
+        self._calls = {}
+        self._lock = threading.Lock()
+        self.leaders = 0
+        self.followers = 0
+
+    def do(self, key, fn):
+        """Returns fn() for the first caller with `key`, and a copy of that result for concurrent callers."""
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+                self.leaders += 1
+            else:
+                self.followers += 1
+
+        if not leader:
+            if not wait(call.done, self.lease_seconds):
+                logger.warning(f"Timed out waiting for in-flight {key}, computing it directly")
+                return fn()
+            if call.error is not None:
+                raise call.error
+            return copy.deepcopy(call.result)
+
+        try:
+            result = self._run_leased(key, fn) if self.lease_getter is not None else fn()
+            # Followers copy from a snapshot the leader's caller cannot mutate
+            call.result = copy.deepcopy(result)
+            return result
+        except Exception as e:
+            call.error = e
+            raise
+        finally:
+            call.done.set()
+            with self._lock:
+                self._calls.pop(key, None)
+
+    def stats(self):
+        with self._lock:
+            return {'leaders': self.leaders, 'followers': self.followers, 'in_flight': len(self._calls)}
+
+    def ensure_indexes(self, collection):
+        collection.create_index('expires_at', expireAfterSeconds=0)
+
+    def _run_leased(self, key, fn):
+        collection = self.lease_getter()
+        if collection is None:
+            return fn()
+
+        deadline = time.monotonic() + self.lease_seconds
+        seen_running = False
+        while True:
+            try:
+                if self._acquire(collection, key, take_finished=not seen_running):
+                    break
+                lease = collection.find_one({'_id': key}, {'status': 1, 'result': 1, 'expires_at': 1})
+            except Exception as e:
+                logger.error(f"Error reading single-flight lease {key}: {str(e)}")
+                return fn()
+
+            status = lease.get('status') if lease is not None else None
+            if status == 'running':
+                seen_running = True
+            elif status == 'done' and seen_running:
+                return lease.get('result')
+            elif status == 'failed' and seen_running:
+                return fn()
+            elif status is not None:
+                # Finished before we started waiting; take the lease over on the next pass
+                continue
+            if time.monotonic() >= deadline:
+                logger.warning(f"Timed out waiting for lease {key}, computing it directly")
+                return fn()
+            sleep(self.poll_interval)
+
+        try:
+            result = fn()
+        except Exception:
+            self._release(collection, key, {'status': 'failed'})
+            raise
+        self._release(collection, key, {'status': 'done', 'result': result})
+        return result
+
+    def _acquire(self, collection, key, take_finished=True):
+        now = datetime.now(timezone.utc)
+        lease = {'owner': self.owner, 'status': 'running', 'expires_at': now + timedelta(seconds=self.lease_seconds)}
+        try:
+            collection.insert_one(dict(lease, _id=key))
+            return True
+        except DuplicateKeyError:
+            pass
+        # Take over leases that expired but have not been reaped by the TTL monitor yet,
+        # and finished ones that were kept for the callers already waiting on them
+        takeover = [{'expires_at': {'$lt': now}}]
+        if take_finished:
+            takeover.append({'status': {'$in': ['done', 'failed']}})
+        result = collection.update_one({'_id': key, '$or': takeover}, {'$set': lease, '$unset': {'result': ''}})
+        return result.modified_count == 1
+
+    def _release(self, collection, key, fields):
+        fields['expires_at'] = datetime.now(timezone.utc) + timedelta(seconds=self.result_seconds)
+        try:
+            collection.update_one({'_id': key, 'owner': self.owner}, {'$set': fields})
+        except Exception as e:
+            # e.g. a result that cannot be stored as BSON; waiters fall back to computing it
+            logger.error(f"Error releasing single-flight lease {key}: {str(e)}")
+            try:
+                collection.update_one({'_id': key, 'owner': self.owner}, {'$set': {
+                    'status': 'failed', 'expires_at': fields['expires_at']
+                }})
+            except Exception:
+                pass
@@ -0,0 +1,149 @@
+# stats_rollups.py
+
+import logging
+import threading
+import time
+from datetime import datetime, timezone
+
+logger = logging.getLogger(__name__)
+
+ROLLUP_ID = 'overall'
+
+
+def numeric_rating(rating):
+    """Ratings arrive as numbers or numeric strings; returns None for anything else."""
+    try:
+        return float(rating)
+    except (TypeError, ValueError):
+        return None
+
+
+class StatsRollups:
+    """
+    Dashboard statistics materialized into a single `stats_rollups` document.
+
+    Write paths call `increment` with the deltas they cause (a user signs up, a
+    question is answered, a rating arrives), so the admin endpoints read one small
+    document instead of counting and aggregating the source collections.
+    `reconcile` recounts everything from the source collections and replaces the
+    counters. It runs on the first read if the document has never been built, then
+    every `reconcile_seconds` from a daemon thread, which also corrects any drift from
+    writes outside the app or increments racing a reconcile. Breakdowns
+    that no write path tracks (document status, top categories) are refreshed
+    only by reconcile.
+    """
+
+    def __init__(self, rollups_getter, collection_getter, reconcile_seconds=3600):
+        self.rollups_getter = rollups_getter
+        self.collection_getter = collection_getter
+        self.reconcile_seconds = reconcile_seconds
+        self._thread = None
+
+    def increment(self, **deltas):
+        deltas = {name: value for name, value in deltas.items() if value}
+        if not deltas:
+            return
+        try:
+            self.rollups_getter().update_one(
+                {'_id': ROLLUP_ID},
+                {'$inc': deltas, '$set': {'updated_at': datetime.now(timezone.utc)}},
+                upsert=True
+            )
+        except Exception as e:
+            # Never fail the write that triggered it; the next reconcile catches up
+            logger.error(f"Failed to update stats rollups {deltas}: {str(e)}")
+
+    def read(self):
+        """Returns the rollup document, reconciling first if it has never been built."""
+        rollup = self.rollups_getter().find_one({'_id': ROLLUP_ID})
+        if rollup is None or 'reconciled_at' not in rollup:
+            rollup = self.reconcile()
+        return rollup
+
+    def reconcile(self):
+        started = time.monotonic()
+        users = self.collection_getter('users')
+        documents = self.collection_getter('documents')
+        unanswered = self.collection_getter('unanswered_questions')
+        feedback = self.collection_getter('feedback')
+        answer_feedback = self.collection_getter('answer_feedback')
+
+        # Same rule as numeric_rating: only ratings that convert to a number count
+        ratings = list(feedback.aggregate([
+            {'$match': {'rating': {'$exists': True, '$ne': None}}},
+            {'$project': {'rating': {'$convert': {'input': '$rating', 'to': 'double', 'onError': None, 'onNull': None}}}},
+            {'$match': {'rating': {'$ne': None}}},
+            {'$group': {'_id': None, 'count': {'$sum': 1}, 'sum': {'$sum': '$rating'}}}
+        ]))
+        answer_votes = list(answer_feedback.aggregate([
+            {'$group': {
+                '_id': None,
+                'total': {'$sum': 1},
+                'positive': {'$sum': {'$cond': [{'$eq': ['$is_positive', True]}, 1, 0]}}
+            }}
+        ]))
+        document_status = {
+            group['_id']: group['count']
+            for group in documents.aggregate([{'$group': {'_id': '$status', 'count': {'$sum': 1}}}])
+        }
+        top_categories = list(documents.aggregate([
+            {'$group': {'_id': '$category', 'count': {'$sum': 1}}},
+            {'$sort': {'count': -1}},
+            {'$limit': 5}
+        ]))
+
+        now = datetime.now(timezone.utc)
+        rollup = {
+            'users': users.count_documents({}),
+            'documents': sum(document_status.values()),
+            'unanswered_total': unanswered.count_documents({}),
+            'unanswered_answered': unanswered.count_documents({'answered': True}),
+            'feedback_rating_count': ratings[0]['count'] if ratings else 0,
+            'feedback_rating_sum': ratings[0]['sum'] if ratings else 0.0,
+            'answer_feedback_total': answer_votes[0]['total'] if answer_votes else 0,
+            'answer_feedback_positive': answer_votes[0]['positive'] if answer_votes else 0,
+            'documents_answered': document_status.get('answered', 0),
+            'documents_unanswered': document_status.get('unanswered', 0),
+            'top_categories': top_categories,
+            'updated_at': now,
+            'reconciled_at': now
+        }
+        self.rollups_getter().update_one({'_id': ROLLUP_ID}, {'$set': rollup}, upsert=True)
+        logger.info(f"Stats rollups reconciled in {time.monotonic() - started:.2f}s")
+        return dict(rollup, _id=ROLLUP_ID)
+
+    def start(self, app):
+        if self._thread is not None or not self.reconcile_seconds:
+            return
+
+        def run():
+            while True:
+                time.sleep(self.reconcile_seconds)
+                try:
+                    with app.app_context():
+                        self.reconcile()
+                except Exception as e:
+                    logger.error(f"Stats rollup reconcile failed: {str(e)}")
+
+        self._thread = threading.Thread(target=run, name='stats-rollups', daemon=True)
+        self._thread.start()
+
+
+def overall_statistics(rollup):
+    """The /api/overall_statistics payload, computed from a rollup document."""
+    documents = rollup.get('documents', 0)
+    unanswered_total = rollup.get('unanswered_total', 0)
+    unanswered_answered = rollup.get('unanswered_answered', 0)
+    rating_count = rollup.get('feedback_rating_count', 0)
+    answer_total = rollup.get('answer_feedback_total', 0)
+    return {
+        "total_users": rollup.get('users', 0),
+        "total_questions": documents + unanswered_total,  # Include both collections
+        "answered_questions": unanswered_answered + documents,  # Include answered from both collections
+        "unanswered_questions": unanswered_total - unanswered_answered,
+        "average_rating": round(rollup.get('feedback_rating_sum', 0) / rating_count, 2) if rating_count else "N/A",
+        "rating_count": rating_count,
+        "positive_feedback_percentage": (
+            round(100 * rollup.get('answer_feedback_positive', 0) / answer_total, 2) if answer_total else "N/A"
+        )
+    }
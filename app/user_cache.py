@@ -0,0 +1,80 @@
+# user_cache.py
+
+import logging
+import threading
+import time
+from collections import OrderedDict
+
+logger = logging.getLogger(__name__)
+
+# Everything auth.User is built from; the loader reads nothing else
+USER_PROJECTION = {
+    'email': 1,
+    'name': 1,
+    'profile_pic': 1,
+    'isAdmin': 1,
+    'last_login': 1,
+    'atlas_connection_string': 1,
+    'github_codespace_frontend_url': 1,
+    'github_codespace_backend_url': 1,
+    'database_username': 1,
+    'database_password': 1
+}
+
+
+class UserCache:
+    """
+    Short-TTL cache of user documents for the flask_login user loader, keyed by user id.
+
+    Every authenticated request loads the user, so without it each request reads
+    `users` before the view runs. Entries expire after `ttl_seconds`; writes to a
+    user in this process call `invalidate`, and the TTL bounds how long another
+    worker process can serve the old document. Missing users are not cached.
+    """
+
+    def __init__(self, ttl_seconds=60, max_entries=10000):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get_or_load(self, user_id, load_fn):
+        """Returns a copy of the user document, calling `load_fn(user_id)` on a miss."""
+        key = str(user_id)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] > time.monotonic():
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return dict(entry[1])
+            self.misses += 1
+
+        user_data = load_fn(user_id)
+        if user_data is None:
+            return None
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl_seconds, dict(user_data))
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return user_data
+
+    def invalidate(self, user_id):
+        with self._lock:
+            self._entries.pop(str(user_id), None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': round(self.hits / lookups, 4) if lookups else 0.0,
+                'entries': len(self._entries)
+            }
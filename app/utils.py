@@ -1,10 +1,10 @@
 import os  # Add this line
 import openai
-from pymongo import MongoClient, ASCENDING
+from pymongo import MongoClient, ASCENDING, DESCENDING, ReturnDocument
 from pymongo.operations import IndexModel
 from pymongo.collection import Collection
 from pymongo.database import Database
-from pymongo.errors import ConnectionFailure, ConfigurationError, ServerSelectionTimeoutError
+from pymongo.errors import ConnectionFailure, ConfigurationError, ServerSelectionTimeoutError, DuplicateKeyError
 from typing import Optional
 from config import Config
 import json
@@ -12,18 +12,35 @@ import logging
 from datetime import datetime, timezone, timedelta
 from bson import ObjectId, json_util
 from flask_login import login_required, current_user
-from flask import request, current_app
+from flask import request, current_app, g, session
 import PyPDF2
 from functools import lru_cache
 
 import traceback
-import requests
 from typing import Any, Dict, List, Tuple, Union
 import re
-from collections import Counter
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+
+from .embedding_cache import EmbeddingCache, EMBEDDING_MODEL
+from .vector_index import LocalVectorIndex
+from .retrieval import create_retrieval_backend
+from .reranker import LocalReranker
+from .intent_classifier import EventIntentClassifier, EVENT_KEYWORDS
+from .events_cache import EventsAnswerCache
+from .answer_cache import AnswerCache
+from .mongo_heartbeat import MongoHeartbeat
+from .background import BackgroundPipeline
+from .message_store import MessageStore, recent_messages
+from .single_flight import SingleFlight, coalescing_key
+from .conversation_vector import ConversationVector
+from .user_cache import UserCache, USER_PROJECTION
+from .geoip import GeoIPResolver, client_ip
+from .stats_rollups import StatsRollups
+from .feedback_stats import FeedbackStats
+from .answer_metadata import generate_answer_metadata, fill_answer_metadata, generate_context_summary
+from .nlp import extract_topics, extract_entities, fold_topic_counts, top_topics, EntityExtractor
 
-from nltk.corpus import stopwords
-from nltk.tokenize import word_tokenize
 import nltk
 from functools import wraps
 
@@ -49,32 +66,55 @@ logger = logging.getLogger(__name__)
 SIMILARITY_THRESHOLD = 0.91  # or whatever value you want to use
 
 
-def get_db_connection() -> Optional[Database]:
-    if 'mongo_client' not in current_app.config:
-        try:
-            current_app.logger.info(f"Attempting to connect to MongoDB with URI: {current_app.config['MONGODB_URI']}")
-            client = MongoClient(current_app.config['MONGODB_URI'], 
-                                 serverSelectionTimeoutMS=5000)  # 5 second timeout
-            # Verify the connection
-            client.server_info()
-            current_app.config['mongo_client'] = client
-            current_app.logger.info("Successfully connected to MongoDB")
-        except ServerSelectionTimeoutError as e:
-            current_app.logger.error(f"Failed to connect to MongoDB (timeout): {str(e)}")
-            return None
-        except Exception as e:
-            current_app.logger.error(f"Failed to connect to MongoDB: {str(e)}")
-            return None
+def get_mongo_client() -> Optional[MongoClient]:
+    """
+    Returns the pooled MongoClient for this process, creating it on first use. A client
+    inherited across a fork is replaced, since MongoClient is not fork-safe.
+    """
+    client = current_app.config.get('mongo_client')
+    if client is not None and current_app.config.get('mongo_client_pid') == os.getpid():
+        return client
 
     try:
-        db = current_app.config['mongo_client'].get_database(current_app.config['MONGODB_DB'])
-        # Verify database access
-        db.command('ping')
-        current_app.logger.info(f"Successfully got database: {current_app.config['MONGODB_DB']}")
-        return db
-    except pymongo.errors.OperationFailure as e:
-        current_app.logger.error(f"Failed to access database (permission error): {str(e)}")
+        current_app.logger.info("Connecting to MongoDB")
+        client = MongoClient(current_app.config['MONGODB_URI'],
+                             serverSelectionTimeoutMS=5000,  # 5 second timeout
+                             maxPoolSize=Config.MONGO_MAX_POOL_SIZE)
+        # Verify the connection once; after that the heartbeat tracks liveness
+        client.server_info()
+        heartbeat = MongoHeartbeat(client, interval_seconds=Config.MONGO_HEARTBEAT_SECONDS)
+        heartbeat.start()
+        current_app.config['mongo_client'] = client
+        current_app.config['mongo_client_pid'] = os.getpid()
+        current_app.config['mongo_heartbeat'] = heartbeat
+        current_app.logger.info("Successfully connected to MongoDB")
+        return client
+    except ServerSelectionTimeoutError as e:
+        current_app.logger.error(f"Failed to connect to MongoDB (timeout): {str(e)}")
+        return None
+    except Exception as e:
+        current_app.logger.error(f"Failed to connect to MongoDB: {str(e)}")
         return None
+
+def get_db_connection() -> Optional[Database]:
+    """
+    Returns the database handle, cached on flask.g for the rest of the request.
+    Returns None while the heartbeat reports MongoDB as unreachable.
+    """
+    if '_mongo_db' in g:
+        return g._mongo_db
+
+    client = get_mongo_client()
+    if client is None:
+        return None
+    heartbeat = current_app.config.get('mongo_heartbeat')
+    if heartbeat is not None and not heartbeat.healthy:
+        current_app.logger.error(f"MongoDB is unreachable: {heartbeat.last_error}")
+        return None
+
+    try:
+        g._mongo_db = client.get_database(current_app.config['MONGODB_DB'])
+        return g._mongo_db
     except Exception as e:
         current_app.logger.error(f"Failed to get database: {str(e)}")
         return None
@@ -85,9 +125,7 @@ def get_collection(collection_name: str) -> Optional[Collection]:
         if db is None:
             current_app.logger.error(f"Failed to get database connection for collection: {collection_name}")
             return None
-        collection = db[collection_name]
-        current_app.logger.info(f"Successfully got collection: {collection_name}")
-        return collection
+        return db[collection_name]
     except Exception as e:
         current_app.logger.error(f"Error getting collection {collection_name}: {str(e)}")
         return None
@@ -99,13 +137,190 @@ def with_db_connection(f):
         return f(db, *args, **kwargs)
     return decorated_function
 
+# Shared caches, executors and pipelines, built by init_services() from init_db so that
+# importing app.utils neither starts worker threads nor reaches MongoDB or OpenAI
+search_executor = None
+local_vector_index = None
+retrieval_backend = None
+geoip_resolver = None
+stats_rollups = None
+feedback_stats = None
+user_cache = None
+embedding_cache = None
+request_coalescer = None
+answer_cache = None
+entity_extractor = None
+conversation_vector = None
+message_store = None
+background_pipeline = None
+event_classifier = None
+intent_executor = None
+events_answer_cache = None
+question_reranker = None
+
+def init_services():
+    """Builds the module-level services above; later calls keep the existing ones."""
+    global search_executor, local_vector_index, retrieval_backend, geoip_resolver, stats_rollups, feedback_stats,\
+        user_cache, embedding_cache, request_coalescer, answer_cache, entity_extractor, conversation_vector,\
+        message_store, background_pipeline, event_classifier, intent_executor, events_answer_cache, question_reranker
+    if answer_cache is not None:
+        return
+
+    search_executor = ThreadPoolExecutor(max_workers=Config.SEARCH_MAX_WORKERS, thread_name_prefix='search')
+
+    # Optional in-process first tier for the vector branch; Atlas serves it whenever the
+    # local index is disabled or has gone stale.
+    local_vector_index = LocalVectorIndex(
+        lambda: get_collection('documents'),
+        refresh_seconds=Config.LOCAL_VECTOR_INDEX_REFRESH_SECONDS,
+        max_staleness_seconds=Config.LOCAL_VECTOR_INDEX_MAX_STALENESS_SECONDS,
+        rebuild_seconds=Config.LOCAL_VECTOR_INDEX_REBUILD_SECONDS,
+        hnsw_threshold=Config.LOCAL_VECTOR_INDEX_HNSW_THRESHOLD
+    ) if Config.LOCAL_VECTOR_INDEX else None
+
+    # Backend for vector, text and autocomplete search: 'atlas' uses Atlas Search indexes,
+    # 'local' keeps cosine and BM25 indexes in process and works against any mongod.
+    retrieval_backend = create_retrieval_backend(
+        Config.RETRIEVAL_BACKEND,
+        lambda: get_collection('documents'),
+        refresh_seconds=Config.LOCAL_VECTOR_INDEX_REFRESH_SECONDS,
+        rebuild_seconds=Config.LOCAL_VECTOR_INDEX_REBUILD_SECONDS
+    )
+
+    # Login locations come from a local, memory-mapped GeoIP database
+    geoip_resolver = GeoIPResolver(Config.GEOIP_DATABASE_PATH, cache_size=Config.GEOIP_CACHE_SIZE)
+
+    # Dashboard counters, kept current by the write paths and reconciled periodically
+    stats_rollups = StatsRollups(
+        lambda: get_collection('stats_rollups'),
+        lambda name: get_collection(name),
+        reconcile_seconds=Config.STATS_RECONCILE_SECONDS
+    )
+
+    # Per-question answer feedback counters for the admin statistics table
+    feedback_stats = FeedbackStats(
+        lambda: get_collection('answer_feedback_stats'),
+        lambda: get_documents_collection()
+    )
+
+    # Users loaded by flask_login on every request; invalidated on writes to the user
+    user_cache = UserCache(ttl_seconds=Config.USER_CACHE_TTL_SECONDS)
+
+    embedding_cache = EmbeddingCache(
+        lambda: get_collection('embedding_cache'),
+        max_bytes=Config.EMBEDDING_CACHE_MAX_BYTES,
+        ttl_days=Config.EMBEDDING_CACHE_TTL_DAYS
+    )
+
+    # Identical concurrent requests share one embedding, search or generation call;
+    # with the Mongo lease enabled this also holds across worker processes.
+    request_coalescer = SingleFlight(
+        (lambda: get_collection('single_flight_leases')) if Config.SINGLE_FLIGHT_MONGO_LEASE else None,
+        lease_seconds=Config.SINGLE_FLIGHT_LEASE_SECONDS
+    )
+
+    # Final chat responses for repeated questions, checked before any embedding or search work
+    answer_cache = AnswerCache(
+        ttl_seconds=Config.ANSWER_CACHE_TTL_SECONDS,
+        max_entries=Config.ANSWER_CACHE_MAX_ENTRIES,
+        generations_getter=lambda: get_collection('cache_generations'),
+        generation_check_seconds=Config.ANSWER_CACHE_GENERATION_CHECK_SECONDS
+    )
+
+    entity_extractor = EntityExtractor(sample_rate=Config.NLP_ENTITY_SAMPLE_RATE)
+
+    # Conversation embeddings fold in every message; answers are embedded on the background
+    # path, questions come from the cache their request filled
+    conversation_vector = ConversationVector(
+        lambda text: embedding_cache.lookup(text),
+        decay=Config.CONVERSATION_EMBEDDING_DECAY,
+        embed_many=(lambda texts: generate_embeddings(texts)) if Config.CONVERSATION_EMBED_ANSWERS else None
+    )
+
+    # Messages are stored in fixed-size buckets; conversation documents are small headers
+    message_store = MessageStore(
+        lambda: get_conversation_collection(),
+        lambda: get_collection('conversation_messages'),
+        bucket_size=Config.MESSAGE_BUCKET_SIZE,
+        recent_size=Config.RECENT_MESSAGES
+    )
+
+    # Conversation bookkeeping runs after the response; see record_turn
+    background_pipeline = BackgroundPipeline(
+        workers=Config.BACKGROUND_WORKERS,
+        max_depth=Config.BACKGROUND_MAX_DEPTH
+    )
+
+    # Local event-intent check; the LLM is only consulted for ambiguous scores when opted in
+    event_classifier = EventIntentClassifier(
+        lambda text: get_cached_embedding(text),
+        lambda texts: generate_embeddings(texts),
+        llm_judge=(lambda question: is_event_related_question(question)) if Config.EVENT_INTENT_LLM_TIEBREAK else None,
+        accept_threshold=Config.EVENT_INTENT_ACCEPT_THRESHOLD,
+        reject_threshold=Config.EVENT_INTENT_REJECT_THRESHOLD
+    )
+
+    intent_executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix='intent')
+
+    events_answer_cache = EventsAnswerCache(ttl_seconds=Config.EVENTS_ANSWER_CACHE_TTL_SECONDS)
+
+    # Relevance gate for database matches: decided locally except in the ambiguous band
+    question_reranker = LocalReranker(
+        lambda: get_collection('rerank_verdicts'),
+        lambda: get_collection('documents'),
+        llm_judge=(lambda query, candidate: verify_question_similarity(query, candidate)) if Config.RERANK_LLM_TIEBREAK else None,
+        accept_threshold=Config.RERANK_ACCEPT_THRESHOLD,
+        reject_threshold=Config.RERANK_REJECT_THRESHOLD,
+        ttl_days=Config.RERANK_VERDICT_TTL_DAYS,
+        memory_ttl_seconds=Config.RERANK_MEMORY_TTL_SECONDS
+    )
+
 def init_db(app):
+    init_services()
     with app.app_context():
         app.logger.info("Starting database initialization")
         db = get_db_connection()
         if db is not None:
             app.config['db'] = db
             app.logger.info("Database initialized successfully")
+            try:
+                db['events'].create_index('date_time')
+            except Exception as e:
+                app.logger.error(f"Failed to create events date_time index: {str(e)}")
+            try:
+                embedding_cache.ensure_indexes(db['embedding_cache'])
+            except Exception as e:
+                app.logger.error(f"Failed to create embedding cache indexes: {str(e)}")
+            try:
+                question_reranker.ensure_indexes(db['rerank_verdicts'])
+            except Exception as e:
+                app.logger.error(f"Failed to create reranker verdict indexes: {str(e)}")
+            if Config.SINGLE_FLIGHT_MONGO_LEASE:
+                try:
+                    request_coalescer.ensure_indexes(db['single_flight_leases'])
+                except Exception as e:
+                    app.logger.error(f"Failed to create single-flight lease indexes: {str(e)}")
+            if local_vector_index is not None:
+                local_vector_index.start(app)
+            background_pipeline.start(app)
+            stats_rollups.start(app)
+            try:
+                feedback_stats.ensure_indexes(db['answer_feedback_stats'])
+            except Exception as e:
+                app.logger.error(f"Failed to create answer feedback stats indexes: {str(e)}")
+            try:
+                ensure_conversation_indexes(db['conversations'])
+            except Exception as e:
+                app.logger.error(f"Failed to create conversation indexes (close duplicate active "
+                                 f"conversations with scripts/close_duplicate_conversations.py): {str(e)}")
+            try:
+                message_store.ensure_indexes(db['conversation_messages'])
+            except Exception as e:
+                app.logger.error(f"Failed to create conversation message indexes: {str(e)}")
+            try:
+                retrieval_backend.start(app)
+            except Exception as e:
+                app.logger.error(f"Failed to start {Config.RETRIEVAL_BACKEND} retrieval backend: {str(e)}")
             # Perform any additional setup here if needed
         else:
             app.logger.error("Failed to initialize the database")
@@ -113,90 +328,59 @@ def init_db(app):
 
 SIMILARITY_THRESHOLD = 0.91  # Governs matching of similar questions from database collection `documents`
 
-# Attempt to connect to MongoDB
-try:
-    client = MongoClient(Config.MONGODB_URI, serverSelectionTimeoutMS=5000)
-    client.server_info()  # Will raise an exception if unable to connect
-    
-    logger.info(f"Successfully connected to MongoDB. Database: {Config.MONGODB_DB}, Collection: {Config.MONGODB_COLLECTION}")
-except Exception as e:
-    logger.error(f"Failed to connect to MongoDB: {str(e)}")
-    client = None
-    db = None
-    collection = None
+# Vector and text retrieval run side by side under a per-branch deadline, so a slow
+# search index degrades to single-branch results instead of stalling /api/chat.
+SEARCH_BRANCH_TIMEOUT = Config.SEARCH_BRANCH_TIMEOUT_MS / 1000.0
 
 client = None
 db = None
 
 openai.api_key = Config.OPENAI_API_KEY
 
-@with_db_connection
-def update_user_login_info(db, user_id):
-    users_collection = db['users']
-
-    current_app.logger.info(f"Updating login info for user ID: {user_id}")
+def update_user_login_info(user_id, force=False):
+    """
+    Records the user's login time, IP and location. Runs at most once per session
+    unless `force` is set (as on login); the write itself happens off the request path.
+    """
+    if not force and session.get('login_info_recorded') == user_id:
+        return None
+    session['login_info_recorded'] = user_id
 
-    # Get user's IP address
-    if request.headers.getlist("X-Forwarded-For"):
-        ip = request.headers.getlist("X-Forwarded-For")[0]
-        current_app.logger.info(f"IP address from X-Forwarded-For: {ip}")
-    else:
-        ip = request.remote_addr
-        current_app.logger.info(f"IP address from remote_addr: {ip}")
-    
+    ip = client_ip(request.headers.get('X-Forwarded-For'), request.remote_addr)
     update_data = {
         'last_login': datetime.now(timezone.utc),
         'last_ip': ip
     }
-    
-    current_app.logger.info(f"Initial update data: {update_data}")
-
-    # Use a geolocation API to get location info
-    try:
-        geolocation_url = f'http://ip-api.com/json/{ip}'
-        current_app.logger.info(f"Requesting geolocation data from: {geolocation_url}")
-        
-        response = requests.get(geolocation_url, timeout=5)  # Add a timeout
-        current_app.logger.info(f"Geolocation API response status code: {response.status_code}")
-        
-        if response.status_code == 200:
-            location_data = response.json()
-            current_app.logger.info(f"Received location data: {location_data}")
-            
-            update_data['last_location'] = {
-                'country': location_data.get('country'),
-                'region': location_data.get('regionName'),
-                'city': location_data.get('city'),
-                'lat': location_data.get('lat'),
-                'lon': location_data.get('lon')
-            }
-            current_app.logger.info(f"Updated location data: {update_data['last_location']}")
-        else:
-            current_app.logger.warning(f"Unexpected status code from geolocation API: {response.status_code}")
-            current_app.logger.warning(f"Response content: {response.text}")
-    except requests.RequestException as e:
-        current_app.logger.error(f"RequestException while getting location data: {str(e)}")
-    except Exception as e:
-        current_app.logger.error(f"Unexpected error while getting location data: {str(e)}")
-        current_app.logger.error(f"Error traceback: {traceback.format_exc()}")
-    
-    current_app.logger.info(f"Final update data: {update_data}")
-    
-    result = users_collection.update_one({'_id': ObjectId(user_id)}, {'$set': update_data})
-    current_app.logger.info(f"Database update result: {result.modified_count} document(s) modified")
+    current_app.logger.debug(f"Recording login info for user ID {user_id} from {ip}")
 
+    if not background_pipeline.submit(persist_login_info, user_id, update_data, key=user_id):
+        persist_login_info(user_id, update_data)
     return update_data
 
-@lru_cache(maxsize=1000)
+def persist_login_info(user_id, update_data):
+    location = geoip_resolver.lookup(update_data['last_ip'])
+    if location:
+        update_data = dict(update_data, last_location=location)
+    result = get_users_collection().update_one({'_id': ObjectId(user_id)}, {'$set': update_data})
+    user_cache.invalidate(user_id)
+    logger.debug(f"Login info update for user {user_id}: {result.modified_count} document(s) modified")
+
+def load_user_data(user_id):
+    """The fields auth.User needs, served from user_cache for up to USER_CACHE_TTL_SECONDS."""
+    return user_cache.get_or_load(
+        user_id,
+        lambda user_id: get_users_collection().find_one({'_id': ObjectId(user_id)}, USER_PROJECTION)
+    )
+
 def generate_embedding(text):
     debug_info = {}
     try:
         logger.debug(f"Generating embedding for text: {text[:50]}...")
         debug_info['openai_request'] = {
-            'model': "text-embedding-ada-002",
+            'model': EMBEDDING_MODEL,
             'input': text
         }
-        response = openai.Embedding.create(model="text-embedding-ada-002", input=text)
+        response = openai.Embedding.create(model=EMBEDDING_MODEL, input=text)
         debug_info['openai_response'] = json.loads(json.dumps(response, default=str))
         embedding = response['data'][0]['embedding']
         debug_info['embedding_length'] = len(embedding)
@@ -208,102 +392,95 @@ def generate_embedding(text):
         debug_info['traceback'] = traceback.format_exc()
         raise
 
+def generate_embeddings(texts):
+    """
+    Returns embeddings for `texts` in the same order. Cached vectors are reused and
+    the remaining texts are embedded in as few OpenAI requests as the token budget allows.
+    """
+    return embedding_cache.get_or_create_many(texts, embed_texts_batched)
+
+def embed_texts_batched(texts):
+    embeddings = []
+    for batch in batch_by_token_budget(texts, Config.EMBEDDING_BATCH_TOKEN_BUDGET):
+        logger.debug(f"Generating embeddings for a batch of {len(batch)} texts")
+        response = openai.Embedding.create(model=EMBEDDING_MODEL, input=batch)
+        # The API reports each embedding's position in the input list
+        data = sorted(response['data'], key=lambda item: item['index'])
+        embeddings.extend(item['embedding'] for item in data)
+    return embeddings
+
+def estimate_tokens(text):
+    # Roughly four characters per token for English text
+    return len(text) // 4 + 1
+
+def batch_by_token_budget(texts, token_budget, max_batch_size=2048):
+    batch = []
+    batch_tokens = 0
+    for text in texts:
+        tokens = estimate_tokens(text)
+        if batch and (batch_tokens + tokens > token_budget or len(batch) >= max_batch_size):
+            yield batch
+            batch = []
+            batch_tokens = 0
+        batch.append(text)
+        batch_tokens += tokens
+    if batch:
+        yield batch
+
 @with_db_connection
 def add_question_answer(db, question, answer, title, summary, references):
     try:
+        question_embedding, answer_embedding = generate_embeddings([question, answer])
         document = {
             'question': question,
             'answer': answer,
             'title': title,
             'summary': summary,
             'references': references,
-            'question_embedding': generate_embedding(question)[0],
-            'answer_embedding': generate_embedding(answer)[0],
-            'created_at': datetime.now(),
-            'updated_at': datetime.now(),
+            'question_embedding': question_embedding,
+            'answer_embedding': answer_embedding,
+            'created_at': datetime.utcnow(),
+            'updated_at': datetime.utcnow(),
             'schema_version': 2,
             'created_by': 'ai'
         }
         result = db.documents.insert_one(document)
+        stats_rollups.increment(documents=1)
         return str(result.inserted_id)
     except Exception as e:
         current_app.logger.error(f"Error adding question and answer: {str(e)}")
         current_app.logger.error(traceback.format_exc())
         raise
 
-def generate_title(question):
-    # Use the first few words of the question as the title
-    max_words = 5
-    title = ' '.join(question.split()[:max_words])
-    return title if len(title) < 30 else title[:27] + '...'
-
-
-from bson import ObjectId
-
 #def search_similar_questions(db, question_embedding, query_text, similarity_threshold=0.8):
 #def search_similar_questions(db, query, is_embedding=False, similarity_threshold=0.8):
 # def search_similar_questions(db, question_embedding, query_text=None, similarity_threshold=0.8):
 @with_db_connection
 def search_similar_questions(db, question_embedding, user_question, module, similarity_threshold=SIMILARITY_THRESHOLD):
-    user_question_lower = user_question.lower()
+    if Config.SEARCH_MODE == 'rrf':
+        return search_similar_questions_rrf(question_embedding, user_question, module, similarity_threshold)
 
-    # Vector search stage
-    vector_search_stage = [
-        {
-            '$vectorSearch': {
-                'index': 'question_index',
-                'path': 'question_embedding',
-                'queryVector': question_embedding,
-                'numCandidates': 100,
-                'limit': 10
-            }
-        },
-        {
-            '$project': {
-                'question': 1,
-                'answer': 1,
-                'title': 1,
-                'summary': 1,
-                'references': 1,
-                'module': 1,
-                'vector_score': {'$meta': 'vectorSearchScore'},
-            }
-        }
-    ]
-
-    # Text search stage
-    text_search_stage = [
-        {
-            '$search': {
-                'index': 'default',
-                'text': {
-                    'query': user_question_lower,
-                    'path': ['question', 'answer', 'title'],
-                    'fuzzy': {'maxEdits': 2}
-                }
-            }
-        },
-        {
-            '$project': {
-                'question': 1,
-                'answer': 1,
-                'title': 1,
-                'summary': 1,
-                'references': 1,
-                'module': 1,
-                'text_score': {'$meta': 'searchScore'},
-            }
-        }
-    ]
+    user_question_lower = user_question.lower()
+    if not module or module.lower() == "select a module":
+        module = None
 
-    # Apply module filter if specified
-    if module and module.lower() != "select a module":
-        module_filter = {'$match': {'module': module}}
-        vector_search_stage.insert(1, module_filter)
-        text_search_stage.insert(1, module_filter)
+    documents_collection = get_documents_collection()
+    text_future = search_executor.submit(
+        retrieval_backend.text_search, documents_collection, user_question_lower,
+        module=module, max_time_ms=Config.SEARCH_BRANCH_TIMEOUT_MS
+    )
+    vector_results = search_local_vector_index(question_embedding, module)
+    if vector_results is None:
+        vector_future = search_executor.submit(
+            retrieval_backend.vector_search, documents_collection, question_embedding,
+            limit=10, module=module, max_time_ms=Config.SEARCH_BRANCH_TIMEOUT_MS
+        )
 
-    vector_results = list(get_documents_collection().aggregate(vector_search_stage))
-    text_results = list(get_documents_collection().aggregate(text_search_stage))
+    # Both branches started together, so they share one deadline
+    deadline = time.monotonic() + SEARCH_BRANCH_TIMEOUT
+    if vector_results is None:
+        vector_results = collect_search_branch(vector_future, 'vector', deadline)
+    text_results = collect_search_branch(text_future, 'text', deadline)
 
     # Combine and process results
     all_results = vector_results + text_results
@@ -324,6 +501,91 @@ def search_similar_questions(db, question_embedding, user_question, module, simi
 
     return filtered_results[:5]
 
+def search_local_vector_index(question_embedding, module, limit=10):
+    """
+    Runs the vector branch against the in-process index. Returns None when the
+    index is disabled or stale, so the caller falls back to Atlas $vectorSearch.
+    """
+    if local_vector_index is None or not local_vector_index.is_fresh():
+        return None
+    if module and module.lower() == "select a module":
+        module = None
+    try:
+        return local_vector_index.search(question_embedding, limit=limit, module=module)
+    except Exception as e:
+        logger.error(f"Error in local vector search: {str(e)}")
+        return None
+
+def search_similar_questions_rrf(question_embedding, user_question, module, similarity_threshold=SIMILARITY_THRESHOLD, limit=5):
+    """
+    Hybrid retrieval fused with reciprocal rank fusion.
+
+    The vector and text branches are ranked independently and merged by the
+    retrieval backend (server-side via $unionWith on Atlas). Only `_id`,
+    `question` and scores are guaranteed in the results; callers fetch the answer
+    body with `load_matched_answer` once the best match has passed the relevance check.
+
+    Results are ordered by `combined_score`, the RRF sum normalised by its maximum
+    (a document ranked first in both branches scores 1.0). That score is relative
+    to the other candidates, so `similarity_threshold` is applied to each result's
+    raw `vector_score` instead: a document only the text branch found is never a
+    match, and a strong vector-only match still is.
+    """
+    if not module or module.lower() == "select a module":
+        module = None
+
+    try:
+        return retrieval_backend.hybrid_search(
+            get_documents_collection(), question_embedding, user_question.lower(),
+            module=module, similarity_threshold=similarity_threshold, limit=limit,
+            rrf_k=Config.RRF_K, max_time_ms=Config.SEARCH_BRANCH_TIMEOUT_MS
+        )
+    except Exception as e:
+        logger.error(f"Error in hybrid RRF search: {str(e)}")
+        return []
+
+def match_similarity(match):
+    """
+    The score a search result is held to the similarity threshold with. In RRF
+    mode that is the raw vector score, since the fused score is only a ranking.
+    """
+    if Config.SEARCH_MODE == 'rrf':
+        return match.get('vector_score') or 0.0
+    return match['combined_score']
+
+def load_matched_answer(match):
+    """
+    Fills in the answer fields of a search match that only carries ids and scores.
+    Matches that already include the answer are returned unchanged.
+    """
+    if 'answer' in match:
+        return match
+    document = get_documents_collection().find_one(
+        {'_id': match['_id']},
+        {'answer': 1, 'title': 1, 'summary': 1, 'references': 1, 'module': 1}
+    )
+    if document:
+        document.pop('_id', None)
+        match.update(document)
+    return match
+
+def collect_search_branch(future, branch_name, deadline):
+    """
+    Waits for one retrieval branch until `deadline` and returns its results.
+
+    A branch that times out or fails contributes no results, so the caller
+    still gets whatever the other branch found.
+    """
+    try:
+        return future.result(timeout=max(0, deadline - time.monotonic()))
+    except FutureTimeoutError:
+        future.cancel()
+        logger.warning(f"{branch_name} search exceeded {SEARCH_BRANCH_TIMEOUT:.2f}s, continuing without it")
+        return []
+    except Exception as e:
+        logger.error(f"Error in {branch_name} search: {str(e)}")
+        return []
+
 @with_db_connection
 def add_unanswered_question(db, user_id, user_name, question, potential, module):
     debug_info = {'function': 'add_unanswered_questions'}
@@ -341,6 +603,7 @@ def add_unanswered_question(db, user_id, user_name, question, potential, module)
             'summary': potential.get('summary'),
             'references': potential.get('references'),
         })
+        stats_rollups.increment(unanswered_total=1)
         logger.info(f"Unanswered question added for user {user_name} (ID: {user_id})")
         debug_info['unanswered_question'] = {
             'user_id': user_id,
@@ -427,26 +690,49 @@ def store_message(user_id, message, sender, conversation_id=None):
             'timestamp': datetime.utcnow()
         }
     
-    update_data = {
-        '$push': {'messages': message_entry},
-        '$set': {'last_updated': datetime.utcnow()},
-        '$inc': {'context.last_n_messages': 1}
-    }
-    
+    header_set = {'last_updated': datetime.utcnow()}
     if sender == 'User':
         # Assuming current_user.name is available
-        update_data['$set']['user_name'] = current_user.name
+        header_set['user_name'] = current_user.name
     
-    result = get_conversation_collection().update_one(
-        {'_id': ObjectId(conversation_id)},
-        update_data
-    )
-    current_app.logger.debug(f"Update result: matched={result.matched_count}, modified={result.modified_count}")
+    count = message_store.append(ObjectId(conversation_id), [message_entry], header_set=header_set,
+                                 header_inc={'context.last_n_messages': 1})
+    current_app.logger.debug(f"Stored message, conversation now has {count} messages")
     
-    update_conversation_context(conversation_id)
+    schedule_context_update(conversation_id)
     
     return conversation_id
 
+def record_turn(user_id, user_name, conversation_id, question, answer, asked_at=None):
+    """
+    Queues a question/answer turn for storage off the response path. Falls back to
+    storing it inline when the queue is full, so turns are never lost. With
+    `answer` None only the question is stored, for requests that failed to answer.
+    """
+    asked_at = asked_at or datetime.utcnow()
+    answered_at = datetime.utcnow()
+    if not background_pipeline.submit(persist_turn, user_id, user_name, conversation_id, question, answer,
+                                      asked_at, answered_at, key=conversation_id):
+        persist_turn(user_id, user_name, conversation_id, question, answer, asked_at, answered_at)
+
+def persist_turn(user_id, user_name, conversation_id, question, answer, asked_at, answered_at):
+    """Appends the messages of a turn in a single write, then refreshes the context once."""
+    messages = [{'role': 'User', 'content': str(question), 'timestamp': asked_at}]
+    if answer is not None:
+        messages.append({'role': 'Assistant', 'content': str(answer), 'timestamp': answered_at})
+    count = message_store.append(
+        ObjectId(conversation_id),
+        messages,
+        header_set={'last_updated': answered_at, 'user_name': user_name},
+        header_inc={'context.last_n_messages': len(messages)}
+    )
+    logger.debug(f"Stored turn for user {user_id}, conversation now has {count} messages")
+    schedule_context_update(conversation_id)
+
+def schedule_context_update(conversation_id):
+    # Coalesced: bursts of turns on one conversation collapse into one recompute
+    background_pipeline.submit(update_conversation_context, conversation_id, key=conversation_id, coalesce=True)
+
 def get_active_conversation(user_id):
     conversation_collection = get_conversation_collection()
     return conversation_collection.find_one(
@@ -461,13 +747,14 @@ def close_active_conversations(user_id):
         {'$set': {'status': 'closed', 'closed_at': datetime.now()}}
     )
 
-def create_new_conversation(user_id):
-    close_active_conversations(user_id)
-    new_conversation = {
-        'user_id': user_id,
+def new_conversation_fields():
+    """Initial fields of a conversation header; user_id and status come from the upsert query."""
+    now = datetime.utcnow()
+    return {
         'title': 'New Conversation',
-        'status': 'active',
-        'messages': [],
+        'message_count': 0,
+        'preview_messages': [],
+        'recent_messages': [],
         'context_summary': '',
         'context': {
             'topics': [],
@@ -479,114 +766,117 @@ def create_new_conversation(user_id):
             'tags': [],
             'custom_fields': {}
         },
-        'created_at': datetime.utcnow(),
-        'last_updated': datetime.utcnow()
+        'created_at': now,
+        'last_updated': now
     }
-    result = get_conversation_collection().insert_one(new_conversation)
-    return str(result.inserted_id)
 
-def get_or_create_conversation(user_id):
-    current_app.logger.debug(f"Getting or creating conversation for user {user_id}")
-    
-    # Check for an active conversation
-    active_conversation = get_conversation_collection().find_one(
-        {'user_id': user_id, 'status': 'active'},
-        sort=[('last_updated', -1)]
-    )
-    
-    if active_conversation:
-        current_app.logger.debug(f"Found active conversation: {active_conversation['_id']}")
-        # Check if the conversation has messages
-        if active_conversation.get('messages', []):
-            current_app.logger.debug("Active conversation has messages. Creating a new one.")
-            # If it has messages, create a new conversation
-            return create_new_conversation(user_id)
-        else:
-            current_app.logger.debug("Active conversation has no messages. Using it.")
-            return str(active_conversation['_id'])
-    else:
-        current_app.logger.debug("No active conversation found. Creating a new one.")
-        return create_new_conversation(user_id)
-
-def extract_topics(text, top_n=5):
-    ensure_nltk_data()
+def resolve_active_conversation(user_id, force_new=False):
+    """
+    Returns the id of the user's active conversation, creating it if there is none,
+    in a single find_one_and_update upsert. With `force_new` the active conversation
+    is closed first so the upsert starts a fresh one.
 
-    # Tokenize the text
-    tokens = word_tokenize(text.lower())
-    
-    # Remove stopwords and non-alphabetic tokens
-    stop_words = set(stopwords.words('english'))
-    tokens = [token for token in tokens if token.isalpha() and token not in stop_words]
-    
-    # Count the frequency of each token
-    word_freq = Counter(tokens)
-    
-    # Get the top N most common words as topics
-    topics = [word for word, _ in word_freq.most_common(top_n)]
-    
-    return topics
+    The partial unique index on active conversations (see ensure_conversation_indexes)
+    makes this race-free: when two requests upsert at once, one insert fails with a
+    duplicate key and is retried, which then finds the other request's conversation.
+    """
+    if force_new:
+        close_active_conversations(user_id)
 
-def extract_entities(text):
-    ensure_nltk_data()
+    conversation_collection = get_conversation_collection()
+    for attempt in range(2):
+        try:
+            conversation = conversation_collection.find_one_and_update(
+                {'user_id': user_id, 'status': 'active'},
+                {'$setOnInsert': new_conversation_fields()},
+                sort=[('last_updated', -1)],
+                projection={'_id': 1},
+                upsert=True,
+                return_document=ReturnDocument.AFTER
+            )
+            return str(conversation['_id'])
+        except DuplicateKeyError:
+            if attempt:
+                raise
+            logger.debug(f"Concurrent conversation creation for user {user_id}, retrying")
 
-    # Tokenize and tag the text
-    tokens = word_tokenize(text)
-    tagged = nltk.pos_tag(tokens)
-    
-    # Use NLTK's named entity recognition
-    entities = nltk.chunk.ne_chunk(tagged)
-    
-    # Extract named entities
-    named_entities = []
-    for subtree in entities:
-        if isinstance(subtree, nltk.Tree):
-            entity_type = subtree.label()
-            entity_value = ' '.join([leaf[0] for leaf in subtree.leaves()])
-            named_entities.append((entity_type, entity_value))
-    
-    return named_entities
+def create_new_conversation(user_id):
+    return resolve_active_conversation(user_id, force_new=True)
 
-def generate_context_summary(context_text, max_length=200):
-    # This is a very basic summary generation.
-    # For better results, consider using an AI model or a more sophisticated summarization algorithm.
-    sentences = re.split(r'(?<=[.!?])\s+', context_text)
-    summary = ' '.join(sentences[:3])  # Take first 3 sentences
-    if len(summary) > max_length:
-        summary = summary[:max_length] + '...'
-    return summary
+def get_or_create_conversation(user_id):
+    return resolve_active_conversation(user_id)
+
+def ensure_conversation_indexes(collection):
+    collection.create_index([('user_id', ASCENDING), ('status', ASCENDING), ('last_updated', DESCENDING)])
+    # At most one active conversation per user
+    collection.create_index(
+        [('user_id', ASCENDING)],
+        name='user_id_active_unique',
+        unique=True,
+        partialFilterExpression={'status': 'active'}
+    )
 
 # Update the update_conversation_context function
 @with_db_connection
 def update_conversation_context(db, conversation_id):
     conversation_collection = get_collection('conversations')
-    conversation = conversation_collection.find_one({'_id': ObjectId(conversation_id)})
+    conversation = conversation_collection.find_one(
+        {'_id': ObjectId(conversation_id)},
+        {
+            'context.topic_counts': 1, 'context.topic_counts_seq': 1, 'recent_messages': 1,
+            'messages': {'$slice': -5}, 'message_count': 1,
+            'embedding': 1, 'embedding_weight': 1, 'embedding_seq': 1
+        }
+    )
     
     if not conversation:
         return
     
-    last_n_messages = conversation['messages'][-5:]  # Consider last 5 messages
+    last_n_messages = recent_messages(conversation, 5)  # Consider last 5 messages
     
     # Modified this line to handle potential dictionary messages
     context_text = " ".join([msg['content'] if isinstance(msg, dict) else str(msg) for msg in last_n_messages])
     
     context_summary = generate_context_summary(context_text)
-    topics = extract_topics(context_text)
-    entities = extract_entities(context_text)
-    
-    conversation_embedding = generate_embedding(context_text)
-    
+    update = {'context_summary': context_summary}
+    update.update(fold_conversation_topics(conversation))
+    # Conversations from before recent_messages have no counts
+    counts = update.get('context.topic_counts', conversation.get('context', {}).get('topic_counts'))
+    update['context.topics'] = top_topics(counts) if counts else extract_topics(context_text)
+    entities = entity_extractor.extract(context_text)
+
+    # Legacy `messages` are covered by whatever vector the conversation already had
+    update.update(conversation_vector.update(
+        conversation, conversation.get('recent_messages', []), conversation.get('message_count', 0)
+    ) or {})
+    if entities is not None:
+        update['context.entities'] = entities
     conversation_collection.update_one(
         {'_id': ObjectId(conversation_id)},
-        {
-            '$set': {
-                'context_summary': context_summary,
-                'context.topics': topics,
-                'context.entities': entities,
-                'embedding': conversation_embedding
-            }
-        }
+        {'$set': update}
     )
 
+def fold_conversation_topics(conversation):
+    """
+    Folds the recent messages the header's topic counts have not seen into them,
+    keeping the counts to CONVERSATION_TOPIC_COUNTS_MAX words. `topic_counts_seq`
+    is the number of messages folded so far. Returns the header fields to `$set`.
+    """
+    context = conversation.get('context', {})
+    counts = context.get('topic_counts')
+    messages = conversation.get('recent_messages', [])
+    total = conversation.get('message_count', 0)
+    # Counts written before topic_counts_seq existed already cover every message
+    seen = context.get('topic_counts_seq', total if counts else 0)
+    unseen = messages[max(0, seen - (total - len(messages))):]
+    if not unseen and len(counts or {}) <= Config.CONVERSATION_TOPIC_COUNTS_MAX:
+        return {}
+    texts = [message['content'] if isinstance(message, dict) else str(message) for message in unseen]
+    return {
+        'context.topic_counts': fold_topic_counts(counts, texts, Config.CONVERSATION_TOPIC_COUNTS_MAX),
+        'context.topic_counts_seq': total
+    }
+
 @with_db_connection
 def get_current_conversation(db, user_id):
     conversation_collection = get_collection('conversations')
@@ -635,7 +925,10 @@ def get_user_conversations(db, user_id):
 @with_db_connection
 def get_conversation_context(db, conversation_id):
     conversations = get_collection('conversations')
-    conversation = conversations.find_one({'_id': ObjectId(conversation_id)})
+    conversation = conversations.find_one(
+        {'_id': ObjectId(conversation_id)},
+        {'context_summary': 1, 'context': 1, 'recent_messages': {'$slice': -5}, 'messages': {'$slice': -5}}
+    )
     if not conversation:
         return "", ""
     
@@ -648,7 +941,7 @@ def get_conversation_context(db, conversation_id):
     context += f"Entities: {', '.join([f'{e[1]}' for e in entities])}\n"
     
     # Get the last few messages for immediate context
-    last_messages = conversation.get('messages', [])[-5:]  # Get last 5 messages
+    last_messages = recent_messages(conversation, 5)  # Get last 5 messages
     context += "Recent messages:\n"
     last_assistant_message = ""
     for msg in last_messages:
@@ -669,24 +962,70 @@ def get_conversation_messages(db, conversation_id):
 
 def generate_potential_answer_v2(question, last_assistant_message=""):
     logger.debug(f"Generating potential answer for question: {question}")
-    
-    if is_event_related_question(question):
-        logger.debug("Question identified as event-related")
-        events_data = fetch_relevant_events(question)
-        logger.debug(f"Fetched {len(events_data)} relevant events")
-        if events_data:
-            logger.debug("Formatting events response")
-            return format_events_response(events_data, question)
-        else:
-            logger.debug("No relevant events found, returning default message")
-            return {
-                'title': 'No Upcoming Events',
-                'summary': 'There are currently no upcoming events in our database.',
-                'answer': "I'm sorry, but there are currently no upcoming events scheduled in our database for the next three months. We're continuously updating our event calendar. Please check back later for updates on future events, or you can visit our official website for the most up-to-date information on MongoDB Developer Day events.",
-                'references': 'Events data from MongoDB events collection.'
-            }
-        
-    # Existing code for non-event questions
+
+    # Settle the intent, tiebreak included, before asking for a general answer: a
+    # completion that has started cannot be cancelled and would be paid for anyway
+    if event_classifier.is_event_related(question):
+        return generate_event_answer(question)
+
+    return generate_general_answer(question, last_assistant_message)
+
+def generate_general_answer(question, last_assistant_message=""):
+    response = openai.ChatCompletion.create(
+        model="gpt-3.5-turbo",
+        messages=build_answer_messages(question, last_assistant_message)
+    )
+    answer = response['choices'][0]['message']['content'].strip()
+    logger.debug(f"Generated answer: {answer}")
+
+    return build_potential_answer(answer)
+
+def stream_potential_answer(question, last_assistant_message=""):
+    """
+    Streaming counterpart of generate_potential_answer_v2.
+
+    Yields ('token', text) tuples as the model emits them, then a single
+    ('answer', potential_answer) tuple shaped like generate_potential_answer_v2's
+    return value. Event answers are rendered locally and arrive as one token.
+    """
+    logger.debug(f"Streaming potential answer for question: {question}")
+
+    verdict = event_classifier.classify(question)
+    tiebreak = None
+    if verdict['event'] is None:
+        # Settle the tiebreak while the stream opens; no tokens go out until it is known
+        tiebreak = intent_executor.submit(event_classifier.tiebreak, question, verdict['score'])
+
+    if verdict['event']:
+        potential_answer = generate_event_answer(question)
+        yield 'token', potential_answer['answer']
+        yield 'answer', potential_answer
+        return
+
+    response = openai.ChatCompletion.create(
+        model="gpt-3.5-turbo",
+        messages=build_answer_messages(question, last_assistant_message),
+        stream=True
+    )
+    if tiebreak is not None and tiebreak.result():
+        response.close()
+        potential_answer = generate_event_answer(question)
+        yield 'token', potential_answer['answer']
+        yield 'answer', potential_answer
+        return
+
+    parts = []
+    for chunk in response:
+        text = chunk['choices'][0].get('delta', {}).get('content')
+        if text:
+            parts.append(text)
+            yield 'token', text
+
+    answer = ''.join(parts).strip()
+    logger.debug(f"Streamed answer: {answer}")
+    yield 'answer', build_potential_answer(answer)
+
+def build_answer_messages(question, last_assistant_message=""):
     context = "Context: MongoDB Developer Days, MongoDB Atlas, MongoDB Aggregation Pipelines, and MongoDB Atlas Search"
     prompt = f"""
     Previous assistant message: {last_assistant_message}
@@ -697,31 +1036,47 @@ def generate_potential_answer_v2(question, last_assistant_message=""):
 
     Please provide a detailed answer for the new question, taking into account the previous assistant message and the provided context. Ensure your response is consistent with the ongoing conversation and relates to MongoDB topics.
     """
-    
-    response = openai.ChatCompletion.create(
-        model="gpt-3.5-turbo",
-        messages=[
-            {"role": "system", "content": "You are an assistant that provides detailed answers about MongoDB, maintaining context throughout the conversation."},
-            {"role": "user", "content": prompt}
-        ]
-    )
-    answer = response['choices'][0]['message']['content'].strip()
-    logger.debug(f"Generated answer: {answer}")
+    return [
+        {"role": "system", "content": "You are an assistant that provides detailed answers about MongoDB, maintaining context throughout the conversation."},
+        {"role": "user", "content": prompt}
+    ]
 
-    related_concepts = [];
+def build_potential_answer(answer, with_metadata=None):
+    related_concepts = []
 
-    title = generate_title(answer)
-    summary = generate_summary(answer)
-    references = generate_references(answer)
+    if with_metadata is None:
+        with_metadata = Config.INTERACTIVE_ANSWER_METADATA
+    metadata = generate_answer_metadata(answer) if with_metadata else fill_answer_metadata(answer, {})
 
     return {
-        'title': title,
-        'summary': summary,
+        'title': metadata['title'],
+        'summary': metadata['summary'],
         'answer': answer,
-        'references': references,
+        'references': metadata['references'],
         'related_concepts': related_concepts
     }
 
+def generate_event_answer(question):
+    logger.debug("Question identified as event-related")
+    # The upcoming-events answer does not depend on the wording of the question
+    return events_answer_cache.get_or_render(render_upcoming_events_answer)
+
+def render_upcoming_events_answer():
+    """Returns (answer, first_event_at) for the events answer cache."""
+    events_data = fetch_relevant_events()
+    logger.debug(f"Fetched {len(events_data)} relevant events")
+    if events_data:
+        logger.debug("Formatting events response")
+        return format_events_response(events_data, None), as_utc(events_data[0].get('date_time'))
+    else:
+        logger.debug("No relevant events found, returning default message")
+        return {
+            'title': 'No Upcoming Events',
+            'summary': 'There are currently no upcoming events in our database.',
+            'answer': "I'm sorry, but there are currently no upcoming events scheduled in our database for the next three months. We're continuously updating our event calendar. Please check back later for updates on future events, or you can visit our official website for the most up-to-date information on MongoDB Developer Day events.",
+            'references': 'Events data from MongoDB events collection.'
+        }, None
+
 def is_event_related_question(question):
     prompt = f"""
     Determine if the following question is related to events, specifically MongoDB Developer Day events or similar tech conferences. 
@@ -747,33 +1102,24 @@ def is_event_related_question(question):
     except Exception as e:
         logger.error(f"Error in is_event_related_question: {str(e)}")
         # If there's an error, we'll fall back to the keyword method
-        event_keywords = ['event', 'developer day', 'conference', 'workshop', 'upcoming', 'schedule', 'calendar']
-        return any(keyword in question.lower() for keyword in event_keywords)
+        return any(keyword in question.lower() for keyword in EVENT_KEYWORDS)
 
 @with_db_connection
-def fetch_relevant_events(db, question):
+def fetch_relevant_events(db, question=None):
     logger.debug(f"Fetching relevant events for question: {question}")
     events_collection = get_collection('events')
 
     now = datetime.now(timezone.utc)
     three_months_from_now = now + timedelta(days=90)
 
-    # Default to fetching upcoming events
+    # Upcoming events only; served by the date_time index created in init_db
     query = {'date_time': {'$gte': now, '$lte': three_months_from_now}}
+    projection = {'title': 1, 'date_time': 1, 'city': 1, 'state': 1, 'country_code': 1, 'registration_url': 1}
 
-    logger.debug(f"Initial query: {query}")
-
-    # # Adjust query based on question specifics
-    # question_lower = question.lower()
-    # if 'past' in question_lower:
-    #     query = {'date_time': {'$lt': now}}
-    # elif 'all' in question_lower:
-    query = {}
-
-    logger.debug(f"Adjusted query: {query}")
+    logger.debug(f"Query: {query}")
 
     # Sort events by date
-    events = list(events_collection.find(query).sort('date_time', 1).limit(10))
+    events = list(events_collection.find(query, projection).sort('date_time', 1).limit(10))
     
     logger.debug(f"Found {len(events)} events")
     for event in events:
@@ -781,6 +1127,19 @@ def fetch_relevant_events(db, question):
 
     return events
 
+def as_utc(value):
+    """Parses stored event dates (BSON dates come back naive, in UTC) into aware datetimes."""
+    if isinstance(value, str):
+        try:
+            value = datetime.fromisoformat(value.replace('Z', '+00:00'))
+        except ValueError:
+            return None
+    if not isinstance(value, datetime):
+        return None
+    if value.tzinfo is None:
+        return value.replace(tzinfo=timezone.utc)
+    return value.astimezone(timezone.utc)
+
 def format_events_response(events, question):
     logger.debug(f"Formatting response for {len(events)} events")
     
@@ -798,13 +1157,8 @@ def format_events_response(events, question):
         logger.debug(f"Processing event: {event}")
         
         # Extract date and time
-        date_time = event.get('date_time')
-        if isinstance(date_time, str):
-            try:
-                date_time = datetime.fromisoformat(date_time)
-            except ValueError:
-                date_time = None
-        
+        date_time = as_utc(event.get('date_time'))
+
         if isinstance(date_time, datetime):
             date = date_time.strftime('%Y-%m-%d')
             time = date_time.strftime('%H:%M %Z')
@@ -834,93 +1188,6 @@ def format_events_response(events, question):
         'references': 'Events data from MongoDB events collection.'
     }
 
-def generate_title(answer):
-    context = "Context: MongoDB Developer Days, MongoDB Atlas, MongoDB Aggregation Pipelines, and MongoDB Atlas Search"
-    prompt = f"{context}\n\nPlease provide a concise and descriptive title for the following answer:\n\n{answer}"
-    
-    response = openai.ChatCompletion.create(
-        model="gpt-3.5-turbo",
-        messages=[
-            {"role": "system", "content": "You are an assistant that provides concise and descriptive titles."},
-            {"role": "user", "content": prompt}
-        ]
-    )
-    title = response['choices'][0]['message']['content'].strip()
-    return title
-
-def generate_summary(answer):
-    context = "Context: MongoDB Developer Days, MongoDB Atlas, MongoDB Aggregation Pipelines, and MongoDB Atlas Search"
-    prompt = f"{context}\n\nPlease summarize the following text:\n\n{answer}"
-    
-    response = openai.ChatCompletion.create(
-        model="gpt-3.5-turbo",
-        messages=[
-            {"role": "system", "content": "You are an assistant that provides summaries."},
-            {"role": "user", "content": prompt}
-        ]
-    )
-    summary = response['choices'][0]['message']['content'].strip()
-    return summary
-
-def generate_references(answer):
-    context = "Context: MongoDB Developer Days, MongoDB Atlas, MongoDB Aggregation Pipelines, and MongoDB Atlas Search"
-    prompt = f"{context}\n\nPlease provide a relevant reference for the following text from the MongoDB documentation:\n\n{answer}"
-    
-    response = openai.ChatCompletion.create(
-        model="gpt-3.5-turbo",
-        messages=[
-            {"role": "system", "content": "You are an assistant that provides relevant references."},
-            {"role": "user", "content": prompt}
-        ]
-    )
-    references = response['choices'][0]['message']['content'].strip()
-    if not references:
-        references = "No specific references provided. Please refer to the MongoDB Documentation at https://www.mongodb.com/docs/"
-    return references
-
-def extract_topics(text, top_n=5):
-    # Tokenize the text
-    tokens = word_tokenize(text.lower())
-    
-    # Remove stopwords and non-alphabetic tokens
-    stop_words = set(stopwords.words('english'))
-    tokens = [token for token in tokens if token.isalpha() and token not in stop_words]
-    
-    # Count the frequency of each token
-    word_freq = Counter(tokens)
-    
-    # Get the top N most common words as topics
-    topics = [word for word, _ in word_freq.most_common(top_n)]
-    
-    return topics
-
-def extract_entities(text):
-    # Tokenize and tag the text
-    tokens = word_tokenize(text)
-    tagged = nltk.pos_tag(tokens)
-    
-    # Use NLTK's named entity recognition
-    entities = nltk.chunk.ne_chunk(tagged)
-    
-    # Extract named entities
-    named_entities = []
-    for subtree in entities:
-        if isinstance(subtree, nltk.Tree):
-            entity_type = subtree.label()
-            entity_value = ' '.join([leaf[0] for leaf in subtree.leaves()])
-            named_entities.append((entity_type, entity_value))
-    
-    return named_entities
-
-def generate_context_summary(context_text, max_length=200):
-    # This is a very basic summary generation.
-    # For better results, consider using an AI model or a more sophisticated summarization algorithm.
-    sentences = re.split(r'(?<=[.!?])\s+', context_text)
-    summary = ' '.join(sentences[:3])  # Take first 3 sentences
-    if len(summary) > max_length:
-        summary = summary[:max_length] + '...'
-    return summary
-
 @with_db_connection
 def print_db_info(db):
     logging.info(f"Current database: {db.name}")
@@ -929,6 +1196,13 @@ def print_db_info(db):
     logging.info(f"Current collection: {collection.name}")
     logging.info(f"Document count in collection: {collection.count_documents({})}")
 
+def verify_match(query, query_embedding, match):
+    """
+    Returns the reranker verdict for a search match; `verdict['relevant']` says
+    whether its stored answer can be served for `query`.
+    """
+    return question_reranker.verify(query, query_embedding, match)
+
 def verify_question_similarity(query, candidate):
     prompt = f"""
     On a scale of 1 to 10, how similar are these two questions in terms of their intent and subject matter?
@@ -1101,13 +1375,18 @@ def obfuscate_connection_string(connection_string):
     
     return f"{protocol}:{username}:{obfuscated_password}@{parts[1]}"
 
-@lru_cache(maxsize=1000)
 def get_cached_embedding(text):
     """
-    Generates and caches embeddings for given text.
+    Returns the embedding for given text, served from the in-process cache or the
+    shared `embedding_cache` collection before calling OpenAI.
     
     :param text: The text to generate an embedding for
     :return: The generated embedding
     """
-    embedding, _ = generate_embedding(text)
-    return embedding
\ No newline at end of file
+    return embedding_cache.get_or_create(
+        text,
+        lambda normalized: request_coalescer.do(
+            coalescing_key('embedding', normalized),
+            lambda: generate_embedding(normalized)[0]
+        )
+    )
\ No newline at end of file
@@ -0,0 +1,285 @@
+# vector_index.py
+
+import logging
+import threading
+import time
+
+import numpy as np
+from bson import ObjectId
+
+try:
+    import hnswlib
+except ImportError:  # hnswlib is optional; exact search is used without it
+    hnswlib = None
+
+logger = logging.getLogger(__name__)
+
+DOCUMENT_FIELDS = ('question', 'answer', 'title', 'summary', 'references', 'module')
+
+
+class LocalVectorIndex:
+    """
+    In-process vector index over the `documents` collection.
+
+    Question embeddings are held as a row-normalized float32 matrix, so a query is
+    a single matrix-vector product. Above `hnsw_threshold` rows an HNSW graph is
+    built when hnswlib is installed. A background thread polls for documents with
+    a newer `updated_at` (written in UTC) or a newer ObjectId `_id`, so inserts that
+    do not set `updated_at` are picked up too, and periodically rebuilds from
+    scratch to pick up deletions; callers should fall back to Atlas whenever
+    `is_fresh()` is False.
+
+    Scores follow Atlas' cosine `vectorSearchScore`, i.e. (1 + cosine) / 2, so the
+    existing similarity thresholds keep their meaning.
+    """
+
+    def __init__(self, collection_getter, refresh_seconds=30, max_staleness_seconds=120,
+                 rebuild_seconds=900, hnsw_threshold=20000):
+        self.collection_getter = collection_getter
+        self.refresh_seconds = refresh_seconds
+        self.max_staleness_seconds = max_staleness_seconds
+        self.rebuild_seconds = rebuild_seconds
+        self.hnsw_threshold = hnsw_threshold
+        self._lock = threading.RLock()
+        self._ids = []
+        self._positions = {}
+        self._documents = []
+        self._matrix = None
+        self._hnsw = None
+        self._hnsw_dirty = False
+        self._version = 0
+        self._last_updated_at = None
+        self._last_id = None
+        self._last_refresh = None
+        self._last_rebuild = None
+        self._thread = None
+
+    def load(self):
+        """Rebuilds the index from the whole collection."""
+        collection = self.collection_getter()
+        if collection is None:
+            raise RuntimeError("Documents collection is not available")
+
+        projection = {field: 1 for field in DOCUMENT_FIELDS}
+        projection.update({'question_embedding': 1, 'updated_at': 1})
+
+        ids, documents, vectors = [], [], []
+        last_updated_at = last_id = None
+        for document in collection.find({'question_embedding': {'$exists': True}}, projection):
+            vector = document.pop('question_embedding')
+            updated_at = document.pop('updated_at', None)
+            last_updated_at = latest(last_updated_at, updated_at)
+            last_id = latest(last_id, document['_id'] if isinstance(document['_id'], ObjectId) else None)
+            if not vector:
+                continue
+            ids.append(document['_id'])
+            documents.append(document)
+            vectors.append(vector)
+
+        matrix = normalize_rows(np.asarray(vectors, dtype=np.float32)) if vectors else None
+
+        with self._lock:
+            self._ids = ids
+            self._positions = {doc_id: position for position, doc_id in enumerate(ids)}
+            self._documents = documents
+            self._matrix = matrix
+            self._last_updated_at = last_updated_at
+            self._last_id = last_id
+            self._last_refresh = self._last_rebuild = time.monotonic()
+            self._mark_changed()
+        self._build_hnsw()
+        logger.info(f"Local vector index loaded with {len(ids)} documents")
+
+    def refresh(self):
+        """Applies documents inserted or updated since the last load or refresh."""
+        with self._lock:
+            since = self._last_updated_at
+            last_id = self._last_id
+        if since is None and last_id is None:
+            return self.load()
+
+        collection = self.collection_getter()
+        if collection is None:
+            raise RuntimeError("Documents collection is not available")
+
+        projection = {field: 1 for field in DOCUMENT_FIELDS}
+        projection.update({'question_embedding': 1, 'updated_at': 1})
+        conditions = []
+        if since is not None:
+            conditions.append({'updated_at': {'$gt': since}})
+        if last_id is not None:
+            conditions.append({'_id': {'$gt': last_id}})
+        changed = list(collection.find({'$or': conditions}, projection))
+
+        with self._lock:
+            for document in changed:
+                vector = document.pop('question_embedding', None)
+                self._last_updated_at = latest(self._last_updated_at, document.pop('updated_at', None))
+                if isinstance(document['_id'], ObjectId):
+                    self._last_id = latest(self._last_id, document['_id'])
+                if vector:
+                    self._upsert(document, vector)
+                else:
+                    self.remove(document['_id'])
+            self._last_refresh = time.monotonic()
+            if changed:
+                self._mark_changed()
+        if changed:
+            self._build_hnsw()
+            logger.debug(f"Local vector index applied {len(changed)} changes")
+
+    def remove(self, doc_id):
+        with self._lock:
+            position = self._positions.pop(doc_id, None)
+            if position is None:
+                return
+            self._ids.pop(position)
+            self._documents.pop(position)
+            self._matrix = np.delete(self._matrix, position, axis=0)
+            self._positions = {existing_id: index for index, existing_id in enumerate(self._ids)}
+            self._mark_changed()
+
+    def is_fresh(self):
+        with self._lock:
+            return (self._last_refresh is not None
+                    and time.monotonic() - self._last_refresh <= self.max_staleness_seconds)
+
+    def search(self, query_vector, limit=10, module=None):
+        """
+        Returns up to `limit` documents shaped like the Atlas vector branch results,
+        each with a `vector_score`.
+        """
+        query = np.asarray(query_vector, dtype=np.float32)
+        norm = np.linalg.norm(query)
+        if norm == 0:
+            return []
+        query = query / norm
+
+        with self._lock:
+            if self._matrix is None or not self._ids:
+                return []
+            if self._hnsw is not None and not self._hnsw_dirty:
+                positions, similarities = self._search_hnsw(query, limit, module)
+            else:
+                positions, similarities = self._search_exact(query, limit, module)
+
+            results = []
+            for position, similarity in zip(positions, similarities):
+                document = dict(self._documents[position])
+                document['vector_score'] = float((1 + similarity) / 2)
+                results.append(document)
+            return results
+
+    def snapshot(self):
+        """Returns the current version and a copy of the indexed documents."""
+        with self._lock:
+            return self._version, list(self._documents)
+
+    def documents(self):
+        with self._lock:
+            return list(self._documents)
+
+    def start(self, app):
+        """Loads the index and keeps it fresh from a daemon thread."""
+        if self._thread is not None:
+            return
+
+        def run():
+            while True:
+                try:
+                    with app.app_context():
+                        if self._last_rebuild is None or time.monotonic() - self._last_rebuild >= self.rebuild_seconds:
+                            self.load()
+                        else:
+                            self.refresh()
+                except Exception as e:
+                    logger.error(f"Error refreshing local vector index: {str(e)}")
+                time.sleep(self.refresh_seconds)
+
+        self._thread = threading.Thread(target=run, name='local-vector-index', daemon=True)
+        self._thread.start()
+
+    def _mark_changed(self):
+        self._version += 1
+        self._hnsw_dirty = True
+
+    def _upsert(self, document, vector):
+        row = normalize_rows(np.asarray([vector], dtype=np.float32))
+        position = self._positions.get(document['_id'])
+        if position is not None:
+            self._documents[position] = document
+            self._matrix[position] = row[0]
+            return
+        self._positions[document['_id']] = len(self._ids)
+        self._ids.append(document['_id'])
+        self._documents.append(document)
+        self._matrix = row if self._matrix is None else np.vstack([self._matrix, row])
+
+    def _search_exact(self, query, limit, module):
+        similarities = self._matrix @ query
+        if module:
+            mask = np.fromiter((matches_module(document, module) for document in self._documents),
+                               dtype=bool, count=len(self._documents))
+            similarities = np.where(mask, similarities, -np.inf)
+        limit = min(limit, len(similarities))
+        top = np.argpartition(-similarities, limit - 1)[:limit]
+        top = top[np.argsort(-similarities[top])]
+        top = [position for position in top if np.isfinite(similarities[position])]
+        return top, [similarities[position] for position in top]
+
+    def _search_hnsw(self, query, limit, module):
+        # Over-fetch when filtering by module, then fall back to exact search if too few survive
+        k = min(len(self._ids), limit * 5 if module else limit)
+        labels, distances = self._hnsw.knn_query(query, k=k)
+        positions, similarities = [], []
+        for position, distance in zip(labels[0], distances[0]):
+            if module and not matches_module(self._documents[position], module):
+                continue
+            positions.append(int(position))
+            similarities.append(1 - distance)
+            if len(positions) == limit:
+                break
+        if module and len(positions) < limit:
+            return self._search_exact(query, limit, module)
+        return positions, similarities
+
+    def _build_hnsw(self):
+        with self._lock:
+            if hnswlib is None or self._matrix is None or len(self._ids) < self.hnsw_threshold:
+                self._hnsw = None
+                return
+            matrix = self._matrix.copy()
+            version = self._version
+
+        graph = hnswlib.Index(space='cosine', dim=matrix.shape[1])
+        graph.init_index(max_elements=len(matrix), ef_construction=200, M=16)
+        graph.add_items(matrix, np.arange(len(matrix)))
+        graph.set_ef(100)
+
+        with self._lock:
+            # Only publish the graph if nothing changed while it was being built
+            if self._version == version:
+                self._hnsw = graph
+                self._hnsw_dirty = False
+
+
+def normalize_rows(matrix):
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1
+    return matrix / norms
+
+
+def latest(current, candidate):
+    """The larger of two watermarks, either of which may be None."""
+    if candidate is None:
+        return current
+    if current is None or candidate > current:
+        return candidate
+    return current
+
+
+def matches_module(document, module):
+    value = document.get('module')
+    if isinstance(value, list):
+        return module in value
+    return value == module
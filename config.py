@@ -32,4 +32,58 @@ class Config:
     FLASK_SECRET_KEY=os.environ.get('FLASK_SECRET_KEY')
     OAUTH_CLIENT_ID = os.getenv('OAUTH_CLIENT_ID')
     OAUTH_CLIENT_SECRET = os.getenv('OAUTH_CLIENT_SECRET')
-    OAUTH_REDIRECT_URI = os.getenv('OAUTH_REDIRECT_URI')
\ No newline at end of file
+    OAUTH_REDIRECT_URI = os.getenv('OAUTH_REDIRECT_URI')
+    SEARCH_BRANCH_TIMEOUT_MS = int(os.environ.get('SEARCH_BRANCH_TIMEOUT_MS', '1500'))
+    SEARCH_MAX_WORKERS = int(os.environ.get('SEARCH_MAX_WORKERS', '8'))
+    SEARCH_MODE = os.environ.get('SEARCH_MODE', 'weighted')  # 'weighted' or 'rrf'
+    RRF_K = int(os.environ.get('RRF_K', '60'))
+    # Set to 0 to skip the title/summary/references LLM call when answering chat questions
+    INTERACTIVE_ANSWER_METADATA = os.environ.get('INTERACTIVE_ANSWER_METADATA', '1') == '1'
+    EMBEDDING_CACHE_MAX_BYTES = int(os.environ.get('EMBEDDING_CACHE_MAX_BYTES', str(32 * 1024 * 1024)))
+    EMBEDDING_CACHE_TTL_DAYS = int(os.environ.get('EMBEDDING_CACHE_TTL_DAYS', '30'))
+    EMBEDDING_BATCH_TOKEN_BUDGET = int(os.environ.get('EMBEDDING_BATCH_TOKEN_BUDGET', '50000'))
+    LOCAL_VECTOR_INDEX = os.environ.get('LOCAL_VECTOR_INDEX', '0') == '1'
+    LOCAL_VECTOR_INDEX_REFRESH_SECONDS = int(os.environ.get('LOCAL_VECTOR_INDEX_REFRESH_SECONDS', '30'))
+    LOCAL_VECTOR_INDEX_MAX_STALENESS_SECONDS = int(os.environ.get('LOCAL_VECTOR_INDEX_MAX_STALENESS_SECONDS', '120'))
+    LOCAL_VECTOR_INDEX_REBUILD_SECONDS = int(os.environ.get('LOCAL_VECTOR_INDEX_REBUILD_SECONDS', '900'))
+    LOCAL_VECTOR_INDEX_HNSW_THRESHOLD = int(os.environ.get('LOCAL_VECTOR_INDEX_HNSW_THRESHOLD', '20000'))
+    RETRIEVAL_BACKEND = os.environ.get('RETRIEVAL_BACKEND', 'atlas')  # 'atlas' or 'local'
+    # Reranker bands: calibrated scores between the two thresholds go to the LLM tiebreaker
+    RERANK_ACCEPT_THRESHOLD = float(os.environ.get('RERANK_ACCEPT_THRESHOLD', '0.8'))
+    RERANK_REJECT_THRESHOLD = float(os.environ.get('RERANK_REJECT_THRESHOLD', '0.35'))
+    RERANK_LLM_TIEBREAK = os.environ.get('RERANK_LLM_TIEBREAK', '1') == '1'
+    RERANK_VERDICT_TTL_DAYS = int(os.environ.get('RERANK_VERDICT_TTL_DAYS', '30'))
+    # Lifetime of a verdict in a worker's memory; bounds staleness after another worker invalidates
+    RERANK_MEMORY_TTL_SECONDS = int(os.environ.get('RERANK_MEMORY_TTL_SECONDS', '3600'))
+    EVENT_INTENT_ACCEPT_THRESHOLD = float(os.environ.get('EVENT_INTENT_ACCEPT_THRESHOLD', '0.87'))
+    EVENT_INTENT_REJECT_THRESHOLD = float(os.environ.get('EVENT_INTENT_REJECT_THRESHOLD', '0.82'))
+    # Set to 1 to settle ambiguous event-intent scores with an LLM call
+    EVENT_INTENT_LLM_TIEBREAK = os.environ.get('EVENT_INTENT_LLM_TIEBREAK', '0') == '1'
+    EVENTS_ANSWER_CACHE_TTL_SECONDS = int(os.environ.get('EVENTS_ANSWER_CACHE_TTL_SECONDS', '300'))
+    ANSWER_CACHE_TTL_SECONDS = int(os.environ.get('ANSWER_CACHE_TTL_SECONDS', '600'))
+    ANSWER_CACHE_MAX_ENTRIES = int(os.environ.get('ANSWER_CACHE_MAX_ENTRIES', '5000'))
+    # How often each worker checks the shared generation that admin clears and edits bump
+    ANSWER_CACHE_GENERATION_CHECK_SECONDS = float(os.environ.get('ANSWER_CACHE_GENERATION_CHECK_SECONDS', '1'))
+    # Set to 1 to coalesce identical requests across processes through a Mongo lease document
+    SINGLE_FLIGHT_MONGO_LEASE = os.environ.get('SINGLE_FLIGHT_MONGO_LEASE', '0') == '1'
+    SINGLE_FLIGHT_LEASE_SECONDS = int(os.environ.get('SINGLE_FLIGHT_LEASE_SECONDS', '45'))
+    MONGO_MAX_POOL_SIZE = int(os.environ.get('MONGO_MAX_POOL_SIZE', '100'))
+    MONGO_HEARTBEAT_SECONDS = int(os.environ.get('MONGO_HEARTBEAT_SECONDS', '10'))
+    BACKGROUND_WORKERS = int(os.environ.get('BACKGROUND_WORKERS', '4'))
+    BACKGROUND_MAX_DEPTH = int(os.environ.get('BACKGROUND_MAX_DEPTH', '1000'))
+    MESSAGE_BUCKET_SIZE = int(os.environ.get('MESSAGE_BUCKET_SIZE', '50'))
+    RECENT_MESSAGES = int(os.environ.get('RECENT_MESSAGES', '10'))
+    # Fraction of context updates that run NLTK named-entity extraction
+    NLP_ENTITY_SAMPLE_RATE = float(os.environ.get('NLP_ENTITY_SAMPLE_RATE', '0.25'))
+    # Words kept in a conversation's running topic counts; the least frequent are pruned
+    CONVERSATION_TOPIC_COUNTS_MAX = int(os.environ.get('CONVERSATION_TOPIC_COUNTS_MAX', '200'))
+    # Weight kept by the conversation embedding's running mean for each new message
+    CONVERSATION_EMBEDDING_DECAY = float(os.environ.get('CONVERSATION_EMBEDDING_DECAY', '0.8'))
+    # Embed assistant answers for the conversation embedding; with 0 it follows the questions only
+    CONVERSATION_EMBED_ANSWERS = os.environ.get('CONVERSATION_EMBED_ANSWERS', '1') == '1'
+    USER_CACHE_TTL_SECONDS = int(os.environ.get('USER_CACHE_TTL_SECONDS', '60'))
+    # MaxMind City database (.mmdb) used to locate logins; leave unset to skip locations
+    GEOIP_DATABASE_PATH = os.environ.get('GEOIP_DATABASE_PATH', '')
+    GEOIP_CACHE_SIZE = int(os.environ.get('GEOIP_CACHE_SIZE', '4096'))
+    # How often the dashboard stats rollup is recounted from the source collections (0 disables)
+    STATS_RECONCILE_SECONDS = int(os.environ.get('STATS_RECONCILE_SECONDS', '3600'))
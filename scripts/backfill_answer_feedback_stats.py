@@ -0,0 +1,86 @@
+import os
+import sys
+from dotenv import load_dotenv
+from pymongo import MongoClient, ASCENDING, DESCENDING
+from datetime import datetime
+import logging
+
+# Rebuilds `answer_feedback_stats` (per-question feedback counters) from the
+# `answer_feedback` collection. New feedback keeps it current; run this once
+# after deploying, or whenever the counters need to be recomputed.
+#
+#   python scripts/backfill_answer_feedback_stats.py [--dry-run]
+
+# Set up logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+# Load environment variables
+load_dotenv()
+
+# MongoDB connection details
+MONGODB_URI = os.getenv('MONGODB_URI')
+MONGODB_DB = os.getenv('MONGODB_DB')
+
+def get_db_connection():
+    try:
+        client = MongoClient(MONGODB_URI)
+        db = client[MONGODB_DB]
+        logger.info("Successfully connected to MongoDB")
+        return db
+    except Exception as e:
+        logger.error(f"Failed to connect to MongoDB: {str(e)}")
+        sys.exit(1)
+
+def stats_pipeline():
+    return [
+        {'$group': {
+            '_id': {'$ifNull': ['$matched_question_id', '$original_question']},
+            'total_feedback': {'$sum': 1},
+            # Same rule as FeedbackStats.record: only a literal true is positive
+            'positive_feedback': {'$sum': {'$cond': [{'$eq': ['$is_positive', True]}, 1, 0]}},
+            'original_questions': {'$addToSet': '$original_question'},
+            'is_matched': {'$max': {'$cond': [{'$ifNull': ['$matched_question_id', False]}, True, False]}}
+        }},
+        {'$match': {'_id': {'$ne': None}}},
+        {'$lookup': {'from': 'documents', 'localField': '_id', 'foreignField': '_id', 'as': 'question_data'}},
+        {'$project': {
+            'total_feedback': 1,
+            'positive_feedback': 1,
+            'original_questions': 1,
+            'is_matched': 1,
+            'matched_question': {'$ifNull': [
+                {'$arrayElemAt': ['$question_data.question', 0]},
+                {'$ifNull': [{'$arrayElemAt': ['$original_questions', 0]}, 'Unknown']}
+            ]},
+            'effectiveness': {'$multiply': [{'$divide': ['$positive_feedback', '$total_feedback']}, 100]},
+            'updated_at': {'$literal': datetime.now()}
+        }}
+    ]
+
+def backfill(db, dry_run=False):
+    if dry_run:
+        groups = list(db.answer_feedback.aggregate(stats_pipeline() + [{'$count': 'groups'}]))
+        logger.info(f"Would write {groups[0]['groups'] if groups else 0} answer feedback stats documents")
+        return
+
+    db.answer_feedback_stats.create_index(
+        [('effectiveness', ASCENDING), ('total_feedback', DESCENDING), ('_id', ASCENDING)]
+    )
+    db.answer_feedback_stats.delete_many({})
+    db.answer_feedback.aggregate(stats_pipeline() + [{'$merge': {'into': 'answer_feedback_stats', 'whenMatched': 'replace'}}])
+    logger.info(f"Backfill completed. Documents: {db.answer_feedback_stats.count_documents({})}")
+
+def main():
+    if len(sys.argv) > 1 and sys.argv[1] == '--dry-run':
+        dry_run = True
+        logger.info("Performing a dry run. No changes will be made to the database.")
+    else:
+        dry_run = False
+        logger.info("Performing actual backfill. Changes will be made to the database.")
+
+    db = get_db_connection()
+    backfill(db, dry_run)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+import os
+import sys
+import timeit
+from collections import Counter
+import logging
+
+# Compares conversation-context NLP throughput before and after app/nlp.py.
+#
+#   python scripts/benchmark_nlp.py [--number N]
+#
+# "legacy" is the code update_conversation_context used to run for every stored
+# message: word_tokenize, a stopword set rebuilt per call and ne_chunk on every
+# call. "current" is the regex tokenizer with the cached stopword set, the
+# per-message topic counts folded into the conversation's capped running counts,
+# and entity extraction at NLP_ENTITY_SAMPLE_RATE.
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+import nltk
+from nltk.corpus import stopwords
+from nltk.tokenize import word_tokenize
+
+from app.nlp import EntityExtractor, extract_topics, fold_topic_counts, get_stopwords, top_topics
+
+# Set up logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+nltk.data.path.append('/tmp/nltk_data')
+
+SAMPLE_RATE = float(os.getenv('NLP_ENTITY_SAMPLE_RATE', '0.25'))
+
+MESSAGES = [
+    "How do I create a vector search index on my MongoDB Atlas cluster?",
+    "You can create it from the Atlas UI under Search, or with the createSearchIndexes command.",
+    "Is there a workshop in New York next month about Atlas Search?",
+    "Yes, the Developer Day in New York on the 14th covers Atlas Search and Vector Search.",
+    "What is the difference between $search and $vectorSearch in an aggregation pipeline?",
+    "$search runs a Lucene full-text query, while $vectorSearch runs an approximate nearest neighbour query.",
+]
+
+def legacy_extract_topics(text, top_n=5):
+    stop_words = set(stopwords.words('english'))
+    words = word_tokenize(text.lower())
+    words = [word for word in words if word.isalpha() and word not in stop_words]
+    return [word for word, _ in Counter(words).most_common(top_n)]
+
+def legacy_extract_entities(text):
+    tokens = nltk.word_tokenize(text)
+    tagged = nltk.pos_tag(tokens)
+    entities = nltk.chunk.ne_chunk(tagged)
+    return [(subtree.label(), ' '.join(leaf[0] for leaf in subtree.leaves()))
+            for subtree in entities if isinstance(subtree, nltk.Tree)]
+
+def legacy_turn(index):
+    context_text = " ".join(MESSAGES[max(0, index - 4):index + 1])
+    legacy_extract_topics(context_text)
+    legacy_extract_entities(context_text)
+
+def make_current_turn():
+    extractor = EntityExtractor(sample_rate=SAMPLE_RATE)
+    counts = {}
+
+    def current_turn(index):
+        nonlocal counts
+        counts = fold_topic_counts(counts, [MESSAGES[index]])
+        top_topics(counts)
+        extractor.extract(" ".join(MESSAGES[max(0, index - 4):index + 1]))
+
+    return current_turn, extractor
+
+def run(label, turn, number):
+    turn(0)  # load corpora and models outside the timing
+    elapsed = timeit.timeit(lambda: [turn(index) for index in range(len(MESSAGES))], number=number)
+    messages = number * len(MESSAGES)
+    logger.info(f"{label}: {messages / elapsed:,.0f} messages/s ({1000 * elapsed / messages:.3f} ms/message)")
+    return elapsed
+
+def main():
+    number = int(sys.argv[sys.argv.index('--number') + 1]) if '--number' in sys.argv else 50
+
+    get_stopwords()
+    assert extract_topics(MESSAGES[0]) == legacy_extract_topics(MESSAGES[0]), "topic extraction differs"
+
+    legacy = run("legacy", legacy_turn, number)
+    current_turn, extractor = make_current_turn()
+    current = run(f"current (entity sample rate {SAMPLE_RATE})", current_turn, number)
+    logger.info(f"Speedup: {legacy / current:.1f}x; entity extraction ran {extractor.runs} times, "
+                f"skipped {extractor.skips}")
+
+if __name__ == "__main__":
+    main()
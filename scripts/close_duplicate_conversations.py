@@ -0,0 +1,72 @@
+import os
+import sys
+from dotenv import load_dotenv
+from pymongo import MongoClient
+from datetime import datetime
+import logging
+
+# Leaves each user with at most one active conversation (the most recently
+# updated one) and closes the rest, so the partial unique index on active
+# conversations can be built.
+#
+#   python scripts/close_duplicate_conversations.py [--dry-run]
+
+# Set up logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+# Load environment variables
+load_dotenv()
+
+# MongoDB connection details
+MONGODB_URI = os.getenv('MONGODB_URI')
+MONGODB_DB = os.getenv('MONGODB_DB')
+
+def get_db_connection():
+    try:
+        client = MongoClient(MONGODB_URI)
+        db = client[MONGODB_DB]
+        logger.info("Successfully connected to MongoDB")
+        return db
+    except Exception as e:
+        logger.error(f"Failed to connect to MongoDB: {str(e)}")
+        sys.exit(1)
+
+def close_duplicates(db, dry_run=False):
+    duplicates = db.conversations.aggregate([
+        {'$match': {'status': 'active'}},
+        {'$sort': {'last_updated': -1}},
+        {'$group': {'_id': '$user_id', 'ids': {'$push': '$_id'}, 'count': {'$sum': 1}}},
+        {'$match': {'count': {'$gt': 1}}}
+    ])
+
+    users = 0
+    closed = 0
+    for group in duplicates:
+        users += 1
+        stale = group['ids'][1:]
+        closed += len(stale)
+        if dry_run:
+            logger.info(f"Would close {len(stale)} of {group['count']} active conversations for user {group['_id']}")
+            continue
+        db.conversations.update_many(
+            {'_id': {'$in': stale}},
+            {'$set': {'status': 'closed', 'closed_at': datetime.now()}}
+        )
+        logger.info(f"Closed {len(stale)} of {group['count']} active conversations for user {group['_id']}")
+
+    logger.info(f"Cleanup {'would be ' if dry_run else ''}completed. Users: {users}, conversations closed: {closed}")
+
+def main():
+    if len(sys.argv) > 1 and sys.argv[1] == '--dry-run':
+        dry_run = True
+        logger.info("Performing a dry run. No changes will be made to the database.")
+    else:
+        dry_run = False
+        logger.info("Performing actual cleanup. Changes will be made to the database.")
+
+    db = get_db_connection()
+    close_duplicates(db, dry_run)
+
+if __name__ == "__main__":
+    main()
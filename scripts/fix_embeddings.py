@@ -34,7 +34,7 @@ def re_encode_questions():
                     {"_id": doc["_id"]},
                     {"$set": {
                         "question_embedding": question_embedding,
-                        "updated_at": datetime.now()
+                        "updated_at": datetime.utcnow()
                     }}
                 )
                 print(f"Updated document ID {doc['_id']} with new embedding.")
@@ -75,8 +75,8 @@ def save_to_mongodb(question, answer, title, summary, references):
         'references': references,
         'question_embedding': generate_embedding(question)[0],  # Only take the embedding, not the debug info
         'answer_embedding': generate_embedding(answer)[0],  # Only take the embedding, not the debug info
-        'created_at': datetime.now(),
-        'updated_at': datetime.now(),
+        'created_at': datetime.utcnow(),
+        'updated_at': datetime.utcnow(),
         'schema_version': 2,
         'created_by': 'ai'
     }
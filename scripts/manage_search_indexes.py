@@ -0,0 +1,146 @@
+import os
+import sys
+import json
+from dotenv import load_dotenv
+from pymongo import MongoClient
+import logging
+
+# Creates or updates the Atlas Search and Vector Search indexes the app relies on.
+#
+#   python scripts/manage_search_indexes.py            # create missing / update changed indexes
+#   python scripts/manage_search_indexes.py --dry-run  # show what would change
+#   python scripts/manage_search_indexes.py --list     # print the current definitions
+
+# Set up logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+# Load environment variables
+load_dotenv()
+
+# MongoDB connection details
+MONGODB_URI = os.getenv('MONGODB_URI')
+MONGODB_DB = os.getenv('MONGODB_DB')
+
+COLLECTION = 'documents'
+
+# `module` is a filter field on the vector index and a token field on the text
+# index, so a selected module is applied as a pre-filter in both search branches.
+SEARCH_INDEXES = [
+    {
+        'name': 'question_index',
+        'type': 'vectorSearch',
+        'definition': {
+            'fields': [
+                {
+                    'type': 'vector',
+                    'path': 'question_embedding',
+                    'numDimensions': 1536,
+                    'similarity': 'cosine'
+                },
+                {
+                    'type': 'filter',
+                    'path': 'module'
+                }
+            ]
+        }
+    },
+    {
+        'name': 'default',
+        'type': 'search',
+        'definition': {
+            'mappings': {
+                'dynamic': False,
+                'fields': {
+                    'question': {'type': 'string'},
+                    'answer': {'type': 'string'},
+                    'title': {'type': 'string'},
+                    'module': {'type': 'token'}
+                }
+            }
+        }
+    },
+    {
+        'name': 'autocomplete',
+        'type': 'search',
+        'definition': {
+            'mappings': {
+                'dynamic': False,
+                'fields': {
+                    'question': {
+                        'type': 'autocomplete',
+                        'tokenization': 'edgeGram',
+                        'minGrams': 2,
+                        'maxGrams': 15,
+                        'foldDiacritics': True
+                    }
+                }
+            }
+        }
+    }
+]
+
+def get_db_connection():
+    try:
+        client = MongoClient(MONGODB_URI)
+        db = client[MONGODB_DB]
+        logger.info("Successfully connected to MongoDB")
+        return db
+    except Exception as e:
+        logger.error(f"Failed to connect to MongoDB: {str(e)}")
+        sys.exit(1)
+
+def list_search_indexes(db):
+    return {index['name']: index for index in db[COLLECTION].aggregate([{'$listSearchIndexes': {}}])}
+
+def covers_definition(desired, current):
+    """
+    True when `current` has every setting in `desired`. Atlas reports defaults it
+    filled in (analyzers, storedSource, ...) in latestDefinition, so only the
+    settings managed here are compared.
+    """
+    if isinstance(desired, dict):
+        return isinstance(current, dict) and all(
+            key in current and covers_definition(value, current[key]) for key, value in desired.items()
+        )
+    if isinstance(desired, list):
+        return (isinstance(current, list) and len(desired) == len(current)
+                and all(covers_definition(d, c) for d, c in zip(desired, current)))
+    return desired == current
+
+def apply_search_indexes(db, dry_run=False):
+    existing = list_search_indexes(db)
+
+    for index in SEARCH_INDEXES:
+        current = existing.get(index['name'])
+        if current is None:
+            logger.info(f"{'Would create' if dry_run else 'Creating'} {index['type']} index '{index['name']}'")
+            if not dry_run:
+                db.command({'createSearchIndexes': COLLECTION, 'indexes': [index]})
+        elif not covers_definition(index['definition'], current.get('latestDefinition')):
+            logger.info(f"{'Would update' if dry_run else 'Updating'} index '{index['name']}'")
+            if not dry_run:
+                db.command({
+                    'updateSearchIndex': COLLECTION,
+                    'name': index['name'],
+                    'definition': index['definition']
+                })
+        else:
+            logger.info(f"Index '{index['name']}' is up to date (status: {current.get('status')})")
+
+def main():
+    db = get_db_connection()
+
+    if len(sys.argv) > 1 and sys.argv[1] == '--list':
+        for name, index in list_search_indexes(db).items():
+            print(f"{name} ({index.get('status')}):")
+            print(json.dumps(index.get('latestDefinition'), indent=2))
+        return
+
+    dry_run = len(sys.argv) > 1 and sys.argv[1] == '--dry-run'
+    if dry_run:
+        logger.info("Performing a dry run. No indexes will be changed.")
+    apply_search_indexes(db, dry_run)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,125 @@
+import os
+import sys
+from dotenv import load_dotenv
+from pymongo import MongoClient, ASCENDING
+import logging
+
+# Moves conversation messages from the embedded `messages` array into
+# `conversation_messages` buckets and turns each conversation into a header
+# document (message_count, preview_messages, recent_messages).
+#
+#   python scripts/migrate_conversation_messages.py [--dry-run]
+#
+# Safe to re-run: a conversation's buckets are rebuilt from scratch, and only
+# conversations that still have a `messages` array are touched.
+
+# Set up logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+# Load environment variables
+load_dotenv()
+
+# MongoDB connection details
+MONGODB_URI = os.getenv('MONGODB_URI')
+MONGODB_DB = os.getenv('MONGODB_DB')
+BUCKET_SIZE = int(os.getenv('MESSAGE_BUCKET_SIZE', '50'))
+RECENT_MESSAGES = int(os.getenv('RECENT_MESSAGES', '10'))
+PREVIEW_SIZE = 2
+
+def get_db_connection():
+    try:
+        client = MongoClient(MONGODB_URI)
+        db = client[MONGODB_DB]
+        logger.info("Successfully connected to MongoDB")
+        return db
+    except Exception as e:
+        logger.error(f"Failed to connect to MongoDB: {str(e)}")
+        sys.exit(1)
+
+def build_buckets(conversation_id, messages):
+    buckets = []
+    for start in range(0, len(messages), BUCKET_SIZE):
+        chunk = messages[start:start + BUCKET_SIZE]
+        timestamps = [message['timestamp'] for message in chunk if message.get('timestamp')]
+        buckets.append({
+            'conversation_id': conversation_id,
+            'bucket': start // BUCKET_SIZE,
+            'count': len(chunk),
+            'messages': chunk,
+            'first_timestamp': min(timestamps) if timestamps else None,
+            'last_timestamp': max(timestamps) if timestamps else None
+        })
+    return buckets
+
+def migrate_conversation(db, conversation, dry_run=False):
+    conversation_id = conversation['_id']
+    # Messages appended after the app switched layouts already sit in buckets after
+    # the legacy ones' sequence range, so the legacy messages go first.
+    existing = sorted(
+        (message for bucket in db.conversation_messages.find({'conversation_id': conversation_id})
+         for message in bucket['messages']),
+        key=lambda message: message['seq']
+    )
+    legacy = [message if isinstance(message, dict) else {'role': 'Unknown', 'content': str(message)}
+              for message in conversation.get('messages', [])]
+    messages = [
+        {key: value for key, value in message.items() if key != 'seq'}
+        for message in legacy + existing
+    ]
+    messages = [dict(message, seq=seq) for seq, message in enumerate(messages)]
+
+    if dry_run:
+        logger.info(f"Would migrate conversation {conversation_id}: {len(legacy)} legacy + {len(existing)} bucketed messages")
+        return
+
+    db.conversation_messages.delete_many({'conversation_id': conversation_id})
+    buckets = build_buckets(conversation_id, messages)
+    if buckets:
+        db.conversation_messages.insert_many(buckets)
+
+    db.conversations.update_one(
+        {'_id': conversation_id},
+        {
+            '$set': {
+                'message_count': len(messages),
+                'preview_messages': [dict(message) for message in messages[:PREVIEW_SIZE]],
+                'recent_messages': [dict(message) for message in messages[-RECENT_MESSAGES:]]
+            },
+            '$unset': {'messages': ''},
+            # The conversation embedding already covers the legacy messages
+            '$inc': {'embedding_seq': len(legacy)}
+        }
+    )
+    logger.info(f"Migrated conversation {conversation_id}: {len(messages)} messages in {len(buckets)} buckets")
+
+def migrate_messages(db, dry_run=False):
+    if not dry_run:
+        db.conversation_messages.create_index([('conversation_id', ASCENDING), ('bucket', ASCENDING)], unique=True)
+
+    total = 0
+    failed = 0
+    for conversation in db.conversations.find({'messages': {'$exists': True}}, {'messages': 1}):
+        total += 1
+        try:
+            migrate_conversation(db, conversation, dry_run)
+        except Exception as e:
+            failed += 1
+            logger.error(f"Error migrating conversation {conversation['_id']}: {str(e)}")
+
+    logger.info(f"Migration {'would be ' if dry_run else ''}completed. "
+                f"Conversations: {total}, failed: {failed}")
+
+def main():
+    if len(sys.argv) > 1 and sys.argv[1] == '--dry-run':
+        dry_run = True
+        logger.info("Performing a dry run. No changes will be made to the database.")
+    else:
+        dry_run = False
+        logger.info("Performing actual migration. Changes will be made to the database.")
+
+    db = get_db_connection()
+    migrate_messages(db, dry_run)
+
+if __name__ == "__main__":
+    main()
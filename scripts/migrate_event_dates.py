@@ -0,0 +1,34 @@
+from datetime import datetime
+import pytz
+from pymongo import MongoClient, ASCENDING
+from config import Config
+
+# Converts events whose date_time was stored as an ISO string into BSON dates,
+# so the upcoming-events query and its date_time index can see them.
+
+client = MongoClient(Config.MONGODB_URI)
+db = client[Config.MONGODB_DB]
+events_collection = db['events']
+
+converted = 0
+skipped = 0
+for event in events_collection.find({'date_time': {'$type': 'string'}}, {'date_time': 1}):
+    date_time_str = event['date_time']
+    try:
+        date_time = datetime.fromisoformat(date_time_str.replace('Z', '+00:00'))
+    except ValueError:
+        print(f"Skipping event {event['_id']}: unparseable date_time '{date_time_str}'")
+        skipped += 1
+        continue
+
+    if date_time.tzinfo is None:
+        date_time = pytz.utc.localize(date_time)
+    events_collection.update_one(
+        {'_id': event['_id']},
+        {'$set': {'date_time': date_time.astimezone(pytz.utc)}}
+    )
+    converted += 1
+
+events_collection.create_index([('date_time', ASCENDING)])
+
+print(f"Converted {converted} events, skipped {skipped}")
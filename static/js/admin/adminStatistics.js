@@ -7,19 +7,23 @@ if (statisticsTab) {
 } else {
     console.error('Statistics tab not found');
 }
+const feedbackStatsPerPage = 50;
+
 /**
- * Fetches and displays answer feedback statistics.
+ * Fetches and displays one page of answer feedback statistics.
  * @async
  * @function showAnswerFeedbackStats
+ * @param {number} [page=1] - The page number to fetch
  * @throws {Error} If there's an issue fetching the statistics
  */
-async function showAnswerFeedbackStats() {
+async function showAnswerFeedbackStats(page = 1) {
     try {
-        const response = await fetch('/api/answer_feedback_stats');
+        const response = await fetch(`/api/answer_feedback_stats?page=${page}&per_page=${feedbackStatsPerPage}`);
         if (!response.ok) {
             throw new Error(`HTTP error! status: ${response.status}`);
         }
-        const stats = await response.json();
+        const data = await response.json();
+        const { stats } = data;
 
         const statsTableBody = document.getElementById('answer-feedback-stats-body');
         if (!statsTableBody) {
@@ -50,6 +54,7 @@ async function showAnswerFeedbackStats() {
                     </tr>
                 `).join('');
         }
+        updateAnswerFeedbackStatsPagination(data);
     } catch (error) {
         console.error('Error fetching answer feedback stats:', error);
         const statsTableBody = document.getElementById('answer-feedback-stats-body');
@@ -59,6 +64,47 @@ async function showAnswerFeedbackStats() {
     }
 }
 
+/**
+ * Updates the Previous / Next controls under the answer feedback statistics table.
+ *
+ * @function updateAnswerFeedbackStatsPagination
+ * @param {Object} data - Pagination data including total pages and current page
+ */
+function updateAnswerFeedbackStatsPagination(data) {
+    const paginationElement = document.getElementById('answer-feedback-stats-pagination');
+    if (!paginationElement) {
+        return;
+    }
+    const totalPages = Math.max(data.total_pages, 1);
+    const currentPage = data.page;
+
+    paginationElement.innerHTML = `
+        <nav aria-label="Answer feedback statistics pagination">
+            <ul class="pagination justify-content-center">
+                <li class="page-item ${currentPage <= 1 ? 'disabled' : ''}">
+                    <a class="page-link feedback-stats-page-link" href="#" data-page="${currentPage - 1}">Previous</a>
+                </li>
+                <li class="page-item disabled">
+                    <span class="page-link">Page ${currentPage} of ${totalPages}</span>
+                </li>
+                <li class="page-item ${currentPage >= totalPages ? 'disabled' : ''}">
+                    <a class="page-link feedback-stats-page-link" href="#" data-page="${currentPage + 1}">Next</a>
+                </li>
+            </ul>
+        </nav>
+    `;
+
+    paginationElement.querySelectorAll('.feedback-stats-page-link').forEach(link => {
+        link.addEventListener('click', function(event) {
+            event.preventDefault();
+            const page = parseInt(this.getAttribute('data-page'));
+            if (!isNaN(page) && page >= 1 && page <= totalPages) {
+                showAnswerFeedbackStats(page);
+            }
+        });
+    });
+}
+
 export function getEffectivenessBadgeColor(effectiveness) {
     if (effectiveness >= 80) return 'success';
     if (effectiveness >= 60) return 'info';
@@ -131,6 +177,7 @@ export async function showStatistics() {
                             </tbody>
                         </table>
                     </div>
+                    <div id="answer-feedback-stats-pagination"></div>
                 </div>
             </div>
             <div id="statistics" class="tab-pane fade" role="tabpanel" aria-labelledby="statistics-tab">
@@ -427,48 +427,148 @@ async function sendMessage(event, presetMessage = null) {
             return;
         }
 
-        const response = await fetch('/api/chat', {
-            method: 'POST',
-            headers: { 'Content-Type': 'application/json' },
-            credentials: 'include',
-            body: JSON.stringify({
-                question: message,
-                conversation_id: currentConversationId,
-                module: selectedModule
-            })
-        });
+        await streamChatResponse(message, selectedModule);
 
-        if (!response.ok) {
-            const errorMessage = await response.text();
-            throw new Error(`HTTP error! status: ${response.status}, message: ${errorMessage}`);
-        }
+    } catch (error) {
+        console.error('Error in sendMessage:', error);
+        appendMessage('Assistant', `Error: ${error.message}`);
+    } finally {
+        isSending = false;
+        LoaderManager.hideLoader();
+    }
+}
 
-        const data = await response.json();
+/**
+ * Sends a question to the streaming chat endpoint and renders the answer as it arrives.
+ * Tokens are drawn into a temporary bubble; once the stream ends the bubble is
+ * replaced by a regular assistant message with source info and feedback buttons.
+ * @param {string} message - The user's question
+ * @param {string} selectedModule - The selected workshop module, or an empty string
+ * @returns {Promise<void>}
+ */
+async function streamChatResponse(message, selectedModule) {
+    const response = await fetch('/api/chat/stream', {
+        method: 'POST',
+        headers: { 'Content-Type': 'application/json', 'Accept': 'text/event-stream' },
+        credentials: 'include',
+        body: JSON.stringify({
+            question: message,
+            conversation_id: currentConversationId,
+            module: selectedModule
+        })
+    });
 
-        if (data.conversation_id) {
-            currentConversationId = data.conversation_id;
+    if (!response.ok) {
+        const errorMessage = await response.text();
+        throw new Error(`HTTP error! status: ${response.status}, message: ${errorMessage}`);
+    }
+
+    const reader = response.body.getReader();
+    const decoder = new TextDecoder();
+    let buffer = '';
+    let answer = '';
+    let metadata = {};
+    let streamingContent = null;
+
+    const handleEvent = (eventName, data) => {
+        if (eventName === 'token') {
+            if (!streamingContent) {
+                LoaderManager.hideLoader();
+                streamingContent = createStreamingBubble();
+            }
+            answer += data.text;
+            streamingContent.innerHTML = marked.parse(escapeSpecialChars(answer));
+            chatContainer.scrollTop = chatContainer.scrollHeight;
+        } else if (eventName === 'metadata') {
+            metadata = data;
+        } else if (eventName === 'error') {
+            throw new Error(data.error);
         }
+    };
 
-        if (data.answer) {
-            appendMessage('Assistant', data.answer, {
-                ...data,
-                question_id: data.question_id || '',
-                original_question: message,
-                related_concepts: data.related_concepts || []
-            });
-        } else {
-            appendMessage('Assistant', 'I couldn\'t find an answer to your question.');
+    try {
+        while (true) {
+            const { value, done } = await reader.read();
+            if (done) {
+                break;
+            }
+            buffer += decoder.decode(value, { stream: true });
+
+            let boundary;
+            while ((boundary = buffer.indexOf('\n\n')) !== -1) {
+                const parsed = parseSseEvent(buffer.slice(0, boundary));
+                buffer = buffer.slice(boundary + 2);
+                if (parsed) {
+                    handleEvent(parsed.event, parsed.data);
+                }
+            }
         }
+    } catch (error) {
+        removeStreamingBubble(streamingContent);
+        throw error;
+    }
 
+    if (metadata.conversation_id) {
+        currentConversationId = metadata.conversation_id;
+    }
+
+    if (answer) {
+        await appendMessage('Assistant', answer, {
+            ...metadata,
+            answer: answer,
+            question_id: metadata.question_id || '',
+            original_question: message,
+            related_concepts: metadata.related_concepts || []
+        });
+    } else {
+        await appendMessage('Assistant', 'I couldn\'t find an answer to your question.');
+    }
+    // Swap out the streaming bubble only once the final message is rendered, to avoid a flicker
+    removeStreamingBubble(streamingContent);
+}
+
+/**
+ * Parses one Server-Sent Events block into its event name and JSON payload.
+ * @param {string} rawEvent - The text of a single event, without the trailing blank line
+ * @returns {{event: string, data: Object}|null}
+ */
+function parseSseEvent(rawEvent) {
+    let eventName = 'message';
+    const dataLines = [];
+    rawEvent.split('\n').forEach(line => {
+        if (line.startsWith('event:')) {
+            eventName = line.slice(6).trim();
+        } else if (line.startsWith('data:')) {
+            dataLines.push(line.slice(5).trim());
+        }
+    });
+    if (dataLines.length === 0) {
+        return null;
+    }
+    try {
+        return { event: eventName, data: JSON.parse(dataLines.join('\n')) };
     } catch (error) {
-        console.error('Error in sendMessage:', error);
-        appendMessage('Assistant', `Error: ${error.message}`);
-    } finally {
-        isSending = false;
-        LoaderManager.hideLoader();
+        console.error('Failed to parse stream event:', rawEvent, error);
+        return null;
+    }
+}
+
+function removeStreamingBubble(streamingContent) {
+    if (streamingContent) {
+        streamingContent.closest('.chat-bubble').remove();
     }
 }
 
+function createStreamingBubble() {
+    const messageElement = document.createElement('div');
+    messageElement.classList.add('chat-bubble', 'assistant', 'streaming');
+    const bubbleContent = document.createElement('div');
+    bubbleContent.classList.add('bubble-content');
+    messageElement.appendChild(bubbleContent);
+    chatContainer.appendChild(messageElement);
+    return bubbleContent;
+}
+
     function generateQuestionId(data) {
         // Use a combination of properties to create a unique ID
         return btoa(data.question).slice(0, 10);  // Base64 encode the question and take first 10 characters
@@ -0,0 +1,126 @@
+import pytest
+
+import app.answer_cache as answer_cache_module
+from app.answer_cache import AnswerCache, normalize_module, normalize_question
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self):
+        return self.now
+
+
+class FakeGenerations:
+    """The single counter document AnswerCache keeps in `cache_generations`."""
+
+    def __init__(self):
+        self.document = None
+
+    def find_one(self, query):
+        return self.document
+
+    def find_one_and_update(self, query, update, upsert, return_document):
+        generation = (self.document or {}).get('generation', 0) + update['$inc']['generation']
+        self.document = {'_id': query['_id'], 'generation': generation}
+        return self.document
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(answer_cache_module, 'time', clock)
+    return clock
+
+
+@pytest.mark.parametrize('text, expected', [
+    ("How do I create an index?", "how do i create an index"),
+    ("  how DO i create   an index ", "how do i create an index"),
+    ("What's $vectorSearch?", "what s vectorsearch"),
+    ("", ""),
+])
+def test_normalize_question(text, expected):
+    assert normalize_question(text) == expected
+
+
+def test_normalize_module_treats_the_placeholder_as_no_module():
+    assert normalize_module(' Atlas  Search ') == 'atlas search'
+    assert normalize_module('Select a module') == ''
+    assert normalize_module(None) == ''
+
+
+def test_entries_are_shared_by_equivalent_questions_and_expire_after_the_ttl(clock):
+    cache = AnswerCache(ttl_seconds=60)
+    cache.put("How do I create an index?", 'Indexes', {'answer': 'Use createIndex.', 'source': 'database'})
+
+    assert cache.get("how do i create an index", 'indexes') == {'answer': 'Use createIndex.', 'source': 'database'}
+    assert cache.get("How do I create an index?", 'Search') is None
+
+    clock.now += 60
+    assert cache.get("How do I create an index?", 'Indexes') is None
+    assert cache.stats()['entries'] == 0
+    assert (cache.hits, cache.misses) == (1, 2)
+
+
+def test_cached_values_are_copies_without_per_request_fields(clock):
+    cache = AnswerCache()
+    response = {'answer': 'A', 'references': ['r'], 'conversation_id': 'c1', 'debug_info': {}}
+    cache.put('q', '', response)
+    response['references'].append('changed')
+
+    first = cache.get('q', '')
+    assert first == {'answer': 'A', 'references': ['r']}
+    first['references'].append('changed')
+    assert cache.get('q', '')['references'] == ['r']
+
+
+def test_lru_eviction_keeps_the_most_recently_used_entries(clock):
+    cache = AnswerCache(max_entries=2)
+    cache.put('a', '', {'answer': 'a'})
+    cache.put('b', '', {'answer': 'b'})
+    cache.get('a', '')
+    cache.put('c', '', {'answer': 'c'})
+
+    assert cache.get('b', '') is None
+    assert cache.get('a', '') is not None and cache.get('c', '') is not None
+
+
+def test_invalidate_drops_one_module_or_every_module(clock):
+    cache = AnswerCache()
+    for module in ('indexes', 'search'):
+        cache.put('What is a cursor?', module, {'answer': module})
+    cache.put('Other question', 'search', {'answer': 'other'})
+
+    assert cache.invalidate('what is a cursor', 'Indexes') == 1
+    assert cache.get('What is a cursor?', 'indexes') is None
+    assert cache.get('What is a cursor?', 'search') is not None
+
+    assert cache.invalidate('What is a cursor?') == 1
+    assert cache.get('What is a cursor?', 'search') is None
+    assert cache.get('Other question', 'search') is not None
+
+
+def test_clear_in_one_worker_empties_the_others_through_the_shared_generation(clock):
+    generations = FakeGenerations()
+    worker_a = AnswerCache(generations_getter=lambda: generations, generation_check_seconds=1)
+    worker_b = AnswerCache(generations_getter=lambda: generations, generation_check_seconds=1)
+    worker_b.get('q', '')
+    worker_b.put('q', '', {'answer': 'stale'})
+
+    worker_a.clear()
+    # Worker b only re-reads the counter once generation_check_seconds have passed
+    assert worker_b.get('q', '') == {'answer': 'stale'}
+    clock.now += 1
+    assert worker_b.get('q', '') is None
+    assert worker_b.stats()['generation'] == 1
+
+
+def test_an_unreadable_generation_leaves_entries_to_the_ttl(clock):
+    def broken():
+        raise RuntimeError('no database')
+
+    cache = AnswerCache(ttl_seconds=60, generations_getter=broken, generation_check_seconds=0)
+    cache.put('q', '', {'answer': 'a'})
+    assert cache.get('q', '') == {'answer': 'a'}
+    assert cache.clear() == 1
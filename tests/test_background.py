@@ -0,0 +1,94 @@
+import contextlib
+import threading
+
+from app.background import BackgroundPipeline
+
+
+class FakeApp:
+    def app_context(self):
+        return contextlib.nullcontext()
+
+
+def drain(pipeline, expected):
+    for _ in range(500):
+        stats = pipeline.stats()
+        if stats['completed'] + stats['failed'] >= expected and stats['depth'] == 0:
+            return stats
+        threading.Event().wait(0.01)
+    raise AssertionError(f'pipeline did not finish: {pipeline.stats()}')
+
+
+def test_tasks_run_inline_before_start():
+    pipeline = BackgroundPipeline(workers=2)
+    ran = []
+    assert pipeline.submit(ran.append, 'x', key='c1', coalesce=True)
+    assert ran == ['x']
+    assert pipeline.stats()['completed'] == 1
+
+
+def test_coalesced_tasks_collapse_while_one_is_waiting():
+    pipeline = BackgroundPipeline(workers=1, max_depth=10)
+    pipeline.start(FakeApp())
+    release = threading.Event()
+    ran = []
+
+    def block():
+        release.wait(5)
+
+    def refresh(conversation_id):
+        ran.append(conversation_id)
+
+    pipeline.submit(block, key='c1')
+    for _ in range(5):
+        assert pipeline.submit(refresh, 'c1', key='c1', coalesce=True)
+    pipeline.submit(refresh, 'c2', key='c2', coalesce=True)
+    release.set()
+    stats = drain(pipeline, 3)
+
+    assert sorted(ran) == ['c1', 'c2']
+    assert stats['coalesced'] == 4
+    assert stats['submitted'] == 3
+
+
+def test_a_task_submitted_after_the_queued_one_started_runs_again():
+    pipeline = BackgroundPipeline(workers=1)
+    pipeline.start(FakeApp())
+    running, release = threading.Event(), threading.Event()
+    ran = []
+
+    def refresh(conversation_id):
+        ran.append(conversation_id)
+        running.set()
+        release.wait(5)
+
+    pipeline.submit(refresh, 'c1', key='c1', coalesce=True)
+    running.wait(5)
+    pipeline.submit(refresh, 'c1', key='c1', coalesce=True)
+    release.set()
+    drain(pipeline, 2)
+
+    assert ran == ['c1', 'c1']
+
+
+def test_a_full_shard_rejects_the_task_and_failures_are_counted():
+    pipeline = BackgroundPipeline(workers=1, max_depth=1)
+    pipeline.start(FakeApp())
+    release = threading.Event()
+
+    def block():
+        release.wait(5)
+
+    def fail():
+        raise RuntimeError('boom')
+
+    pipeline.submit(block, key='c1')
+    for _ in range(200):
+        if pipeline.stats()['depth'] == 0:
+            break
+        threading.Event().wait(0.01)
+    assert pipeline.submit(fail, key='c1')
+    assert not pipeline.submit(fail, key='c1', coalesce=True)
+    release.set()
+    stats = drain(pipeline, 2)
+
+    assert (stats['dropped'], stats['failed'], stats['completed']) == (1, 1, 1)
@@ -0,0 +1,91 @@
+import pytest
+from bson import Binary
+
+from app.conversation_vector import ConversationVector, decode_vector, encode_vector
+
+EMBEDDINGS = {'q1': [1.0, 0.0], 'a1': [0.0, 1.0], 'q2': [1.0, 1.0]}
+
+
+def messages(*contents):
+    return [{'role': 'User', 'content': content} for content in contents]
+
+
+def test_vectors_round_trip_as_packed_float32():
+    packed = encode_vector([0.5, -1.25, 3.0])
+    assert isinstance(packed, Binary) and len(packed) == 12
+    assert list(decode_vector(packed)) == [0.5, -1.25, 3.0]
+
+
+def test_decode_accepts_legacy_lists_and_embedding_debug_pairs():
+    assert list(decode_vector([0.5, 1.0])) == [0.5, 1.0]
+    assert list(decode_vector([[0.5, 1.0], {'model': 'ada'}])) == [0.5, 1.0]
+    assert decode_vector(None) is None
+    assert decode_vector([]) is None
+
+
+def test_fold_is_a_decayed_running_mean():
+    vector = ConversationVector(EMBEDDINGS.get, decay=0.5)
+    mean, weight = vector.fold(None, 0.0, [1.0, 0.0])
+    assert (list(mean), weight) == ([1.0, 0.0], 1.0)
+
+    mean, weight = vector.fold(mean, weight, [0.0, 1.0])
+    # carried weight 0.5, new weight 1.5: (0.5 * [1, 0] + [0, 1]) / 1.5
+    assert weight == pytest.approx(1.5)
+    assert list(mean) == pytest.approx([1 / 3, 2 / 3])
+
+
+def test_fold_restarts_on_a_dimension_change():
+    vector = ConversationVector(EMBEDDINGS.get)
+    mean, weight = vector.fold(decode_vector([1.0, 2.0, 3.0]), 4.0, [0.0, 1.0])
+    assert (list(mean), weight) == ([0.0, 1.0], 1.0)
+
+
+def test_update_folds_only_messages_after_embedding_seq():
+    vector = ConversationVector(EMBEDDINGS.get, decay=0.5)
+    first = vector.update({}, messages('q1', 'a1'), total=2)
+    assert first['embedding_seq'] == 2
+    assert first['embedding_weight'] == pytest.approx(1.5)
+
+    # The window is messages 2 and 3 of 3, and message 2 was already folded
+    header = dict(first)
+    second = vector.update(header, messages('a1', 'q2'), total=3)
+    expected_weight = 0.5 * 1.5 + 1
+    assert second['embedding_seq'] == 3
+    assert second['embedding_weight'] == pytest.approx(expected_weight)
+    assert vector.folded == 3
+
+    assert vector.update(dict(second), messages('a1', 'q2'), total=3) is None
+
+
+def test_update_folds_the_whole_window_when_the_header_fell_behind_it():
+    vector = ConversationVector(EMBEDDINGS.get, decay=0.5)
+    fields = vector.update({'embedding_seq': 1}, messages('q1', 'a1'), total=10)
+    assert fields['embedding_seq'] == 10
+    assert vector.folded == 2
+
+
+def test_misses_and_blank_messages_are_skipped_but_still_counted_as_seen():
+    vector = ConversationVector(EMBEDDINGS.get)
+    fields = vector.update({}, messages('unknown', '  '), total=2)
+    assert fields == {'embedding_seq': 2}
+    assert vector.missed == 2
+
+
+def test_embed_many_embeds_unseen_messages_in_one_batch_and_falls_back_on_failure():
+    batches = []
+
+    def embed_many(texts):
+        batches.append(texts)
+        return [[1.0, 0.0] for _ in texts]
+
+    vector = ConversationVector(lambda text: None, embed_many=embed_many)
+    vector.update({}, messages('q', 'answer', 'q', ' '), total=4)
+    assert batches == [['q', 'answer']]
+    assert (vector.folded, vector.missed) == (3, 1)
+
+    def broken(texts):
+        raise RuntimeError('rate limited')
+
+    fallback = ConversationVector(EMBEDDINGS.get, embed_many=broken)
+    assert fallback.update({}, messages('q1', 'unknown'), total=2)['embedding_seq'] == 2
+    assert (fallback.folded, fallback.missed) == (1, 1)
@@ -0,0 +1,118 @@
+from app.embedding_cache import ENTRY_OVERHEAD_BYTES, EmbeddingCache, as_float32, normalize_text
+
+DIMENSIONS = 4
+ENTRY_BYTES = 4 * DIMENSIONS + ENTRY_OVERHEAD_BYTES
+
+
+class FakeCollection:
+    """Persistent tier keyed by cache key, recording what each call asked for."""
+
+    def __init__(self, documents=None):
+        self.documents = dict(documents or {})
+        self.batch_reads = []
+
+    def find_one(self, query, projection=None):
+        return self.documents.get(query['_id'])
+
+    def find(self, query, projection=None):
+        keys = query['_id']['$in']
+        self.batch_reads.append(keys)
+        return [self.documents[key] for key in keys if key in self.documents]
+
+    def update_one(self, query, update, upsert=False):
+        self.documents[query['_id']] = dict(update['$set'], _id=query['_id'])
+
+    def bulk_write(self, operations, ordered=True):
+        for operation in operations:
+            self.update_one(operation._filter, operation._doc)
+
+
+def vector(seed):
+    return [seed + 0.1 * index for index in range(DIMENSIONS)]
+
+
+def test_normalize_text_collapses_whitespace_and_unicode_forms():
+    assert normalize_text('  café\n latte ') == 'café latte'
+
+
+def test_memory_tier_evicts_least_recently_used_entries_by_bytes():
+    cache = EmbeddingCache(lambda: None, max_bytes=2 * ENTRY_BYTES)
+    for text in ('a', 'b'):
+        cache.get_or_create(text, lambda normalized: vector(1))
+    cache.get_or_create('a', lambda normalized: None)
+    cache.get_or_create('c', lambda normalized: vector(3))
+
+    stats = cache.stats()
+    assert (stats['memory_entries'], stats['memory_bytes']) == (2, 2 * ENTRY_BYTES)
+    assert cache.lookup('b') is None
+    assert cache.lookup('a') is not None and cache.lookup('c') is not None
+
+
+def test_entries_larger_than_the_budget_are_not_kept_in_memory():
+    cache = EmbeddingCache(lambda: None, max_bytes=ENTRY_BYTES - 1)
+    assert cache.get_or_create('a', lambda normalized: vector(1)) == as_float32(vector(1))
+    assert cache.stats()['memory_entries'] == 0
+
+
+def test_hits_and_misses_are_counted_per_tier():
+    collection = FakeCollection()
+    cache = EmbeddingCache(lambda: collection)
+    calls = []
+
+    def embed(normalized):
+        calls.append(normalized)
+        return vector(1)
+
+    cache.get_or_create(' How  are indexes stored? ', embed)
+    cache.get_or_create('How are indexes stored?', embed)
+    cache.clear()
+    cache.get_or_create('How are indexes stored?', embed)
+    assert cache.lookup('never embedded') is None
+
+    assert calls == ['How are indexes stored?']
+    stats = cache.stats()
+    assert (stats['misses'], stats['memory_hits'], stats['persistent_hits']) == (2, 1, 1)
+    assert stats['hit_rate'] == 0.5
+
+
+def test_both_tiers_return_the_same_float32_values():
+    collection = FakeCollection()
+    cache = EmbeddingCache(lambda: collection)
+    generated = cache.get_or_create('q', lambda normalized: [0.1, 0.2, 0.3])
+    from_memory = cache.get_or_create('q', lambda normalized: None)
+    cache.clear()
+    from_mongo = cache.get_or_create('q', lambda normalized: None)
+
+    assert generated == from_memory == from_mongo == as_float32([0.1, 0.2, 0.3])
+    assert generated != [0.1, 0.2, 0.3]
+
+
+def test_get_or_create_many_reads_mongo_once_and_embeds_each_miss_once():
+    collection = FakeCollection()
+    cache = EmbeddingCache(lambda: collection)
+    cache.get_or_create('in memory', lambda normalized: vector(1))
+    key = cache.cache_key('in mongo')
+    collection.documents[key] = {'_id': key, 'embedding': vector(2)}
+    batches = []
+
+    def embed_many(texts):
+        batches.append(texts)
+        return [vector(3) for _ in texts]
+
+    results = cache.get_or_create_many(['in memory', 'in mongo', 'new', ' new '], embed_many)
+
+    assert results == [as_float32(vector(1)), as_float32(vector(2)), as_float32(vector(3)), as_float32(vector(3))]
+    assert batches == [['new']]
+    assert len(collection.batch_reads) == 1
+    stats = cache.stats()
+    # One miss from filling the memory tier, one for 'new' however often it repeats
+    assert (stats['memory_hits'], stats['persistent_hits'], stats['misses']) == (1, 1, 2)
+
+
+def test_persistent_failures_never_block_embedding():
+    def broken():
+        raise RuntimeError('no database')
+
+    cache = EmbeddingCache(broken)
+    assert cache.get_or_create('q', lambda normalized: vector(1)) == as_float32(vector(1))
+    assert cache.get_or_create_many(['r'], lambda texts: [vector(2)]) == [as_float32(vector(2))]
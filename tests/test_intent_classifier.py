@@ -0,0 +1,74 @@
+import math
+
+import pytest
+
+from app.intent_classifier import KEYWORD_BOOST, EventIntentClassifier
+
+# Every exemplar embeds to the same unit vector, so a question's exemplar score
+# is exactly the cosine given below.
+QUESTION_COSINES = {
+    "When is the next MongoDB Developer Day in Austin?": 0.95,
+    "How do I create a compound index?": 0.70,
+    "Is there a Developer Day event near me?": 0.83,
+    "What is on the schedule for the aggregation lab?": 0.83,
+    "Which workshop covers Atlas Search?": 0.83,
+    "Can I schedule an Atlas backup?": 0.78,
+}
+
+
+def embed(question):
+    score = QUESTION_COSINES[question]
+    return [score, math.sqrt(1 - score * score)]
+
+
+def make_classifier(llm_judge=None):
+    return EventIntentClassifier(embed, lambda texts: [[1.0, 0.0]] * len(texts), llm_judge=llm_judge)
+
+
+def test_confident_scores_skip_the_keywords():
+    classifier = make_classifier()
+    assert classifier.classify("When is the next MongoDB Developer Day in Austin?")['source'] == 'exemplars'
+    assert classifier.is_event_related("When is the next MongoDB Developer Day in Austin?")
+    assert not classifier.is_event_related("How do I create a compound index?")
+
+
+@pytest.mark.parametrize('question, expected', [
+    ("Is there a Developer Day event near me?", True),
+    ("What is on the schedule for the aggregation lab?", False),
+    ("Which workshop covers Atlas Search?", False),
+])
+def test_ambiguous_band_uses_only_unambiguous_keywords(question, expected):
+    verdict = make_classifier().classify(question)
+    assert verdict['source'] == 'keywords'
+    assert verdict['event'] is expected
+
+
+def test_weak_keyword_on_a_technical_question_stays_rejected():
+    classifier = make_classifier()
+    verdict = classifier.classify("Can I schedule an Atlas backup?")
+    assert verdict['score'] == pytest.approx(0.78 + KEYWORD_BOOST)
+    assert verdict == {'event': False, 'score': verdict['score'], 'source': 'exemplars'}
+
+
+def test_ambiguous_band_defers_to_the_llm_and_caches_its_verdict():
+    calls = []
+
+    def judge(question):
+        calls.append(question)
+        return True
+
+    classifier = make_classifier(llm_judge=judge)
+    question = "Which workshop covers Atlas Search?"
+    assert classifier.classify(question)['event'] is None
+    assert classifier.is_event_related(question)
+    assert classifier.classify(question)['source'] == 'cache'
+    assert calls == [question]
+
+
+def test_failed_tiebreak_falls_back_to_unambiguous_keywords():
+    def judge(question):
+        raise RuntimeError('timeout')
+
+    classifier = make_classifier(llm_judge=judge)
+    assert not classifier.is_event_related("What is on the schedule for the aggregation lab?")
+    assert classifier.is_event_related("Is there a Developer Day event near me?")
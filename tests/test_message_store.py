@@ -0,0 +1,98 @@
+from datetime import datetime, timedelta
+
+import pytest
+from pymongo import UpdateOne
+
+from app.message_store import MessageStore, message_count, preview_messages, recent_messages
+
+START = datetime(2024, 1, 1)
+
+
+class FakeConversations:
+    def __init__(self, message_count):
+        self.header = {'_id': 'c1', 'message_count': message_count}
+        self.updates = []
+
+    def find_one_and_update(self, query, update, projection, return_document):
+        if query['_id'] != self.header['_id']:
+            return None
+        self.updates.append(update)
+        self.header['message_count'] += update['$inc']['message_count']
+        return {'message_count': self.header['message_count']}
+
+
+class FakeBuckets:
+    def __init__(self):
+        self.operations = []
+
+    def bulk_write(self, operations, ordered=True):
+        self.operations.extend(operations)
+
+
+def make_messages(count):
+    return [{'role': 'User', 'content': f'm{index}', 'timestamp': START + timedelta(seconds=index)}
+            for index in range(count)]
+
+
+@pytest.fixture
+def store():
+    conversations, buckets = FakeConversations(message_count=2), FakeBuckets()
+    return MessageStore(lambda: conversations, lambda: buckets, bucket_size=3, recent_size=4), conversations, buckets
+
+
+def test_append_numbers_messages_after_the_header_count_and_splits_buckets(store):
+    message_store, conversations, buckets = store
+    messages = make_messages(3)
+
+    assert message_store.append('c1', messages, header_inc={'context.last_n_messages': 3}) == 5
+
+    # Sequence numbers 2, 3 and 4 fall in buckets 0 and 1 of size 3
+    assert buckets.operations == [
+        UpdateOne({'conversation_id': 'c1', 'bucket': 0}, {
+            '$push': {'messages': {'$each': [dict(messages[0], seq=2)]}},
+            '$inc': {'count': 1},
+            '$min': {'first_timestamp': messages[0]['timestamp']},
+            '$max': {'last_timestamp': messages[0]['timestamp']}
+        }, upsert=True),
+        UpdateOne({'conversation_id': 'c1', 'bucket': 1}, {
+            '$push': {'messages': {'$each': [dict(messages[1], seq=3), dict(messages[2], seq=4)]}},
+            '$inc': {'count': 2},
+            '$min': {'first_timestamp': messages[1]['timestamp']},
+            '$max': {'last_timestamp': messages[2]['timestamp']}
+        }, upsert=True),
+    ]
+
+
+def test_append_updates_the_header_in_the_same_write(store):
+    message_store, conversations, buckets = store
+    messages = make_messages(2)
+    message_store.append('c1', messages, header_set={'user_name': 'Ada'}, header_inc={'context.last_n_messages': 2})
+
+    update = conversations.updates[0]
+    assert update['$inc'] == {'context.last_n_messages': 2, 'message_count': 2}
+    assert update['$set'] == {'user_name': 'Ada'}
+    assert update['$push']['recent_messages'] == {'$each': messages, '$slice': -4}
+    assert update['$push']['preview_messages'] == {'$each': messages, '$slice': 2}
+
+
+def test_append_to_a_missing_conversation_writes_no_buckets(store):
+    message_store, conversations, buckets = store
+    assert message_store.append('missing', make_messages(1)) is None
+    assert buckets.operations == []
+
+
+def test_header_helpers_read_the_legacy_array_ahead_of_new_messages():
+    legacy = [{'content': 'old1'}, {'content': 'old2'}, {'content': 'old3'}]
+    header = {
+        'messages': legacy,
+        'message_count': 2,
+        'preview_messages': [{'content': 'new1'}, {'content': 'new2'}],
+        'recent_messages': [{'content': 'new1'}, {'content': 'new2'}],
+    }
+    assert [m['content'] for m in recent_messages(header, 3)] == ['old3', 'new1', 'new2']
+    assert [m['content'] for m in preview_messages(header)] == ['old1', 'old2']
+    assert message_count(header) == 5
+
+    bucketed = {'message_count': 1, 'preview_messages': [{'content': 'new1'}], 'recent_messages': [{'content': 'new1'}]}
+    assert [m['content'] for m in preview_messages(bucketed)] == ['new1']
+    assert message_count(bucketed) == 1
@@ -0,0 +1,40 @@
+import pytest
+from flask import Flask
+
+import app.question_generator as question_generator
+
+
+@pytest.fixture
+def saved(monkeypatch):
+    """Replaces the embedding, search and insert calls; returns the inserted questions."""
+    saved = []
+    existing = {'What is Atlas?'}
+
+    def search_similar_questions(question_embedding, user_question, module, similarity_threshold=0.91):
+        assert module is None
+        return [{'question': user_question}] if user_question in existing else []
+
+    def add_question_answer(question, answer, title, summary, references):
+        saved.append((question, answer, title))
+        return str(len(saved))
+
+    monkeypatch.setattr(question_generator, 'generate_embeddings', lambda texts: [[0.1, 0.2]] * len(texts))
+    monkeypatch.setattr(question_generator, 'get_cached_embedding', lambda text: [0.1, 0.2])
+    monkeypatch.setattr(question_generator, 'search_similar_questions', search_similar_questions)
+    monkeypatch.setattr(question_generator, 'generate_answer_metadata',
+                        lambda answer: {'title': 'Title', 'summary': 'Summary', 'references': ''})
+    monkeypatch.setattr(question_generator, 'add_question_answer', add_question_answer)
+    with Flask(__name__).app_context():
+        yield saved
+
+
+def test_save_qa_pairs_inserts_new_questions_and_skips_similar_ones(saved):
+    qa_pairs = [('What is Atlas?', 'A cloud database.'), ('How do I create an index?', 'Use createIndex.')]
+
+    assert question_generator.save_qa_pairs(qa_pairs, 0.9) == 1
+    assert saved == [('How do I create an index?', 'Use createIndex.', 'Title')]
+
+
+def test_save_qa_pairs_without_pairs_saves_nothing(saved):
+    assert question_generator.save_qa_pairs([], 0.9) == 0
+    assert saved == []
@@ -0,0 +1,140 @@
+import math
+
+import pytest
+from pymongo.errors import OperationFailure
+
+from app.retrieval import (AtlasRetrievalBackend, BM25Index, fuse_reciprocal_rank, passes_similarity_threshold,
+                           tokenize)
+
+RRF_K = 60
+
+
+def test_tokenize_lowercases_and_drops_punctuation():
+    assert tokenize("How do I use $vectorSearch, v2?") == ['how', 'do', 'i', 'use', 'vectorsearch', 'v2']
+    assert tokenize(None) == []
+
+
+def test_fused_rows_rank_documents_found_by_both_branches_first():
+    vector = [{'_id': 'a', 'question': 'A', 'vector_score': 0.95},
+              {'_id': 'b', 'question': 'B', 'vector_score': 0.93}]
+    text = [{'_id': 'b', 'question': 'B', 'text_score': 7.0},
+            {'_id': 'c', 'question': 'C', 'text_score': 3.0}]
+
+    fused = fuse_reciprocal_rank(vector, text, RRF_K)
+
+    assert [row['_id'] for row in fused] == ['b', 'a', 'c']
+    b = fused[0]
+    assert b['rrf_score'] == pytest.approx(1 / (RRF_K + 2) + 1 / (RRF_K + 1))
+    assert (b['vector_score'], b['text_score']) == (0.93, 7.0)
+    assert fused[2]['vector_score'] is None
+
+
+def test_combined_score_is_one_for_a_top_hit_in_both_branches_and_at_most_half_for_one():
+    fused = fuse_reciprocal_rank([{'_id': 'a', 'vector_score': 0.9}], [{'_id': 'a', 'text_score': 1.0}], RRF_K)
+    assert fused[0]['combined_score'] == pytest.approx(1.0)
+
+    fused = fuse_reciprocal_rank([{'_id': 'a', 'vector_score': 0.9}], [], RRF_K)
+    assert fused[0]['combined_score'] == pytest.approx(0.5)
+
+
+def test_similarity_threshold_is_applied_to_the_raw_vector_score():
+    assert passes_similarity_threshold({'vector_score': 0.91, 'combined_score': 0.2}, 0.91)
+    assert not passes_similarity_threshold({'vector_score': 0.9, 'combined_score': 1.0}, 0.91)
+    assert not passes_similarity_threshold({'vector_score': None, 'combined_score': 1.0}, 0.0)
+
+
+DOCUMENTS = [
+    {'_id': 1, 'question': 'How do I create an index?', 'answer': 'Use createIndex.', 'module': 'indexes'},
+    {'_id': 2, 'question': 'What is sharding?', 'answer': 'Sharding splits data across shards. '
+                                                          'An index on the shard key is required.',
+     'module': 'scaling'},
+    {'_id': 3, 'question': 'How do I create a user?', 'answer': 'Use createUser.', 'title': 'Users',
+     'module': ['security', 'indexes']},
+]
+
+
+@pytest.fixture
+def bm25():
+    index = BM25Index()
+    index.build(DOCUMENTS)
+    return index
+
+
+def test_bm25_scores_a_term_higher_in_a_shorter_field(bm25):
+    results = bm25.search('index', fuzzy=False)
+    assert [result['_id'] for result in results] == [1, 2]
+    assert results[0]['text_score'] > results[1]['text_score'] > 0
+
+
+def test_bm25_rare_terms_outweigh_common_ones(bm25):
+    # 'create' is in two documents, 'sharding' in one
+    results = bm25.search('create sharding', fuzzy=False)
+    assert results[0]['_id'] == 2
+
+
+def test_bm25_idf_and_length_normalisation_match_okapi(bm25):
+    score = bm25.search('sharding', fuzzy=False)[0]['text_score']
+    # 'sharding' appears once in document 2's question and once in its answer, and nowhere else
+    idf = math.log(1 + (3 - 1 + 0.5) / (1 + 0.5))
+
+    def field_score(field):
+        length = bm25.field_lengths[field][1]
+        norm = bm25.k1 * (1 - bm25.b + bm25.b * length / bm25.average_lengths[field])
+        return idf * (bm25.k1 + 1) / (1 + norm)
+
+    assert bm25.field_lengths['question'][1] == 3
+    expected = field_score('question') + field_score('answer')
+    assert score == pytest.approx(expected)
+
+
+def test_bm25_filters_by_module_including_module_lists(bm25):
+    assert [result['_id'] for result in bm25.search('create', module='indexes', fuzzy=False)] == [1, 3]
+    assert bm25.search('create', module='scaling', fuzzy=False) == []
+
+
+def test_bm25_fuzzy_matching_expands_unknown_terms_only(bm25):
+    assert bm25.search('shardin', fuzzy=False) == []
+    assert [result['_id'] for result in bm25.search('shardin')] == [2]
+
+
+def test_bm25_limit_and_empty_queries(bm25):
+    assert len(bm25.search('create', limit=1, fuzzy=False)) == 1
+    assert bm25.search('', fuzzy=False) == []
+    assert BM25Index().search('index') == []
+
+
+class SearchCollection:
+    """Fails every pipeline that pre-filters on the module with `error`."""
+
+    name = 'questions'
+
+    def __init__(self, error):
+        self.error = error
+        self.pipelines = []
+
+    def aggregate(self, pipeline, maxTimeMS=None):
+        self.pipelines.append(pipeline)
+        if 'filter' in pipeline[0]['$vectorSearch']:
+            raise self.error
+        return [{'_id': 'a', 'question': 'A', 'vector_score': 0.9}]
+
+
+def test_unindexed_module_filter_falls_back_to_matching_after_the_search():
+    collection = SearchCollection(OperationFailure("Path 'module' needs to be indexed as token", code=8))
+    backend = AtlasRetrievalBackend()
+
+    assert backend.vector_search(collection, [0.1], module='Cloud') == [{'_id': 'a', 'question': 'A', 'vector_score': 0.9}]
+    assert collection.pipelines[1][1] == {'$match': {'module': 'Cloud'}}
+
+    backend.vector_search(collection, [0.1], module='Cloud')
+    assert len(collection.pipelines) == 3
+
+
+def test_other_search_failures_are_raised():
+    collection = SearchCollection(OperationFailure('$vectorSearch is not allowed in this atlas tier', code=8))
+    backend = AtlasRetrievalBackend()
+
+    with pytest.raises(OperationFailure):
+        backend.vector_search(collection, [0.1], module='Cloud')
+    assert len(collection.pipelines) == 1
+    assert backend._prefilter_failed_at is None
@@ -0,0 +1,42 @@
+import pytest
+from flask import Flask
+
+import app.routes as routes
+from app import utils
+from app.answer_cache import AnswerCache
+
+
+@pytest.fixture
+def client(monkeypatch):
+    app = Flask(__name__)
+    app.config.update(TESTING=True, LOGIN_DISABLED=True)
+    app.register_blueprint(routes.main)
+    monkeypatch.setattr(utils, 'answer_cache', AnswerCache(ttl_seconds=60, max_entries=10))
+    return app.test_client()
+
+
+def test_adding_a_question_clears_the_answer_cache(client, monkeypatch):
+    added = []
+
+    def add_question_answer(question, answer, title, summary, references):
+        added.append(question)
+        return '6500000000000000000000aa'
+
+    monkeypatch.setattr(routes, 'add_question_answer', add_question_answer)
+    utils.answer_cache.put('What is Atlas?', None, {'answer': 'An old answer'})
+
+    response = client.post('/api/questions', json={'question': 'What is Atlas?', 'answer': 'A new answer'})
+
+    assert response.status_code == 201
+    assert response.get_json()['question_id'] == '6500000000000000000000aa'
+    assert added == ['What is Atlas?']
+    assert utils.answer_cache.get('What is Atlas?', None) is None
+
+
+def test_adding_a_question_without_an_answer_is_rejected(client):
+    utils.answer_cache.put('What is Atlas?', None, {'answer': 'An old answer'})
+
+    response = client.post('/api/questions', json={'question': 'What is Atlas?'})
+
+    assert response.status_code == 400
+    assert utils.answer_cache.get('What is Atlas?', None) == {'answer': 'An old answer'}
@@ -0,0 +1,87 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from app import utils
+
+BRANCH_TIMEOUT = 0.2
+
+
+class FakeBackend:
+    """Retrieval backend whose branches return, fail or stall as configured."""
+
+    def __init__(self):
+        self.release = threading.Event()
+        self.vector = [{'question': 'What is Atlas?', 'vector_score': 0.95}]
+        self.text = [{'question': 'What is a shard?', 'text_score': 3.0}]
+        self.vector_delay = self.text_delay = 0
+
+    def vector_search(self, collection, query_vector, limit=10, module=None, max_time_ms=None):
+        return self.branch(self.vector, self.vector_delay)
+
+    def text_search(self, collection, query, limit=None, module=None, fuzzy=True, max_time_ms=None):
+        return self.branch(self.text, self.text_delay)
+
+    def branch(self, results, delay):
+        if delay:
+            self.release.wait(delay)
+        if isinstance(results, Exception):
+            raise results
+        return [dict(result) for result in results]
+
+
+@pytest.fixture
+def backend(monkeypatch):
+    backend = FakeBackend()
+    executor = ThreadPoolExecutor(max_workers=2)
+    monkeypatch.setattr(utils.Config, 'SEARCH_MODE', 'weighted')
+    monkeypatch.setattr(utils, 'SEARCH_BRANCH_TIMEOUT', BRANCH_TIMEOUT)
+    monkeypatch.setattr(utils, 'get_db_connection', lambda: None)
+    monkeypatch.setattr(utils, 'get_documents_collection', lambda: None)
+    monkeypatch.setattr(utils, 'search_executor', executor)
+    monkeypatch.setattr(utils, 'retrieval_backend', backend)
+    monkeypatch.setattr(utils, 'local_vector_index', None)
+    yield backend
+    backend.release.set()
+    executor.shutdown(wait=True)
+
+
+def search():
+    started = time.monotonic()
+    results = utils.search_similar_questions([0.1, 0.2], 'What is Atlas?', None, similarity_threshold=0.5)
+    return [result['question'] for result in results], time.monotonic() - started
+
+
+def test_results_from_both_branches_are_combined(backend):
+    questions, _ = search()
+
+    assert questions == ['What is a shard?', 'What is Atlas?']
+
+
+def test_branches_share_one_deadline(backend):
+    backend.vector_delay = BRANCH_TIMEOUT * 0.75
+    backend.text_delay = BRANCH_TIMEOUT * 5
+
+    questions, elapsed = search()
+
+    assert questions == ['What is Atlas?']
+    assert elapsed < BRANCH_TIMEOUT * 1.5
+
+
+def test_a_timed_out_branch_is_dropped(backend):
+    backend.vector_delay = BRANCH_TIMEOUT * 5
+
+    questions, elapsed = search()
+
+    assert questions == ['What is a shard?']
+    assert elapsed < BRANCH_TIMEOUT * 1.5
+
+
+def test_a_failed_branch_is_dropped(backend):
+    backend.text = RuntimeError('text index unavailable')
+
+    questions, _ = search()
+
+    assert questions == ['What is Atlas?']
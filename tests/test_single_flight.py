@@ -0,0 +1,159 @@
+import threading
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from pymongo.errors import DuplicateKeyError
+
+from app.single_flight import SingleFlight, coalescing_key
+
+
+class FakeLeases:
+    """Just enough of a collection for SingleFlight's lease documents."""
+
+    def __init__(self):
+        self.documents = {}
+
+    def insert_one(self, document):
+        if document['_id'] in self.documents:
+            raise DuplicateKeyError('duplicate key')
+        self.documents[document['_id']] = dict(document)
+
+    def find_one(self, query, projection=None):
+        document = self.documents.get(query['_id'])
+        return dict(document) if document else None
+
+    def update_one(self, query, update):
+        document = self.documents.get(query['_id'])
+        if document is None or not self._matches(document, query):
+            return type('Result', (), {'modified_count': 0})()
+        document.update(update['$set'])
+        for field in update.get('$unset', {}):
+            document.pop(field, None)
+        return type('Result', (), {'modified_count': 1})()
+
+    def _matches(self, document, query):
+        for field, condition in query.items():
+            if field == '_id':
+                continue
+            if field == '$or':
+                if not any(self._matches(document, clause) for clause in condition):
+                    return False
+            elif isinstance(condition, dict) and '$lt' in condition:
+                if not document.get(field) < condition['$lt']:
+                    return False
+            elif isinstance(condition, dict) and '$in' in condition:
+                if document.get(field) not in condition['$in']:
+                    return False
+            elif document.get(field) != condition:
+                return False
+        return True
+
+
+def wait_for_followers(flight, count):
+    for _ in range(500):
+        if flight.stats()['followers'] >= count:
+            return
+        threading.Event().wait(0.01)
+    raise AssertionError('followers never arrived')
+
+
+def test_coalescing_key_depends_on_stage_and_every_part():
+    assert coalescing_key('search', 'q', 'm') == coalescing_key('search', 'q', 'm')
+    assert coalescing_key('search', 'q', 'm') != coalescing_key('answer', 'q', 'm')
+    assert coalescing_key('search', 'q', 'm') != coalescing_key('search', 'q', '')
+    assert coalescing_key('search', 'q', 'm').startswith('search:')
+
+
+def test_concurrent_callers_share_one_computation_and_get_copies():
+    flight = SingleFlight()
+    release = threading.Event()
+    calls = []
+
+    def compute():
+        calls.append(1)
+        release.wait(5)
+        return {'matches': [1, 2]}
+
+    results = [None] * 4
+    leader = threading.Thread(target=lambda: results.__setitem__(0, flight.do('k', compute)))
+    leader.start()
+    while not calls:
+        threading.Event().wait(0.01)
+    followers = [threading.Thread(target=lambda i=i: results.__setitem__(i, flight.do('k', compute)))
+                 for i in range(1, 4)]
+    for thread in followers:
+        thread.start()
+    wait_for_followers(flight, 3)
+    release.set()
+    for thread in [leader] + followers:
+        thread.join(5)
+
+    assert len(calls) == 1
+    assert all(result == {'matches': [1, 2]} for result in results)
+    assert len({id(result) for result in results}) == 4
+    assert flight.stats() == {'leaders': 1, 'followers': 3, 'in_flight': 0}
+
+
+def test_waiters_see_the_leaders_error_and_later_calls_recompute():
+    flight = SingleFlight()
+    started, release = threading.Event(), threading.Event()
+
+    def failing():
+        started.set()
+        release.wait(5)
+        raise ValueError('boom')
+
+    errors = []
+
+    def call():
+        try:
+            flight.do('k', failing)
+        except ValueError as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=call)]
+    threads[0].start()
+    started.wait(5)
+    threads.append(threading.Thread(target=call))
+    threads[1].start()
+    wait_for_followers(flight, 1)
+    release.set()
+    for thread in threads:
+        thread.join(5)
+
+    assert len(errors) == 2
+    assert flight.do('k', lambda: 'fresh') == 'fresh'
+
+
+def test_a_finished_lease_is_not_served_to_a_later_request():
+    leases = FakeLeases()
+    flight = SingleFlight(lambda: leases, result_seconds=5)
+
+    assert flight.do('k', lambda: 'first') == 'first'
+    assert leases.documents['k']['status'] == 'done'
+    assert flight.do('k', lambda: 'second') == 'second'
+
+
+def test_a_waiter_in_another_process_picks_up_the_leaders_result():
+    leases = FakeLeases()
+    other_process = SingleFlight(lambda: leases, poll_interval=0.01)
+    other_process.owner = 'other-host:1'
+    leases.insert_one({'_id': 'k', 'owner': 'leader-host:1', 'status': 'running',
+                       'expires_at': datetime.now(timezone.utc) + timedelta(seconds=30)})
+
+    def finish():
+        threading.Event().wait(0.05)
+        leases.update_one({'_id': 'k', 'owner': 'leader-host:1'}, {'$set': {'status': 'done', 'result': 'shared'}})
+
+    threading.Thread(target=finish).start()
+    assert other_process.do('k', lambda: pytest.fail('waiter computed the result itself')) == 'shared'
+
+
+def test_an_expired_lease_is_taken_over():
+    leases = FakeLeases()
+    leases.insert_one({'_id': 'k', 'owner': 'dead-host:1', 'status': 'running',
+                       'expires_at': datetime.now(timezone.utc) - timedelta(seconds=1)})
+    flight = SingleFlight(lambda: leases)
+
+    assert flight.do('k', lambda: 'recomputed') == 'recomputed'
+    assert leases.documents['k']['owner'] == flight.owner
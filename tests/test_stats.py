@@ -0,0 +1,138 @@
+import pytest
+from bson import ObjectId
+
+from app.feedback_stats import FeedbackStats
+from app.stats_rollups import overall_statistics, numeric_rating
+
+
+class PipelineStats:
+    """
+    Applies FeedbackStats' update pipelines in memory. Only the expression
+    operators that pipeline uses are supported.
+    """
+
+    def __init__(self):
+        self.documents = {}
+
+    def update_one(self, query, pipeline, upsert=False):
+        document = self.documents.setdefault(query['_id'], {'_id': query['_id']})
+        for stage in pipeline:
+            document.update({field: self.evaluate(expression, document)
+                             for field, expression in stage['$set'].items()})
+
+    def delete_one(self, query):
+        self.documents.pop(query['_id'], None)
+
+    def evaluate(self, expression, document):
+        if isinstance(expression, str) and expression.startswith('$'):
+            return document.get(expression[1:])
+        if isinstance(expression, list):
+            return [self.evaluate(item, document) for item in expression]
+        if not isinstance(expression, dict):
+            return expression
+        (operator, arguments), = expression.items()
+        if operator == '$literal':
+            return arguments
+        values = [self.evaluate(argument, document) for argument in arguments]
+        if operator == '$ifNull':
+            return values[0] if values[0] is not None else values[1]
+        if operator == '$add':
+            return sum(values)
+        if operator == '$multiply':
+            return values[0] * values[1]
+        if operator == '$divide':
+            return values[0] / values[1]
+        if operator == '$setUnion':
+            return sorted(set(values[0]) | set(values[1]))
+        raise NotImplementedError(operator)
+
+
+class FakeDocuments:
+    def __init__(self, documents):
+        self.documents = documents
+
+    def find_one(self, query, projection=None):
+        return self.documents.get(query['_id'])
+
+
+@pytest.mark.parametrize('rating, expected', [(4, 4.0), ('3.5', 3.5), ('', None), ('great', None), (None, None)])
+def test_numeric_rating(rating, expected):
+    assert numeric_rating(rating) == expected
+
+
+def test_overall_statistics_from_a_rollup():
+    rollup = {
+        'users': 12, 'documents': 40, 'unanswered_total': 10, 'unanswered_answered': 4,
+        'feedback_rating_count': 3, 'feedback_rating_sum': 13.0,
+        'answer_feedback_total': 8, 'answer_feedback_positive': 6,
+    }
+    assert overall_statistics(rollup) == {
+        'total_users': 12,
+        'total_questions': 50,
+        'answered_questions': 44,
+        'unanswered_questions': 6,
+        'average_rating': 4.33,
+        'rating_count': 3,
+        'positive_feedback_percentage': 75.0,
+    }
+
+
+def test_overall_statistics_of_an_empty_rollup():
+    stats = overall_statistics({})
+    assert stats['total_questions'] == 0
+    assert stats['average_rating'] == 'N/A'
+    assert stats['positive_feedback_percentage'] == 'N/A'
+
+
+@pytest.fixture
+def question_id():
+    return ObjectId()
+
+
+@pytest.fixture
+def feedback(question_id):
+    stats = PipelineStats()
+    documents = FakeDocuments({question_id: {'_id': question_id, 'question': 'How do I create an index?'}})
+    return FeedbackStats(lambda: stats, lambda: documents), stats
+
+
+def test_effectiveness_is_the_share_of_positive_votes(feedback, question_id):
+    feedback_stats, stats = feedback
+    for is_positive in (True, True, False, True):
+        feedback_stats.record(str(question_id), 'create index?', is_positive)
+    feedback_stats.record(str(question_id), 'make an index', False)
+
+    row = stats.documents[question_id]
+    assert (row['total_feedback'], row['positive_feedback']) == (5, 3)
+    assert row['effectiveness'] == pytest.approx(60.0)
+    assert row['original_questions'] == ['create index?', 'make an index']
+    assert row['matched_question'] == 'How do I create an index?'
+    assert row['is_matched'] is True
+
+
+def test_only_a_literal_true_counts_as_positive(feedback):
+    feedback_stats, stats = feedback
+    for is_positive in (True, 'yes', 1):
+        feedback_stats.record(None, 'unmatched question', is_positive)
+
+    row = stats.documents['unmatched question']
+    assert (row['total_feedback'], row['positive_feedback']) == (3, 1)
+    assert row['matched_question'] == 'unmatched question'
+    assert row['is_matched'] is False
+
+
+def test_record_and_remove_never_raise(question_id):
+    def broken():
+        raise RuntimeError('no database')
+
+    feedback_stats = FeedbackStats(broken, broken)
+    feedback_stats.record(str(question_id), 'q', True)
+    feedback_stats.rename_question(str(question_id), 'q')
+    feedback_stats.remove_question(str(question_id))
+
+
+def test_remove_question_drops_the_row(feedback, question_id):
+    feedback_stats, stats = feedback
+    feedback_stats.record(str(question_id), 'q', True)
+    feedback_stats.remove_question(str(question_id))
+    assert stats.documents == {}
@@ -0,0 +1,77 @@
+from datetime import datetime, timedelta
+
+import pytest
+from bson import ObjectId
+
+from app.vector_index import LocalVectorIndex
+
+
+class FakeDocuments:
+    """Answers the two queries LocalVectorIndex issues against `documents`."""
+
+    def __init__(self):
+        self.documents = []
+
+    def insert(self, question, vector, updated_at=None):
+        document = {'_id': ObjectId(), 'question': question, 'question_embedding': vector}
+        if updated_at is not None:
+            document['updated_at'] = updated_at
+        self.documents.append(document)
+        return document
+
+    def find(self, query, projection):
+        return [dict(document) for document in self.documents if self.matches(document, query)]
+
+    def matches(self, document, query):
+        if '$or' in query:
+            return any(self.matches(document, condition) for condition in query['$or'])
+        if 'question_embedding' in query:
+            return 'question_embedding' in document
+        field, condition = next(iter(query.items()))
+        return field in document and document[field] > condition['$gt']
+
+
+@pytest.fixture
+def documents():
+    return FakeDocuments()
+
+
+def questions(index, vector):
+    return [document['question'] for document in index.search(vector, limit=5)]
+
+
+def test_refresh_picks_up_inserts_without_updated_at(documents):
+    documents.insert('What is Atlas?', [1.0, 0.0], updated_at=datetime.utcnow())
+    index = LocalVectorIndex(lambda: documents)
+    index.load()
+
+    documents.insert('What is a shard?', [0.0, 1.0])
+    index.refresh()
+
+    assert questions(index, [0.0, 1.0])[0] == 'What is a shard?'
+
+
+def test_refresh_applies_updates_and_removes_documents_without_embeddings(documents):
+    now = datetime.utcnow()
+    atlas = documents.insert('What is Atlas?', [1.0, 0.0], updated_at=now)
+    shard = documents.insert('What is a shard?', [0.0, 1.0], updated_at=now)
+    index = LocalVectorIndex(lambda: documents)
+    index.load()
+
+    atlas.update(question='What is MongoDB Atlas?', updated_at=now + timedelta(seconds=1))
+    shard.update(question_embedding=None, updated_at=now + timedelta(seconds=1))
+    index.refresh()
+
+    assert questions(index, [1.0, 0.0]) == ['What is MongoDB Atlas?']
+
+
+def test_a_collection_without_updated_at_is_still_refreshed(documents):
+    documents.insert('What is Atlas?', [1.0, 0.0])
+    index = LocalVectorIndex(lambda: documents)
+    index.load()
+
+    documents.insert('What is a shard?', [0.0, 1.0])
+    index.refresh()
+    index.refresh()
+
+    assert sorted(questions(index, [1.0, 1.0])) == ['What is Atlas?', 'What is a shard?']